@@ -11,6 +11,12 @@ python mkdocs2chm.py \
     --assets-dir assets \
     --config config.json
 
+Add --jobs N to convert pages with N worker processes, and --cache-dir DIR to
+keep converted pages between runs, so that only changed pages are converted again.
+Add --render-cache DIR to keep the rendered Markdown of each page in a cache shared
+with pdf/mkdocs2pdf.py (see tools/utils/page_render.py).
+Add --profile FILE to write a JSON report of where the build spends its time.
+
 with a config.json:
 
 {
@@ -38,10 +44,14 @@ If a directory 'assets' is found, any .css and .ttf files discovered will be inc
 """
 
 import argparse
+import copy
 from dataclasses import dataclass, field
+import functools
+import hashlib
 import itertools
 import json
 import logging
+import multiprocessing as mp
 import os
 from csscompressor import compress as css_compress
 import cssutils
@@ -50,7 +60,9 @@ import re
 import shutil
 from subprocess import Popen
 import sys
-from typing import Callable, IO, List, Tuple
+import time
+from typing import Callable, Dict, IO, Iterable, List, Tuple
+from urllib.parse import unquote
 import warnings
 from xml.dom.minidom import getDOMImplementation
 
@@ -58,8 +70,25 @@ from caption import TableCaptionExtension
 from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
 from bs4.element import NavigableString, Tag
 import markdown
+from markdown.treeprocessors import Treeprocessor
 from ruamel.yaml import YAML
 
+# The render stage, and the parser for HTML that is only read, shared with
+# pdf/mkdocs2pdf.py and the tools
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools", "utils")
+)
+from doc_utils import HTML_PARSER
+from page_render import (
+    RENDER_PACKAGES,
+    PageRenderer,
+    Profile,
+    RenderCache,
+    RenderProfile,
+    StepTimer,
+    tool_version as code_version,
+)
+
 warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
 
 cssutils.log.setLevel(logging.CRITICAL)
@@ -89,6 +118,16 @@ FILE_ENTRY = """<li><object type="text/sitemap">
     </object>
 """
 
+HEAD_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+"""
+
 
 @dataclass
 class Node:
@@ -107,12 +146,14 @@ class Node:
         return len(self.children) > 0
 
 
-def _process_nav_item(item: dict | str, parent: Node, project="project") -> None:
+def _process_nav_item(
+    item: dict | str, parent: Node, pages: Dict[str, "ConvertedPage"]
+) -> None:
     """
     Process a single nav item -- either a dict, which has either a string
     value (leaf node), or a list value -- of other nav items, or a string
     referencing a file, from which the name needs to be picked up from the
-    H1 later.
+    H1 of the converted page in pages.
     """
     if isinstance(item, dict):
         ((key, value),) = item.items()
@@ -121,13 +162,9 @@ def _process_nav_item(item: dict | str, parent: Node, project="project") -> None
         key = ""
         value = item  # item is the filename -- swap to .htm to parse
         if item.endswith(".md"):
-            html_file = os.path.join(project, item.replace(".md", ".htm"))
-            # Check if the HTML file exists (it might have been excluded)
-            if os.path.exists(html_file):
-                with open(html_file, "r", encoding="utf-8") as f:
-                    data = f.read()
-                if h1 := extract_h1(data):
-                    key = h1
+            # Check if the page was converted (it might have been excluded)
+            if page := pages.get(item.replace(".md", ".htm")):
+                key = page.toc_name
             else:
                 # File was excluded, skip this nav item
                 return
@@ -141,7 +178,7 @@ def _process_nav_item(item: dict | str, parent: Node, project="project") -> None
 
     if isinstance(value, list):
         for sub_item in value:
-            _process_nav_item(sub_item, node, project)
+            _process_nav_item(sub_item, node, pages)
 
 
 def _traverse(node: Node, toc: IO[str]) -> None:
@@ -287,19 +324,22 @@ def parse_mkdocs_yml(yml_file: str, remove: List[str]) -> dict:
     return data
 
 
-def generate_toc(yml_data: dict, project="project"):
+def generate_toc(
+    yml_data: dict, pages: Dict[str, "ConvertedPage"], project="project"
+):
     """
     Given the parsed and expanded mkdocs.yml -- specifically its "nav"
     section -- write out the corresponding CHM TOC XML with top-level items
-    directly under the root <ul>.
+    directly under the root <ul>. Pages without a name in the nav are named
+    from what was found when they were converted: see convert_to_html.
     """
     root = Node()
     nav = yml_data.get("nav", [])
     for item in nav:
-        _process_nav_item(item, root, project)
+        _process_nav_item(item, root, pages)
 
     # Post-process to add language reference disambiguation pages
-    add_langref_disambiguation_pages(root, project)
+    add_langref_disambiguation_pages(root, pages)
 
     toc = open(os.path.join(project, "_table_of_contents.hhc"), "w", encoding="utf-8")
     toc.write(HEADER)
@@ -365,293 +405,581 @@ def find_source_files(topdir: str, subdirs: List[str]) -> Tuple[List[str], List[
     return markdown_files, image_files
 
 
-def expand_macros(data: str, macros: dict) -> str:
+# HTML structure elements that might not appear in the parsed HTML but are still
+# needed for proper styling. Selectors mentioning them are always kept.
+ESSENTIAL_TAGS = {
+    "html",
+    "head",
+    "body",
+    "main",
+    "article",
+    "section",
+    "header",
+    "footer",
+}
+
+
+@dataclass
+class SelectorNeeds:
     """
-    The mkdocs macro extension makes use of templates of the type {{ macro-id }} where
-    the substitution value is stored in the "extra:" section in the mkdocs.yml file.
+    What a single selector needs to be present on a page for purge_css to keep it:
+    any one of the tags, classes or ids listed, unless it is always kept.
     """
 
-    def replace(match):
-        key = match.group(1).strip()
-        value = macros.get(key)
-        return str(value) if not isinstance(value, dict) else match.group(0)
+    text: str
+    always: bool = False
+    tags: frozenset = frozenset()
+    classes: frozenset = frozenset()
+    ids: frozenset = frozenset()
 
-    return re.sub(r"\{\{\s*(.*?)\s*}}", replace, data)
+    @classmethod
+    def from_selector(cls, selector: str) -> "SelectorNeeds":
+        # Universal selector, complex selectors (kept to avoid breaking things),
+        # and selectors on the essential structure elements and their variants
+        if (
+            selector == "*"
+            or any(c in selector for c in (":", ">", "+", "~", "[", "]"))
+            or any(
+                re.search(r"\b" + re.escape(tag) + r"\b", selector)
+                for tag in ESSENTIAL_TAGS
+            )
+        ):
+            return cls(selector, always=True)
+
+        # A name is referenced by the selector if it sits between two word
+        # boundaries (tags), or between a "." or "#" and a word boundary (classes
+        # and ids). Enumerate every such substring up front, so that matching a
+        # page is a set intersection rather than a regex search per name.
+        bounds = [m.start() for m in re.finditer(r"\b", selector)]
+        tags = {selector} | {selector[i:j] for i in bounds for j in bounds if i < j}
+        classes = {
+            selector[i + 1 : j]
+            for i, c in enumerate(selector)
+            if c == "."
+            for j in bounds
+            if j > i
+        }
+        ids = {
+            selector[i + 1 : j]
+            for i, c in enumerate(selector)
+            if c == "#"
+            for j in bounds
+            if j > i
+        }
+        if selector.startswith("."):
+            classes.add(selector[1:])
+        if selector.startswith("#"):
+            ids.add(selector[1:])
+
+        return cls(
+            selector, False, frozenset(tags), frozenset(classes), frozenset(ids)
+        )
 
+    def matches(self, tags: set, classes: set, ids: set) -> bool:
+        return (
+            self.always
+            or not self.tags.isdisjoint(tags)
+            or not self.classes.isdisjoint(classes)
+            or not self.ids.isdisjoint(ids)
+        )
 
-def purge_css(css: str, html_content: str) -> str:
+
+@dataclass
+class StyleIndex:
     """
-    Simple CSS purger that removes unused selectors.
-    Uses cssutils for parsing CSS and BeautifulSoup for HTML.
-    Preserves selectors for important HTML structure elements.
+    The stylesheet, parsed once, with the selectors of every style rule indexed
+    by the tags, classes and ids they need. Each page then only has to collect
+    the names it uses. Pages that end up selecting the same rules share the
+    compressed CSS, which is computed once and memoised.
     """
-    # Parse the HTML to find all class names and IDs
-    soup = BeautifulSoup(html_content, "html.parser")
 
-    # Find all class names in use
-    classes_in_use = set()
-    for tag in soup.find_all(class_=True):
-        classes_in_use.update(tag.get("class"))
+    rules: List[Tuple[object, List[SelectorNeeds] | None]]
+    memo: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_css(cls, css: str) -> "StyleIndex":
+        rules = []
+        for rule in cssutils.parseString(css):
+            if rule.type == rule.STYLE_RULE:
+                selectors = [
+                    SelectorNeeds.from_selector(selector.strip())
+                    for selector in rule.selectorText.split(",")
+                ]
+                rules.append((rule, selectors))
+            # Keep other types of rules (like @media, @keyframes, etc.)
+            elif rule.type != rule.COMMENT:
+                rules.append((rule, None))
+        return cls(rules)
+
+    def purge(self, soup: BeautifulSoup) -> str:
+        """
+        Simple CSS purger that removes unused selectors, and compresses the result.
+        The class names, ids and tags in use are taken from the page's soup.
+        """
+        classes_in_use = set()
+        for tag in soup.find_all(class_=True):
+            classes_in_use.update(tag.get("class"))
+        ids_in_use = {tag.get("id") for tag in soup.find_all(id=True)}
+        tags_in_use = {tag.name for tag in soup.find_all()} | ESSENTIAL_TAGS
+
+        signature = tuple(
+            (
+                None
+                if selectors is None
+                else tuple(
+                    needs.text
+                    for needs in selectors
+                    if needs.matches(tags_in_use, classes_in_use, ids_in_use)
+                )
+            )
+            for _, selectors in self.rules
+        )
+        if signature not in self.memo:
+            self.memo[signature] = self._render(signature)
+        return self.memo[signature]
+
+    def _render(self, signature: tuple) -> str:
+        # Create a new stylesheet with only the retained rules, keeping only the
+        # matched selectors of each style rule
+        new_stylesheet = cssutils.css.CSSStyleSheet()
+        for (rule, _), matched_selectors in zip(self.rules, signature):
+            if matched_selectors is None:
+                new_stylesheet.add(rule)
+            elif matched_selectors:
+                rule.selectorText = ", ".join(matched_selectors)
+                new_stylesheet.add(rule)
 
-    # Find all IDs in use
-    ids_in_use = {tag.get("id") for tag in soup.find_all(id=True)}
+        return css_compress(new_stylesheet.cssText.decode("utf-8"))
 
-    # Find all tag names in use
-    tags_in_use = {tag.name for tag in soup.find_all()}
 
-    # Add essential HTML structure elements that might not appear in the parsed HTML
-    # but are still needed for proper styling
-    essential_tags = {
-        "html",
-        "head",
-        "body",
-        "main",
-        "article",
-        "section",
-        "header",
-        "footer",
-    }
-    tags_in_use.update(essential_tags)
+@functools.lru_cache(maxsize=None)
+def style_index(css: str) -> StyleIndex:
+    """
+    The StyleIndex for a CSS bundle, built once per process.
+    """
+    return StyleIndex.from_css(css)
 
-    # Parse the CSS
-    stylesheet = cssutils.parseString(css)
 
-    # Track which rules to keep
-    rules_to_keep = []
+def purge_css(css: str, soup: BeautifulSoup) -> str:
+    """
+    Remove the selectors in css that are unused in the page's soup, and compress
+    what remains. See StyleIndex.
+    """
+    return style_index(css).purge(soup)
 
-    # Process each rule
-    for rule in stylesheet:
-        if rule.type == rule.STYLE_RULE:
-            selectors = rule.selectorText.split(",")
-            matched_selectors = []
 
-            for selector in selectors:
-                selector = selector.strip()
-                should_keep = False
+FRONT_MATTER_RE = re.compile(r"^\s*---\n(?P<yaml>.*?)\n---\n+", flags=re.DOTALL)
 
-                # Always keep essential structure selectors and their variants
-                for tag in essential_tags:
-                    if re.search(r"\b" + re.escape(tag) + r"\b", selector):
-                        should_keep = True
-                        break
+CACHED_PACKAGES = RENDER_PACKAGES + [
+    "beautifulsoup4",
+    "cssutils",
+    "csscompressor",
+    "htmlmin",
+]
 
-                if not should_keep:
-                    # Simple tag selectors like "div" or "p"
-                    if selector in tags_in_use:
-                        should_keep = True
-                    # Class selectors like ".my-class"
-                    elif selector.startswith(".") and selector[1:] in classes_in_use:
-                        should_keep = True
-                    # ID selectors like "#my-id"
-                    elif selector.startswith("#") and selector[1:] in ids_in_use:
-                        should_keep = True
-                    # Universal selector
-                    elif selector == "*":
-                        should_keep = True
-                    # Complex selectors - more conservative, keep these to avoid breaking things
-                    elif any(c in selector for c in (":", ">", "+", "~", "[", "]")):
-                        should_keep = True
-                    # Selectors with tags, classes, or IDs that might be used
-                    else:
-                        # Check for tag names
-                        for tag in tags_in_use:
-                            if re.search(r"\b" + re.escape(tag) + r"\b", selector):
-                                should_keep = True
-                                break
-
-                        # Check for class names
-                        if not should_keep:
-                            for cls in classes_in_use:
-                                if re.search(r"\." + re.escape(cls) + r"\b", selector):
-                                    should_keep = True
-                                    break
-
-                        # Check for IDs
-                        if not should_keep:
-                            for id_val in ids_in_use:
-                                if re.search(
-                                    r"#" + re.escape(id_val) + r"\b", selector
-                                ):
-                                    should_keep = True
-                                    break
-
-                if should_keep:
-                    matched_selectors.append(selector)
-
-            # If any selectors matched, keep this rule with only the matched selectors
-            if matched_selectors:
-                rule.selectorText = ", ".join(matched_selectors)
-                rules_to_keep.append(rule)
 
-        # Keep other types of rules (like @media, @keyframes, etc.)
-        elif rule.type != rule.COMMENT:
-            rules_to_keep.append(rule)
+def tool_version() -> str:
+    """
+    A fingerprint of the conversion code itself: this script, plus the versions of
+    the libraries that shape its output. Any change to either invalidates the cache.
+    """
+    return code_version(__file__, CACHED_PACKAGES)
 
-    # Create a new stylesheet with only the retained rules
-    new_stylesheet = cssutils.css.CSSStyleSheet()
-    for rule in rules_to_keep:
-        new_stylesheet.add(rule)
 
-    # Serialise the new stylesheet
-    return new_stylesheet.cssText.decode("utf-8")
+@dataclass
+class PageCache:
+    """
+    Content-addressed on-disk cache of converted pages.
 
+    A page's key is a hash of its source text and output name, combined with a
+    fingerprint of everything else that goes into the conversion: the macros from
+    the "extra:" section, the transforms, the CSS bundle, the target version and the
+    tool version. An unchanged page can then reuse its previously rendered HTML.
+    """
 
-def parse_frontmatter(content: str) -> Tuple[dict, str]:
+    directory: str
+    fingerprint: str = ""
+
+    @classmethod
+    def create(
+        cls,
+        directory: str,
+        css: str,
+        macros: dict,
+        transforms: List[Callable[[str], str]],
+        version: str = None,
+    ) -> "PageCache":
+        digest = hashlib.sha256()
+        digest.update(tool_version().encode("utf-8"))
+        digest.update(json.dumps(macros, sort_keys=True, default=str).encode("utf-8"))
+        for fun in transforms:
+            digest.update(f"{fun.__module__}.{fun.__qualname__}".encode("utf-8"))
+        digest.update(css.encode("utf-8"))
+        digest.update(str(version).encode("utf-8"))
+        os.makedirs(directory, exist_ok=True)
+        return cls(directory, digest.hexdigest())
+
+    def key(self, newname: str, source: str) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode("utf-8"))
+        digest.update(newname.encode("utf-8"))
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> dict:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, record: dict) -> None:
+        # Write-then-rename, so concurrent workers never see a partial entry.
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, path)
+
+
+def new_markdown() -> markdown.Markdown:
     """
-    Parse YAML frontmatter from markdown content.
-    Returns (frontmatter_dict, content_without_frontmatter)
+    A Markdown converter using the same extensions as used by our mkdocs setup.
     """
-    frontmatter_pattern = r"^\s*---\n(.*?)\n---\n+"
-    match = re.match(frontmatter_pattern, content, flags=re.DOTALL)
+    return markdown.Markdown(
+        extensions=[
+            "admonition",  # https://python-markdown.github.io/extensions/admonition/
+            "attr_list",  # https://python-markdown.github.io/extensions/attr_list/
+            "footnotes",  # https://python-markdown.github.io/extensions/footnotes/
+            "markdown_tables_extended",  # https://github.com/fumbles/tables_extended
+            "pymdownx.details",  # https://facelessuser.github.io/pymdown-extensions/extensions/details/
+            "pymdownx.superfences",  # https://facelessuser.github.io/pymdown-extensions/extensions/superfences/
+            "toc",  # https://python-markdown.github.io/extensions/toc/ - adds id attributes to headings
+            TableCaptionExtension(),  # https://github.com/flywire/caption
+        ],
+    )
 
-    if match:
-        yaml = YAML()
-        try:
-            frontmatter = yaml.load(match.group(1))
-            if frontmatter is None:
-                frontmatter = {}
-        except:
-            frontmatter = {}
-        content_without = re.sub(
-            frontmatter_pattern, "", content, count=1, flags=re.DOTALL
-        )
-        return frontmatter, content_without
-    return {}, content
 
+@functools.lru_cache(maxsize=None)
+def markdown_converter() -> markdown.Markdown:
+    """
+    The Markdown converter for this process. Building one sets up the full
+    extension stack, so it is done once and the converter reused for every page,
+    rather than per page as markdown.markdown() does. Use markdown_to_html().
+    """
+    return new_markdown()
 
-def convert_to_html(
-    filenames: List[str],
+
+def table_caption_processor(converter: markdown.Markdown) -> Treeprocessor:
+    """
+    The caption extension's treeprocessor, which numbers the tables of a page.
+    """
+    package = TableCaptionExtension.__module__.split(".")[0]
+    for processor in converter.treeprocessors:
+        if type(processor).__module__.split(".")[0] == package and hasattr(processor, "number"):
+            return processor
+    raise RuntimeError(
+        "The caption extension has no table-numbering treeprocessor: check its version"
+    )
+
+
+def markdown_to_html(md: str) -> str:
+    """
+    Convert a page with the per-process Markdown converter, resetting it first so
+    that no state (footnotes, toc, stashed blocks) leaks between pages.
+    """
+    converter = markdown_converter()
+    converter.reset()
+    # The caption extension numbers tables in its treeprocessor, and has no reset
+    # of its own: numbering starts over on each page.
+    table_caption_processor(converter).number = 0
+    return converter.convert(md)
+
+
+def render_profile() -> RenderProfile:
+    """
+    How pages are rendered for the CHM: see new_markdown(). The fingerprint covers
+    this script, so any change to it renders pages again.
+    """
+    return RenderProfile(
+        name="chm",
+        convert=markdown_to_html,
+        front_matter_re=FRONT_MATTER_RE,
+        version=code_version(__file__, RENDER_PACKAGES),
+    )
+
+
+def output_name(file: str, top_level_files: List[str]) -> str:
+    """
+    The project-relative .htm name for a Markdown source file.
+    """
+    if file in top_level_files:
+        # Top-level files go directly in project/
+        return os.path.basename(file).replace(".md", ".htm")
+    if "/docs/" in file:
+        # Sub-site files go in project/sub-site/
+        path, oldname = file.split("/docs/", maxsplit=1)
+        sub_site = os.path.basename(path)
+        return os.path.join(sub_site, oldname.replace(".md", ".htm"))
+    # Fallback for files without /docs/
+    return os.path.basename(file).replace(".md", ".htm")
+
+
+@dataclass
+class ConvertedPage:
+    """
+    What convert_page reports about a page, besides writing its .htm file.
+    """
+
+    name: str  # Project-relative .htm name
+    title: str  # The page's <title>: its h1 name, or one made up from the file name
+    h1: str  # Name from the page's h1, for the keyword index; "" if it has none
+    toc_name: str  # Name from the page's h1, with any command, for the TOC
+    images: List[str]  # Source paths of the images the page refers to
+    excluded: bool  # Excluded from search
+    cached: bool  # Taken from the page cache
+    steps: Dict[str, float]  # Time taken by each step
+
+
+def convert_page(
+    file: str,
     css: str,
-    macros: dict,
-    transforms: List[Callable[[str], str]],
+    renderer: PageRenderer,
     project: str,
     top_level_files: List[str],
     version: str = None,
-) -> Tuple[List[str], List[str]]:
+    cache: PageCache = None,
+) -> ConvertedPage:
     """
-    Convert each Markdown file and convert to HTML, using the same rendering library as
-    mkdocs, with the same set of extensions. We expand the mkdocs-macro {{ templates }}
-    and optionally provide means for applying a set of transformations. Currently, we add
-    all the CSS in the header - this is required as the HTML engine in the Windows CHM
-    viewer does not understand <link ...>.
+    Convert a single Markdown file to a self-contained .htm file in the project dir.
+    This is the unit of work for convert_to_html, and must only depend on its
+    arguments so that it can run in a worker process.
 
-    As a mitigation, take steps to only add the actually used CSS bits.
+    The Markdown is rendered by the renderer, which may take it from its render
+    cache. If a cache is given and holds an entry for the page's inputs, its HTML
+    is written out as-is and the conversion is skipped.
 
-    Returns: (converted_files, excluded_files)
+    Returns: the page's name, index entry, and how it was converted
     """
-    converted: List[str] = []
-    excluded: List[str] = []
-
-    head_template = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-"""
-
-    for file in filenames:
-        if file in top_level_files:
-            # Top-level files go directly in project/
-            newname = os.path.basename(file).replace(".md", ".htm")
-        elif "/docs/" in file:
-            # Sub-site files go in project/sub-site/
-            path, oldname = file.split("/docs/", maxsplit=1)
-            sub_site = os.path.basename(path)
-            newname = os.path.join(sub_site, oldname.replace(".md", ".htm"))
-        else:
-            # Fallback for files without /docs/
-            newname = os.path.basename(file).replace(".md", ".htm")
+    timer = StepTimer()
+    newname = output_name(file, top_level_files)
+    realpath_newname = str(os.path.join(project, newname))
+    os.makedirs(os.path.dirname(realpath_newname), exist_ok=True)
+
+    with open(file, "r", encoding="utf-8") as f:
+        md = f.read()
+    timer.lap("read")
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key(newname, md)
+        if record := cache.get(cache_key):
+            with open(realpath_newname, "w", encoding="utf-8") as f:
+                f.write(record["html"])
+            timer.lap("cache")
+            return ConvertedPage(
+                str(newname),
+                record["title"],
+                record["h1"],
+                record["toc_name"],
+                record["images"],
+                record["excluded"],
+                True,
+                timer.steps,
+            )
 
-        realpath_newname = str(os.path.join(project, newname))
-        os.makedirs(os.path.dirname(realpath_newname), exist_ok=True)
+    # Expand macros, apply the transforms and convert Markdown to HTML, using the
+    # same extensions as used by our mkdocs setup.
+    page = renderer.render(md, timer.lap)
+    images = image_paths(file, page.images)
+
+    # Check the frontmatter for search exclusion
+    excluded = bool(page.front_matter.get("search", {}).get("exclude", False))
+
+    body = page.html.replace("``", "")  # Empty code blocks aren't rendered correctly
+
+    # Post-process the HTML: parse it once, and apply all passes to the same tree.
+    soup = BeautifulSoup(body, "html.parser")
+    timer.lap("parse_html")
+    fix_links_html(soup, version=version)
+    timer.lap("fix_links_html")
+    remove_footnote_backlinks(soup)
+    timer.lap("remove_footnote_backlinks")
+    make_footnote_urls_clickable(soup)
+    timer.lap("make_footnote_urls_clickable")
+    fix_key_notation_link(soup, newname)
+    timer.lap("fix_key_notation_link")
+    fix_external_links(soup)
+    timer.lap("fix_external_links")
+    fix_apl_root_namespace_highlighting(soup)
+    timer.lap("fix_apl_root_namespace_highlighting")
+
+    # Extract the H1 content for use in the title tag and the keyword index, setting
+    # for_title=True to only extract the name part (excluding command span)
+    h1 = title = h1_name(soup.find("h1"), for_title=True)
+    toc_name = h1_name(soup.find("h1"))
+
+    # Use a default title if no H1 is found
+    if not title:
+        # Use the filename without extension as a fallback title
+        title = (
+            os.path.splitext(os.path.basename(file))[0].replace("_", " ").title()
+        )
 
-        with open(file, "r", encoding="utf-8") as f:
-            md = f.read()
+        # For special files like welcome.md, use a more appropriate title
+        if file.endswith("welcome.md"):
+            title = "Welcome to Dyalog APL"
 
-        # Parse frontmatter and check for search exclusion
-        frontmatter, md = parse_frontmatter(md)
-        if frontmatter.get("search", {}).get("exclude", False):
-            excluded.append(file)
+    # Format the head with the title
+    head = HEAD_TEMPLATE.format(title=title)
 
-        # Macros are defined in the "extra:" section in the mkdocs.yml file. In the Markdown
-        # source, they are templates of the type
-        #
-        #    {{ macro-name }}
-        md = expand_macros(md, macros)
+    # Optimise and minimise CSS specifically for this page: only use selectors
+    # referring to ids, classes and tags on the actual page.
+    optimised_css = purge_css(css, soup)
+    timer.lap("purge_css")
+    body = str(soup)
+    timer.lap("serialise")
 
-        # Hook point for transforms we may want to apply to the source Markdown before it's
-        # converted to HTML.
-        for fun in transforms:
-            md = fun(md)
-
-        # Convert Markdown to HTML, using the same extensions as used by our mkdocs setup.
-        body = markdown.markdown(
-            md,
-            extensions=[
-                "admonition",  # https://python-markdown.github.io/extensions/admonition/
-                "attr_list",  # https://python-markdown.github.io/extensions/attr_list/
-                "footnotes",  # https://python-markdown.github.io/extensions/footnotes/
-                "markdown_tables_extended",  # https://github.com/fumbles/tables_extended
-                "pymdownx.details",  # https://facelessuser.github.io/pymdown-extensions/extensions/details/
-                "pymdownx.superfences",  # https://facelessuser.github.io/pymdown-extensions/extensions/superfences/
-                "toc",  # https://python-markdown.github.io/extensions/toc/ - adds id attributes to headings
-                TableCaptionExtension(),  # https://github.com/flywire/caption
-            ],
+    # Construct and minimise the HTML
+    final_html = (
+        f"{head}<style>{optimised_css}</style></head><body>{body}</body></html>"
+    )
+    final_html = html_minify(
+        final_html,
+        remove_comments=True,
+        remove_empty_space=True,
+        remove_all_empty_space=False,
+        reduce_boolean_attributes=True,
+    )
+    timer.lap("minify")
+
+    with open(realpath_newname, "w", encoding="utf-8") as f:
+        f.write(final_html)
+
+    if cache is not None:
+        cache.put(
+            cache_key,
+            {
+                "html": final_html,
+                "excluded": excluded,
+                "title": title,
+                "h1": h1,
+                "toc_name": toc_name,
+                "images": images,
+            },
         )
+    timer.lap("write")
 
-        body = body.replace("``", "")  # Empty code blocks aren't rendered correctly
+    return ConvertedPage(
+        str(newname), title, h1, toc_name, images, excluded, False, timer.steps
+    )
 
-        body = fix_links_html(body, version=version)
-        body = remove_footnote_backlinks(body)
-        body = make_footnote_urls_clickable(body)
-        body = fix_key_notation_link(body, newname)
-        body = fix_external_links(body)
-        body = fix_apl_root_namespace_highlighting(body)
 
-        # Extract the H1 content for use in the title tag, setting for_title=True
-        # to only extract the name part (excluding command span)
-        title = extract_h1(body, for_title=True)
+def convert_to_html(
+    filenames: List[str],
+    css: str,
+    macros: dict,
+    transforms: List[Callable[[str], str]],
+    project: str,
+    top_level_files: List[str],
+    version: str = None,
+    jobs: int = 1,
+    cache_dir: str = None,
+    render_cache_dir: str = None,
+    profile: Profile = None,
+) -> Tuple[Dict[str, ConvertedPage], List[str]]:
+    """
+    Convert each Markdown file and convert to HTML, using the same rendering library as
+    mkdocs, with the same set of extensions. We expand the mkdocs-macro {{ templates }}
+    and optionally provide means for applying a set of transformations. Currently, we add
+    all the CSS in the header - this is required as the HTML engine in the Windows CHM
+    viewer does not understand <link ...>.
 
-        # Use a default title if no H1 is found
-        if not title:
-            # Use the filename without extension as a fallback title
-            title = (
-                os.path.splitext(os.path.basename(file))[0].replace("_", " ").title()
-            )
+    As a mitigation, take steps to only add the actually used CSS bits.
 
-            # For special files like welcome.md, use a more appropriate title
-            if file.endswith("welcome.md"):
-                title = "Welcome to Dyalog APL"
+    Pages are independent of each other, so with jobs > 1 they are converted by a pool
+    of worker processes. Results are collected in input order, so the output is the
+    same as for a serial run.
 
-        # Format the head with the title
-        head = head_template.format(title=title)
+    With a cache_dir, pages whose inputs are unchanged since a previous run are not
+    converted again; their cached HTML is reused (see PageCache). With a
+    render_cache_dir, pages whose Markdown was rendered before, by this or an earlier
+    build, are not rendered again (see page_render.RenderCache).
 
-        # Optimise CSS specifically for this page: only use selectors referring to
-        # ids, classes and tags on the actual page.
-        optimised_css = purge_css(css, body)
+    With a profile, the time each page spent in each conversion step is recorded.
 
-        # Minimise the CSS
-        optimised_css = css_compress(optimised_css)
+    Returns: (converted pages by project-relative .htm name, excluded_files)
+    """
+    converted: Dict[str, ConvertedPage] = {}
+    excluded: List[str] = []
+    cached = 0
+    rendered = 0  # Taken from the render cache
+
+    cache = None
+    if cache_dir:
+        cache = PageCache.create(cache_dir, css, macros, transforms, version)
+
+    renderer = PageRenderer(
+        render_profile(),
+        macros,
+        transforms,
+        cache=RenderCache(render_cache_dir) if render_cache_dir else None,
+    )
 
-        # Construct and minimise the HTML
-        final_html = (
-            f"{head}<style>{optimised_css}</style></head><body>{body}</body></html>"
-        )
-        final_html = html_minify(
-            final_html,
-            remove_comments=True,
-            remove_empty_space=True,
-            remove_all_empty_space=False,
-            reduce_boolean_attributes=True,
+    # Time what building a Markdown converter costs, once the extension modules
+    # have been imported, to report what reusing one per process saves.
+    markdown_converter()
+    start = time.perf_counter()
+    new_markdown()
+    build_time = time.perf_counter() - start
+
+    convert = functools.partial(
+        convert_page,
+        css=css,
+        renderer=renderer,
+        project=project,
+        top_level_files=top_level_files,
+        version=version,
+        cache=cache,
+    )
+
+    if jobs > 1:
+        pool = mp.Pool(processes=jobs)
+        results = pool.imap(convert, filenames, chunksize=8)
+    else:
+        pool = None
+        results = map(convert, filenames)
+
+    try:
+        for file, page in zip(filenames, results):
+            converted[page.name] = page
+            if page.excluded:
+                excluded.append(file)
+            cached += page.cached
+            rendered += "render_cache" in page.steps
+            if profile is not None:
+                profile.add_page(page.name, page.steps)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if cache is not None:
+        print(
+            f"\nPage cache: reused {cached}, converted {len(converted) - cached} pages"
         )
+    if renderer.cache is not None:
+        print(f"\nRender cache: reused {rendered} rendered pages")
 
-        with open(realpath_newname, "w", encoding="utf-8") as f:
-            f.write(final_html)
+    reused = max(len(converted) - cached - max(jobs, 1), 0)
+    print(
+        f"\nMarkdown converter: reused for {reused} pages, "
+        f"saving ~{reused * build_time:.1f}s ({build_time * 1000:.1f}ms per page)"
+    )
 
-        converted.append(str(newname))
     return converted, excluded
 
 
@@ -719,11 +1047,20 @@ def extract_h1(data: str, for_title: bool = False) -> str:
     Legacy <span class="name">/<span class="command"> markup is still honoured,
     where for_title selects the name alone versus "name command".
     """
-    soup = BeautifulSoup(data, "html.parser")
-    h1 = soup.find("h1")
+    if not re.search(r"<h1\b", data, flags=re.IGNORECASE):
+        return ""
+    return h1_name(BeautifulSoup(data, HTML_PARSER).find("h1"), for_title)
+
+
+def h1_name(h1: Tag, for_title: bool = False) -> str:
+    """
+    The name from an h1 element (if any), as for extract_h1. The element itself
+    is left untouched.
+    """
     if not h1:
         return ""
 
+    h1 = copy.copy(h1)
     if name_span := h1.find("span", class_="name"):
         name = name_span.get_text().strip()
         command_span = h1.find("span", class_="command")
@@ -736,55 +1073,18 @@ def extract_h1(data: str, for_title: bool = False) -> str:
     return re.sub(r"\s+", " ", h1.get_text()).strip().replace('"', "").replace("`", "")
 
 
-def extract_headers(filename: str) -> List[str]:
-    """
-    Return a page's title (name) for the CHM keyword index, cleaned to plain text.
-
-    Only the page title is indexed; sub-headings ("Introduction", "Examples", ...)
-    are not distinguishing keywords. The title comes from a literal HTML <h1> or,
-    for markdown pages, the first `# ` heading. The {{key}} macro, the backtick
-    command and HTML tags are stripped so the entry is the plain-text name and
-    carries no UTF-8 the Windows CHM index display cannot cope with.
-    """
-    with open(filename, "r", encoding="utf-8") as f:
-        data = f.read()
-
-    # Legacy pages with a literal HTML <h1>.
-    if h1 := extract_h1(data, for_title=True):
-        return [h1]
-
-    _, body = parse_frontmatter(data)
-    body = re.sub(r"^```.*?^```", "", body, flags=re.DOTALL | re.MULTILINE)
-    match = re.search(r"^#\s+(.+?)\s*$", body, flags=re.MULTILINE)
-    if not match:
-        return []
-
-    title = re.sub(r"\{\{.*?\}\}", "", match.group(1))  # drop macros e.g. {{key}}
-    title = re.sub(r"`[^`]*`", "", title)  # drop a backtick command
-    soup = BeautifulSoup(title, "html.parser")
-    for tag in soup.find_all(["code", "a"]):  # drop a literal <code> command / key link
-        tag.decompose()
-    title = re.sub(r"\s+", " ", soup.get_text()).strip().strip('"').strip("`").strip()
-    return [title] if title else []
-
-
-def generate_index_data(files: List[str]) -> List[Tuple[str, str]]:
+def generate_index_data(pages: Iterable[ConvertedPage]) -> List[Tuple[str, str]]:
     """
-    Note: we're generating the index data from the source Markdown, but we
-    need to ensure that filenames refer to the converted HTML files.
+    The CHM keyword index: the name from each page's h1, as found when the page was
+    converted. Only the page title is indexed; sub-headings ("Introduction",
+    "Examples", ...) are not distinguishing keywords. Pages excluded from search
+    are left out.
     """
-    entries = []
-    for filename in files:
-        headings = extract_headers(filename)
-        if "/docs/" in filename:
-            a, b = filename.split("/docs/", maxsplit=1)
-            newname = f"{os.path.basename(a)}/{b.replace('.md', '.htm')}"
-        else:
-            # For root-level files, just use the basename
-            newname = os.path.basename(filename).replace(".md", ".htm")
-
-        for heading in headings:
-            entries.append((heading, newname))
+    entries = [
+        (page.h1, page.name.replace(os.sep, "/"))
+        for page in pages
+        if page.h1 and not page.excluded
+    ]
 
     # Sort the index alphabetically by entry (not filename!)
     entries.sort(key=lambda w: w[0])
@@ -1005,20 +1305,17 @@ def table_captions(body: str) -> str:
     )  # Update table references
 
 
-def fix_links_html(html: str, version: str = None) -> str:
+def fix_links_html(soup: BeautifulSoup, version: str = None) -> None:
     """
-    Applies the link transformations to an HTML document:
+    Applies the link transformations to an HTML document, in place:
     1. Links with targets ending in ".md" are changed to ".htm".
     2. Links without extensions and leading "../" are lifted one relative level, and suffixed with ".htm".
     3. Off-site links starting with "http" remain unchanged.
     4. Links containing "/files/" are converted to external URLs pointing to docs.dyalog.com.
 
     Parameters:
-        html (str): The HTML content as a string.
+        soup (BeautifulSoup): The parsed HTML content.
         version (str): The version string for external file links (e.g., "20.0")
-
-    Returns:
-        str: The modified HTML content.
     """
 
     def transform_link(href: str) -> str:
@@ -1066,31 +1363,21 @@ def fix_links_html(html: str, version: str = None) -> str:
         # Something else; leave unchanged (but restore anchor)
         return href + anchor
 
-    # Parse the HTML
-    soup = BeautifulSoup(html, "html.parser")
-
     # Find and transform all <a> tags with href attributes
     for a_tag in soup.find_all("a", href=True):
         original_href = a_tag["href"]
         a_tag["href"] = transform_link(original_href)
 
-    # Return the modified HTML as a string
-    return str(soup)
 
-
-def remove_footnote_backlinks(html: str) -> str:
+def remove_footnote_backlinks(soup: BeautifulSoup) -> None:
     """
-    Remove linking aspects from footnotes:
+    Remove linking aspects from footnotes, in place:
     1. Convert footnote reference links to plain superscript text
     2. Remove backlinks from footnote text
 
     Parameters:
-        html (str): The HTML content as a string.
-
-    Returns:
-        str: The modified HTML content.
+        soup (BeautifulSoup): The parsed HTML content.
     """
-    soup = BeautifulSoup(html, "html.parser")
 
     # Find all footnote reference links and replace with plain superscript text
     for a_tag in soup.find_all("a", class_="footnote-ref"):
@@ -1107,27 +1394,20 @@ def remove_footnote_backlinks(html: str) -> str:
         # Simply remove the backlink
         a_tag.decompose()
 
-    return str(soup)
 
-
-def make_footnote_urls_clickable(html: str) -> str:
+def make_footnote_urls_clickable(soup: BeautifulSoup) -> None:
     """
     Convert bare URLs in footnote content into clickable links.
     This is necessary because Python Markdown doesn't automatically convert
     bare URLs to links in footnotes, making them unclickable in CHM files.
 
     Parameters:
-        html (str): The HTML content as a string.
-
-    Returns:
-        str: The modified HTML content with clickable URLs in footnotes.
+        soup (BeautifulSoup): The parsed HTML content, modified in place.
     """
-    soup = BeautifulSoup(html, "html.parser")
-
     # Find the footnote div
     footnote_div = soup.find("div", class_="footnote")
     if not footnote_div or not isinstance(footnote_div, Tag):
-        return str(soup)
+        return
 
     # Pattern to match URLs (http, https, ftp)
     url_pattern = re.compile(
@@ -1137,7 +1417,7 @@ def make_footnote_urls_clickable(html: str) -> str:
     # Find all <p> tags within footnotes that might contain URLs
     p_tags = footnote_div.find_all("p")
     if not p_tags:
-        return str(soup)
+        return
 
     for p_tag in p_tags:
         # We need to work with a copy of contents since we're modifying it
@@ -1180,10 +1460,8 @@ def make_footnote_urls_clickable(html: str) -> str:
                     # Replace the original text node with the new contents
                     content.replace_with(*new_contents)
 
-    return str(soup)
 
-
-def fix_key_notation_link(html: str, page: str) -> str:
+def fix_key_notation_link(soup: BeautifulSoup, page: str) -> None:
     """
     Point the key-notation marker at the in-CHM page and make it superscript.
 
@@ -1194,34 +1472,26 @@ def fix_key_notation_link(html: str, page: str) -> str:
     used to resolve the link. Runs before fix_external_links so the now-internal
     link is not given target="_blank".
     """
-    soup = BeautifulSoup(html, "html.parser")
     relative = os.path.relpath(
         "language-reference-guide/key-to-notation.htm", os.path.dirname(page)
     )
-    changed = False
     for anchor in soup.find_all("a"):
         if anchor.get_text() == "\U0001f6c8":
             anchor["href"] = relative
             if anchor.has_attr("target"):
                 del anchor["target"]
             anchor.wrap(soup.new_tag("sup"))
-            changed = True
-    return str(soup) if changed else html
 
 
-def fix_external_links(html: str) -> str:
+def fix_external_links(soup: BeautifulSoup) -> None:
     """
     Fix external links for CHM compatibility.
     The Windows CHM viewer can open external links with target="_blank".
     This function adds the target attribute to all external HTTP/HTTPS links.
 
     Parameters:
-        html (str): The HTML content as a string.
-
-    Returns:
-        str: The modified HTML content.
+        soup (BeautifulSoup): The parsed HTML content, modified in place.
     """
-    soup = BeautifulSoup(html, "html.parser")
 
     # Find all external links
     for a_tag in soup.find_all("a", href=True):
@@ -1230,10 +1500,8 @@ def fix_external_links(html: str) -> str:
             # Add target="_blank" to open in external browser
             a_tag["target"] = "_blank"
 
-    return str(soup)
-
 
-def fix_apl_root_namespace_highlighting(html: str) -> str:
+def fix_apl_root_namespace_highlighting(soup: BeautifulSoup) -> None:
     """
     Fix incorrect syntax highlighting of '#' in APL code blocks.
 
@@ -1244,7 +1512,6 @@ def fix_apl_root_namespace_highlighting(html: str) -> str:
     and converts them to regular variable spans, preserving any actual APL
     comments that start with '⍝'.
     """
-    soup = BeautifulSoup(html, "html.parser")
 
     # Find all highlight divs (code blocks with syntax highlighting)
     for highlight_div in soup.find_all("div", class_="highlight"):
@@ -1258,40 +1525,20 @@ def fix_apl_root_namespace_highlighting(html: str) -> str:
                 # Change the class from comment to variable (nv = Name.Variable)
                 comment_span["class"] = ["nv"]
 
-    return str(soup)
 
-
-def find_image_references_in_markdown(md_files: List[str]) -> set:
+def image_paths(file: str, srcs: List[str]) -> List[str]:
     """
-    Find all image references in Markdown files.
-    Returns set of image filenames.
+    The source paths of the images a page refers to, from the src attributes in
+    its rendered HTML. These are relative to the page, as in its Markdown file.
+    Remote images and data: URLs are left out.
     """
-    image_refs = set()
-
-    # Regular expression for Markdown image syntax: ![alt](path/image.png)
-    md_img_pattern = r"!\[.*?\]\((.*?)\)"
-
-    # Regular expression for HTML image tags in Markdown: <img src="path/image.png">
-    html_img_pattern = r'<img[^>]*src=[\'"]([^\'"]+)[\'"][^>]*>'
-
-    for file in md_files:
-        try:
-            with open(file, "r", encoding="utf-8") as f:
-                content = f.read()
-
-                # Find Markdown-style image references
-                for match in re.findall(md_img_pattern, content):
-                    if not match.startswith(("http:", "https:", "data:")):
-                        image_refs.add(os.path.basename(match))
-
-                # Find HTML-style image references
-                for match in re.findall(html_img_pattern, content):
-                    if not match.startswith(("http:", "https:", "data:")):
-                        image_refs.add(os.path.basename(match))
-        except Exception as e:
-            print(f"Warning: Could not check images in {file}: {e}")
-
-    return image_refs
+    paths = []
+    for src in srcs:
+        if src.startswith(("http:", "https:", "data:", "//")):
+            continue
+        if src := unquote(src.split("#", 1)[0].split("?", 1)[0]):
+            paths.append(os.path.normpath(os.path.join(os.path.dirname(file), src)))
+    return paths
 
 
 def find_image_references_in_css(css_files: List[str]) -> set:
@@ -1321,24 +1568,26 @@ def find_image_references_in_css(css_files: List[str]) -> set:
 
 
 def filter_unused_images(
-    md_files: List[str], css_files: List[str], image_files: List[str]
+    pages: Iterable[ConvertedPage], css_files: List[str], image_files: List[str]
 ) -> List[str]:
     """
-    Filter out images that are not referenced in any Markdown or CSS files.
+    Filter out images that are not referenced by any converted page or CSS file.
+    Pages refer to images by their paths, found as they were converted; CSS files
+    by file name only.
     Returns filtered list of image files to include.
     """
-    # Find all image references from Markdown and CSS
-    md_referenced_images = find_image_references_in_markdown(md_files)
+    page_referenced_images = {path for page in pages for path in page.images}
     css_referenced_images = find_image_references_in_css(css_files)
 
-    referenced_images = md_referenced_images.union(css_referenced_images)
-
     # Filter image_files to only include referenced images
     used_images = []
     unused_images = []
 
     for img in image_files:
-        if os.path.basename(img) in referenced_images:
+        if (
+            os.path.normpath(img) in page_referenced_images
+            or os.path.basename(img) in css_referenced_images
+        ):
             used_images.append(img)
         else:
             unused_images.append(img)
@@ -1362,15 +1611,17 @@ def filter_unused_images(
     return used_images
 
 
-def add_langref_disambiguation_pages(root: Node, project: str) -> None:
+def add_langref_disambiguation_pages(
+    root: Node, pages: Dict[str, ConvertedPage]
+) -> None:
     """
     Add missing symbol files to the TOC as a post-processing step.
-    This function finds all converted HTML files in the symbols directory
+    This function finds all converted pages in the symbols directory
     and adds them to the "Symbols" node in the TOC if they aren't already there.
 
     Parameters:
         root (Node): The root node of the TOC tree
-        project (str): The project directory
+        pages (dict): The converted pages, by project-relative .htm name
     """
     print("Post-processing TOC to add Language Reference disambiguation pages...")
 
@@ -1413,15 +1664,18 @@ def add_langref_disambiguation_pages(root: Node, project: str) -> None:
         f"  Found Symbols node in TOC with {len(symbols_node.children)} existing entries"
     )
 
-    # Get the symbol html files from the project directory
-    symbols_dir = os.path.join(project, "language-reference-guide", "symbols")
-    if not os.path.isdir(symbols_dir):
-        print(f"  Warning: Symbols directory not found at {symbols_dir}")
+    # Get the converted symbol pages
+    symbols_dir = os.path.join("language-reference-guide", "symbols")
+    symbol_pages = {
+        os.path.basename(name): page
+        for name, page in pages.items()
+        if os.path.dirname(name) == symbols_dir
+    }
+    if not symbol_pages:
+        print(f"  Warning: No converted pages found in {symbols_dir}")
         return
 
-    # Get all HTML files in the symbols directory
-    html_files = [f for f in os.listdir(symbols_dir) if f.endswith(".htm")]
-    print(f"  Found {len(html_files)} HTML files in symbols directory")
+    print(f"  Found {len(symbol_pages)} HTML files in symbols directory")
 
     # Find which ones are already in the TOC
     existing_files = set()
@@ -1431,48 +1685,29 @@ def add_langref_disambiguation_pages(root: Node, project: str) -> None:
 
     print(f"  Found {len(existing_files)} files already in TOC")
 
-    # For each HTML file not in the TOC, extract its title and add it
+    # For each page not in the TOC, add it under the title it was converted with
     added_count = 0
-    for html_file in html_files:
+    for html_file, page in symbol_pages.items():
         # Skip if already in TOC
         if html_file in existing_files:
             continue
 
-        # Read the HTML file to extract its title
-        html_path = os.path.join(symbols_dir, html_file)
-        try:
-            with open(html_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-
-            # Extract the title from the HTML
-            soup = BeautifulSoup(html_content, "html.parser")
-            title = ""
-
-            # Try to find title in the head first
-            if title_tag := soup.find("title"):
-                title = title_tag.string.strip()
-
-            # If no title or title is too generic, try to find the name span in h1
-            if not title or title == "Dyalog APL":
-                if h1 := soup.find("h1", class_="heading"):
-                    if name_span := h1.find("span", class_="name"):
-                        title = name_span.string.strip()
-
-            # If still no title, use filename
-            if not title:
-                title = os.path.splitext(html_file)[0].replace("-", " ").title()
-
-            # Create a new node and add it to the Symbols node
-            node = Node(
-                title, f"symbols/{html_file}", symbols_node.depth + 1, symbols_node
-            )
-            node.html_name = f"language-reference-guide/symbols/{html_file}"
-            symbols_node.children.append(node)
-            added_count += 1
-            print(f"    Added: {title} -> {node.html_name}")
+        title = page.title
 
-        except Exception as e:
-            print(f"  Warning: Error processing {html_file}: {e}")
+        # If the title is too generic, use the name from the h1
+        if title == "Dyalog APL":
+            title = page.h1
+
+        # If still no title, use filename
+        if not title:
+            title = os.path.splitext(html_file)[0].replace("-", " ").title()
+
+        # Create a new node and add it to the Symbols node
+        node = Node(title, f"symbols/{html_file}", symbols_node.depth + 1, symbols_node)
+        node.html_name = f"language-reference-guide/symbols/{html_file}"
+        symbols_node.children.append(node)
+        added_count += 1
+        print(f"    Added: {title} -> {node.html_name}")
 
     if added_count > 0:
         print(f"  Added {added_count} additional symbol files to TOC")
@@ -1507,8 +1742,32 @@ if __name__ == "__main__":
         default=65001,
         help="CodePage to use (default: 65001 for UTF-8)",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for page conversion (default: 1)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Directory for the incremental page cache (default: no cache)",
+    )
+    parser.add_argument(
+        "--render-cache",
+        type=str,
+        metavar="DIR",
+        help="Directory for rendered Markdown, shared with mkdocs2pdf.py (default: no cache)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        metavar="FILE",
+        help="Write a JSON report of the time taken by each build phase and page step",
+    )
 
     args = parser.parse_args()
+    profile = Profile("mkdocs2chm", page_groups="guides")
 
     if not args.mkdocs_yml.endswith("mkdocs.yml"):
         sys.exit('--> expected a "mkdocs.yml" file')
@@ -1532,21 +1791,24 @@ if __name__ == "__main__":
             sys.exit(f"--> Error reading config file: {e}")
 
     # Parse mkdocs.yml
-    yml_data = parse_mkdocs_yml(args.mkdocs_yml, remove=excludes)
+    with profile.phase("parse_mkdocs_yml"):
+        yml_data = parse_mkdocs_yml(args.mkdocs_yml, remove=excludes)
 
     # Find top-level dirs and standalone files from nav
-    included_dirs, standalone_files = find_nav_files_and_dirs(
-        args.mkdocs_yml, remove=excludes
-    )
+    with profile.phase("find_nav_files_and_dirs"):
+        included_dirs, standalone_files = find_nav_files_and_dirs(
+            args.mkdocs_yml, remove=excludes
+        )
 
     version = yml_data["extra"].get("version_majmin")
     if not version:
         sys.exit(f"--> source mkdocs.yml has no Dyalog version set")
 
     # Find all source Markdown files from included directories
-    md_files_from_dirs, image_files = find_source_files(
-        os.path.dirname(args.mkdocs_yml), included_dirs
-    )
+    with profile.phase("find_source_files"):
+        md_files_from_dirs, image_files = find_source_files(
+            os.path.dirname(args.mkdocs_yml), included_dirs
+        )
 
     # Add standalone Markdown files from nav, with absolute paths
     standalone_files_abs = [
@@ -1578,11 +1840,8 @@ if __name__ == "__main__":
     yml_data["nav"].insert(0, "welcome.md")
 
     # Copy images and other static assets into the project
-    assets, css, css_files = static_assets(args.assets_dir, args.project_dir)
-
-    # Filter out unused images, considering both MD and CSS references
-    image_files = filter_unused_images(md_files, css_files, image_files)
-    copied_images = copy_images(image_files, project=args.project_dir)
+    with profile.phase("static_assets"):
+        assets, css, css_files = static_assets(args.assets_dir, args.project_dir)
 
     # Add git info and build date to macros
     macros = yml_data.get("extra", {})
@@ -1592,17 +1851,29 @@ if __name__ == "__main__":
         macros["build_date"] = args.build_date
 
     # Convert to HTML
-    html_files, excluded_files = convert_to_html(
-        md_files,
-        css,
-        macros=macros,
-        transforms=[table_captions],
-        project=args.project_dir,
-        top_level_files=standalone_files_abs,
-        version=version,
-    )
+    with profile.phase("convert_to_html"):
+        pages, excluded_files = convert_to_html(
+            md_files,
+            css,
+            macros=macros,
+            transforms=[table_captions],
+            project=args.project_dir,
+            top_level_files=standalone_files_abs,
+            version=version,
+            jobs=args.jobs,
+            cache_dir=args.cache_dir,
+            render_cache_dir=args.render_cache,
+            profile=profile,
+        )
 
-    # Remove excluded files from md_files for indexing
+    # Filter out unused images, considering both page and CSS references: the
+    # pages' are found as they are converted
+    with profile.phase("filter_unused_images"):
+        image_files = filter_unused_images(pages.values(), css_files, image_files)
+    with profile.phase("copy_images"):
+        copied_images = copy_images(image_files, project=args.project_dir)
+
+    # Excluded files are left out of the index
     md_files = [f for f in md_files if f not in excluded_files]
 
     if excluded_files:
@@ -1613,28 +1884,36 @@ if __name__ == "__main__":
             print(f"  - {os.path.basename(f)}")
 
     # Generate the CHM ToC
-    generate_toc(yml_data, project=args.project_dir)
+    with profile.phase("generate_toc"):
+        generate_toc(yml_data, pages, project=args.project_dir)
 
     # Generate the index
-    idx = generate_index_data(md_files)
-    write_index_data(idx, f"{args.project_dir}/_index.hhk")
+    with profile.phase("generate_index_data"):
+        idx = generate_index_data(pages.values())
+        write_index_data(idx, f"{args.project_dir}/_index.hhk")
 
     print(f"Converted {len(md_files)} Markdown files to HTML.")
 
     # No additional redirect helper pages
 
     # Generate the CHM project config file
-    chm_name = "dyalog.chm"
-    generate_hfp(
-        args.project_dir,
-        chm_name,
-        html_files,
-        copied_images,
-        assets,
-        title=f"Dyalog version {version}",
-        codepage=args.codepage,
-    )
+    with profile.phase("generate_hfp"):
+        chm_name = "dyalog.chm"
+        generate_hfp(
+            args.project_dir,
+            chm_name,
+            list(pages),
+            copied_images,
+            assets,
+            title=f"Dyalog version {version}",
+            codepage=args.codepage,
+        )
 
     # Run the compiler
-    output = Popen(["chmcmd", "dyalog.hfp"], cwd=args.project_dir)
-    output.wait()
+    try:
+        with profile.phase("chmcmd"):
+            output = Popen(["chmcmd", "dyalog.hfp"], cwd=args.project_dir)
+            output.wait()
+    finally:
+        if args.profile:
+            profile.write(args.profile)
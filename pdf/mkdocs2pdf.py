@@ -21,6 +21,9 @@ Optional switches:
     --disable-section-numbers            Disable print-style section numbers
     --screen                             Make screen-oriented PDF (no ToC, no section numbers)
     --html-only                          Generate unified HTML-file, but not PDF-conversion
+    --jobs N                             With --config, build up to N documents at once
+    --render-cache DIR                   Keep rendered Markdown in DIR, shared with mkdocs2chm.py
+    --profile FILE                       Write a JSON report of where the build spends its time
     --verbose                            Show verbose Weasyprint output 
 
 The results will end up as
@@ -36,22 +39,44 @@ For anyone tempted to change how the ToC is generated, remember Chesterton's Fen
 """
 
 import argparse
+from collections import deque
 from datetime import datetime
+import filecmp
+import functools
 import json
+import multiprocessing as mp
 import os
 import re
 import shutil
 from subprocess import Popen, run, CalledProcessError
 import sys
+import time
 from typing import Callable, Dict, Generator, Iterable, Iterator, List, Set, Tuple, Union
 
 from bs4 import BeautifulSoup
+from bs4.element import NavigableString, PreformattedString, Tag
 import markdown
 from markdown.extensions.toc import slugify_unicode
 from ruamel.yaml import YAML
 
+# The render stage, and the parser for HTML that is only read, shared with
+# chm/mkdocs2chm.py and the tools
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools", "utils")
+)
+from doc_utils import HTML_PARSER
+from page_render import (
+    RENDER_PACKAGES,
+    PageRenderer,
+    Profile,
+    RenderCache,
+    RenderProfile,
+    StepTimer,
+    tool_version,
+)
+
 FRONT_MATTER_RE = re.compile(
-    r"\A\ufeff?\s*---\s*\r?\n.*?\r?\n(?:---|\.\.\.)[ \t]*(?:\r?\n|$)",
+    r"\A\ufeff?\s*---\s*\r?\n(?P<yaml>.*?)\r?\n(?:---|\.\.\.)[ \t]*(?:\r?\n|$)",
     re.DOTALL,
 )
 
@@ -267,7 +292,9 @@ def extract_html_h1(data: str) -> str:
     """
     Some files will have a raw HTML <h1> for styling reasons.
     """
-    soup = BeautifulSoup(data, "html.parser")
+    if not re.search(r"<h1\b", data, flags=re.IGNORECASE):
+        return ""
+    soup = BeautifulSoup(data, HTML_PARSER)
     if h1 := soup.find("h1"):
         if name_span := h1.find("span", class_="name"):
             name = name_span.get_text() if name_span else None
@@ -318,20 +345,6 @@ def find_source_files(
         yield current_path, nav
 
 
-def expand_macros(data: str, macros: dict) -> str:
-    """
-    The mkdocs macro extension makes use of templates of the type {{ macro-id }} where
-    the substitution value is stored in the "extra:" section in the mkdocs.yml file.
-    """
-
-    def replace(match):
-        key = match.group(1).strip()
-        value = macros.get(key)
-        return str(value) if not isinstance(value, dict) else match.group(0)
-
-    return re.sub(r"\{\{\s*(.*?)\s*}}", replace, data)
-
-
 def slug(text: str) -> str:
     return re.sub(r"\W+", "-", text).lower()
 
@@ -340,8 +353,6 @@ def print_footnotes(soup: BeautifulSoup) -> None:
     """
     Convert to CSS-only footnotes style.
     """
-    from bs4.element import NavigableString, Tag
-
     # First, convert bare URLs in footnote content to clickable links
     footnote_div = soup.find("div", class_="footnote")
     if footnote_div and isinstance(footnote_div, Tag):
@@ -444,44 +455,69 @@ def add_caption(soup, table, caption_text, table_seq) -> None:
     table.insert(0, caption)
 
 
-def caption_tables(soup: BeautifulSoup) -> Dict[str, int]:
-    def is_chapter(tag):
-        return tag.name == "section" and tag.has_attr("data-chapter-seq")
-
-    tables = soup.find_all("table")
-
+def caption_tables(
+    soup: BeautifulSoup, chapter_seq: int, table_refs: Dict[str, str], table_seq: int = 1
+) -> int:
+    """
+    Caption the tables of an article in chapter chapter_seq, numbering them from
+    table_seq on, and record their ids in table_refs. Returns the next table number
+    in the chapter.
+    """
     custom_id_caption_re = re.compile(r"^\s*Table:\s*([^{]+)\s*\{:\s*#([^ }]+)\s*}\s*$")
     normal_caption_re = re.compile(r"^\s*Table:\s*(. *)\s*$")
 
-    table_refs: Dict[str, int] = {}
-
-    for section in soup.find_all(is_chapter):
-        table_seq = 1
-        for table in section.find_all("table"):
-            prev = table.find_previous_sibling()
-            if prev and prev.name == "p" and "Table:" in prev.text:
-                table_id: str = None
-                tref = f'{section["data-chapter-seq"]}-{table_seq}'
-                if match := custom_id_caption_re.match(prev.text):
-                    caption_text = match.group(1).strip()
-                    table_id = match.group(2).strip()
-                    add_caption(soup, table, caption_text, tref)
-                elif match := normal_caption_re.match(prev.text):
-                    caption_text = match.group(1).strip()
-                    table_id = f"_table-{tref}"
-                    add_caption(soup, table, caption_text, tref)
-                else:
-                    continue
+    for table in soup.find_all("table"):
+        prev = table.find_previous_sibling()
+        if prev and prev.name == "p" and "Table:" in prev.text:
+            table_id: str = None
+            tref = f"{chapter_seq}-{table_seq}"
+            if match := custom_id_caption_re.match(prev.text):
+                caption_text = match.group(1).strip()
+                table_id = match.group(2).strip()
+                add_caption(soup, table, caption_text, tref)
+            elif match := normal_caption_re.match(prev.text):
+                caption_text = match.group(1).strip()
+                table_id = f"_table-{tref}"
+                add_caption(soup, table, caption_text, tref)
+            else:
+                continue
 
-                if table_id in table_refs:
-                    print(f"WARNING: recurring table id: {table_id}")
+            if table_id in table_refs:
+                print(f"WARNING: recurring table id: {table_id}")
 
-                table_refs[table_id] = tref
-                prev.decompose()
-                table_seq += 1
-                table["id"] = table_id
+            table_refs[table_id] = tref
+            prev.decompose()
+            table_seq += 1
+            table["id"] = table_id
 
-    return table_refs
+    return table_seq
+
+
+def link_table_references(
+    soup: BeautifulSoup, table_refs: Dict[str, str], warn: bool = True
+) -> bool:
+    """
+    Give the links to tables (see make_fix_links) the number of the table as their
+    text. Returns False if any link is left unresolved, warning about it if warn.
+    """
+    resolved = True
+    for a_tag in soup.find_all("a", href=True):
+        if a_tag.get_text() != "TABLE-REFERENCE":
+            continue
+
+        href = a_tag["href"]
+        if table_id := table_refs.get(href[1:]):
+            a_tag.string = f"Table {table_id}"
+            if "class" in a_tag.attrs:
+                a_tag["class"].append("internal-link")
+            else:
+                a_tag["class"] = ["internal-link"]
+        else:
+            resolved = False
+            if warn:
+                print(f'--> Warning: could not find a matching table for id "{href}"')
+
+    return resolved
 
 
 def convert_examples(soup: BeautifulSoup) -> None:
@@ -503,6 +539,137 @@ def update_seq_stack(seq_stack, s):
     seq_stack[s] += 1
 
 
+# Articles are rendered with this in place of their id, which is put in afterwards:
+# the rendered HTML is then the same wherever the article is in a document.
+ARTICLE_ID = "\ue000"
+
+
+def article_slugify(value, separator):
+    """Heading ids are prefixed with the id of their article."""
+    return ARTICLE_ID + "-" + slugify_unicode(value, separator)
+
+
+def new_markdown(syntax_hilite: bool) -> markdown.Markdown:
+    """
+    A Markdown converter using the same extensions as used by our mkdocs setup.
+    """
+    extensions = [
+        "admonition",  # https://python-markdown.github.io/extensions/admonition/
+        "attr_list",  # https://python-markdown.github.io/extensions/attr_list/
+        "footnotes",  # https://python-markdown.github.io/extensions/footnotes/
+        "md_in_html",  # https://python-markdown.github.io/extensions/md_in_html/
+        "markdown_tables_extended",  # https://github.com/fumbles/tables_extended
+        "pymdownx.details",  # https://facelessuser.github.io/pymdown-extensions/extensions/details/
+        "toc",  # https://python-markdown.github.io/extensions/toc/
+    ]
+    if syntax_hilite:
+        extensions.append("pymdownx.superfences")
+    else:
+        extensions.append("fenced_code")
+
+    extension_configs = {"toc": {"slugify": article_slugify}}
+
+    return markdown.Markdown(extensions=extensions, extension_configs=extension_configs)
+
+
+@functools.lru_cache(maxsize=None)
+def markdown_converter(syntax_hilite: bool) -> markdown.Markdown:
+    """
+    The Markdown converter for this process. Building one sets up the full
+    extension stack, so it is done once and the converter reused for every file,
+    rather than per file as markdown.markdown() does. Use markdown_to_html().
+    """
+    return new_markdown(syntax_hilite)
+
+
+def markdown_to_html(md: str, syntax_hilite: bool) -> str:
+    """
+    Convert the Markdown of an article with the per-process converter, resetting
+    it first so that no state (footnotes, toc, stashed blocks) leaks between files.
+    """
+    converter = markdown_converter(syntax_hilite)
+    converter.reset()
+    return converter.convert(md)
+
+
+@functools.lru_cache(maxsize=None)
+def render_profile(syntax_hilite: bool) -> RenderProfile:
+    """
+    How articles are rendered for PDFs: see new_markdown(). The fingerprint covers
+    this script, so any change to it renders articles again.
+    """
+    return RenderProfile(
+        name="pdf" if syntax_hilite else "pdf-fenced-code",
+        convert=functools.partial(markdown_to_html, syntax_hilite=syntax_hilite),
+        front_matter_re=FRONT_MATTER_RE,
+        version=tool_version(__file__, RENDER_PACKAGES),
+    )
+
+
+def html_fragment(fragment: str) -> str:
+    """
+    A fragment of HTML as it comes out of BeautifulSoup. An unclosed opening tag
+    is returned without the closing tag BeautifulSoup adds.
+    """
+    html = str(BeautifulSoup(fragment, "html.parser"))
+    if match := re.match(r"<(\w+)[^>]*>$", fragment.strip()):
+        html = html.removesuffix(f"</{match.group(1)}>")
+    return html
+
+
+# Whitespace as seen by BeautifulSoup, which collapses whitespace-only text when parsing.
+WHITESPACE = " \n\t\f\r"
+
+
+def collapse_whitespace(tag: Tag, preserve: bool = False) -> None:
+    """
+    Collapse runs of whitespace-only text to a single newline (or a space, if the run
+    has no newline), outside <pre> and <textarea>. This is what BeautifulSoup does when
+    parsing, so the result is as if the transformed HTML had been parsed again.
+    """
+    preserve = preserve or tag.name in ("pre", "textarea")
+    run = []
+    for child in [*tag.contents, None]:
+        if isinstance(child, NavigableString) and not isinstance(
+            child, PreformattedString
+        ):
+            run.append(child)
+            continue
+
+        text = "".join(run)
+        if not preserve and text and text.strip(WHITESPACE) == "":
+            collapsed = "\n" if "\n" in text else " "
+            if len(run) > 1 or text != collapsed:
+                run[0].replace_with(collapsed)
+                for string in run[1:]:
+                    string.extract()
+        run = []
+
+        if isinstance(child, Tag):
+            collapse_whitespace(child, preserve)
+
+
+def join_html(fragments: Iterable[str]) -> str:
+    """
+    Concatenate serialised fragments of HTML, collapsing any whitespace-only text that
+    spans fragments as collapse_whitespace would.
+    """
+    joined = []
+    for fragment in fragments:
+        if joined:
+            tail = joined[-1][joined[-1].rfind(">") + 1 :]
+            head = fragment[: fragment.find("<")] if "<" in fragment else fragment
+            text = tail + head
+            if tail and head and text.strip(WHITESPACE) == "":
+                joined[-1] = joined[-1][: len(joined[-1]) - len(tail)]
+                fragment = ("\n" if "\n" in text else " ") + fragment[len(head) :]
+        joined.append(fragment)
+    return "".join(joined)
+
+
+profile = Profile("mkdocs2pdf", phase_groups="documents")
+
+
 def convert_to_html(
     filenames: Iterator[str],
     prefix: str,
@@ -514,71 +681,94 @@ def convert_to_html(
     syntax_hilite: bool = True,
     git_info="",
     build_date="",
+    front_pages="",
+    documents: Dict[str, str] = None,
+    rewrite_links: bool = True,
+    version_majmin: str = "",
+    timings: Dict[str, Dict[str, float]] = None,
+    render_cache: RenderCache = None,
 ) -> Tuple[Dict[str, str], str, Dict[str, str]]:
     """
     Markdown to HTML, using the same markdown extensions as our mkdocs site. Concatenate all converted files
-    into a single HTML file, wrapping into <section>s of <article>s.
+    into a single HTML file, wrapping into <section>s of <article>s, preceded by the front_pages HTML.
+
+    The document-wide transforms (table captions, links, headings) are applied to each article
+    as it is converted, so the unified file is never parsed as a whole. For that, the document's
+    structure (article ids and section numbers) is laid out before any file is converted.
+
+    If timings is given, the time each file spent in each conversion step is recorded in it.
+
+    With a render_cache, files rendered before, by this or an earlier build, are not rendered
+    again (see page_render.RenderCache).
     """
+    renderer = PageRenderer(render_profile(syntax_hilite), macros, transforms, cache=render_cache)
 
-    def process_markdown(file_path, article_id, remove_first_heading=False):
+    def process_markdown(
+        file_path, article_id, timer, remove_first_heading=False, shift_level=None
+    ):
         """
         Convert Markdown to HTML, using the same extensions as used by our mkdocs setup.
+        If shift_level is given, headings are shifted to fit the article's nesting.
         """
-        extensions = [
-            "admonition",  # https://python-markdown.github.io/extensions/admonition/
-            "attr_list",  # https://python-markdown.github.io/extensions/attr_list/
-            "footnotes",  # https://python-markdown.github.io/extensions/footnotes/
-            "md_in_html",  # https://python-markdown.github.io/extensions/md_in_html/
-            "markdown_tables_extended",  # https://github.com/fumbles/tables_extended
-            "pymdownx.details",  # https://facelessuser.github.io/pymdown-extensions/extensions/details/
-            "toc",  # https://python-markdown.github.io/extensions/toc/
-        ]
-        if syntax_hilite:
-            extensions.append("pymdownx.superfences")
-        else:
-            extensions.append("fenced_code")
-
-        def custom_slugify(value, separator):
-            return article_id + "-" + slugify_unicode(value, separator)
-
-        extension_configs = {"toc": {"slugify": custom_slugify}}
-
         with open(file_path, "r", encoding="utf-8") as f:
             md = f.read()
+        timer.lap("read")
 
-        # Strip YAML front matter if present (handles optional BOM and CRLF endings)
-        md = FRONT_MATTER_RE.sub("", md, count=1)
-
-        # Apply macros and any pre-html transforms
-        md = expand_macros(md, macros)
-        for fun in transforms:
-            md = fun(md)
-
-        # Convert to HTML
-        body = markdown.markdown(
-            md, extensions=extensions, extension_configs=extension_configs
-        )
+        # Strip YAML front matter if present (handles optional BOM and CRLF endings),
+        # apply macros and any pre-html transforms, and convert to HTML.
+        page = renderer.render(md, timer.lap)
+        body = page.html.replace(ARTICLE_ID, article_id)
         soup = BeautifulSoup(body, "html.parser")
+        timer.lap("parse_html")
 
         # Optionally remove the first h1 heading
         if remove_first_heading:
             if h1 := soup.find("h1"):
                 h1.decompose()
 
+        if shift_level is not None:
+            shift_headings(soup, shift_level, article_id)
+        timer.lap("shift_headings")
+
         # Apply standard processing
         print_footnotes(soup)
+        timer.lap("print_footnotes")
         clean_img_src(soup)
+        timer.lap("clean_img_src")
         convert_examples(soup)
+        timer.lap("convert_examples")
 
-        return str(soup).replace("``", "")
+        # Empty code blocks aren't rendered correctly: dropping them needs a reparse.
+        # Otherwise, tidy up the whitespace the transforms left, as a reparse would.
+        html = str(soup)
+        if "``" in html:
+            soup = BeautifulSoup(html.replace("``", ""), "html.parser")
+        else:
+            collapse_whitespace(soup)
+        timer.lap("collapse_whitespace")
+        return soup
 
-    # Initialise TOC and articles content
-    toc = """
+    def finish_article(soup, timer):
+        """
+        The final HTML of an article, once all but the heading transforms are done.
+        """
+        toc_friendly_headings(soup)
+        html = str(soup)
+        timer.lap("finish_article")
+        return html
+
+    # Initialise TOC and articles content. Both are assembled as lists of
+    # fragments, joined once at the end. Article contents are filled in once
+    # the whole structure is known.
+    toc = [
+        """
 <article id="contents">
     <h2 class="contents">Contents</h2>
     <ul>
 """
-    articles = ""
+    ]
+    articles = []
+    pending = []  # (index in articles, file, article id, is top level, shift, chapter)
     section_stack = []
     chapter_number = 0
     front_matter = ' class="front-matter"'
@@ -586,13 +776,13 @@ def convert_to_html(
     seq_stack = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
     path_to_id = {}  # New mapping from file paths to article IDs
 
-    # Process all files
+    # Lay out the document structure
     for keypath, file in filenames:
         # Close any sections that need to be closed
         while section_stack and len(section_stack[-1]) >= len(keypath):
             section_stack.pop()
-            toc += "</ul></li>\n"
-            articles += "</section>\n"
+            toc.append("</ul></li>\n")
+            articles.append("</section>\n")
 
         # Case 1: Directory/Section entry
         if file == "":
@@ -609,11 +799,17 @@ def convert_to_html(
             if heading_level == 1:
                 chapter_number += 1
                 front_matter = ""
-                articles += f'<section id="{section_id}" data-chapter-seq="{chapter_number}">\n<h1 id="{section_id}-header" class="chapter">{heading_text}</h1>\n'
-                toc += f'<li class="toc-chapter"><a href="#{section_id}-header" class="toc"></a><ul class="first-level">\n'
+                articles.append(html_fragment(f'<section id="{section_id}" data-chapter-seq="{chapter_number}">'))
+                articles.append("\n")
+                articles.append(html_fragment(f'<h1 id="{section_id}-header" class="chapter">{heading_text}</h1>'))
+                articles.append("\n")
+                toc.append(f'<li class="toc-chapter"><a href="#{section_id}-header" class="toc"></a><ul class="first-level">\n')
             else:
-                articles += f'<section id="{section_id}">\n<h{heading_level} id="{section_id}-header">{heading_text}</h{heading_level}>\n'
-                toc += f'<li{front_matter}><a href="#{section_id}-header" class="toc"></a><ul>\n'
+                articles.append(html_fragment(f'<section id="{section_id}">'))
+                articles.append("\n")
+                articles.append(html_fragment(f'<h{heading_level} id="{section_id}-header">{heading_text}</h{heading_level}>'))
+                articles.append("\n")
+                toc.append(f'<li{front_matter}><a href="#{section_id}-header" class="toc"></a><ul>\n')
             continue
 
         # Case 2: Top-level file (treat as chapter)
@@ -627,13 +823,15 @@ def convert_to_html(
             # Create section for this chapter
             section_id = slug(heading_text)
             heading_id = f"{section_id}-header"
-            articles += (
-                f'<section id="{section_id}" data-chapter-seq="{chapter_number}">\n'
+            articles.append(
+                html_fragment(f'<section id="{section_id}" data-chapter-seq="{chapter_number}">')
             )
-            articles += f'<h1 id="{heading_id}" class="chapter">{heading_text}</h1>\n'
+            articles.append("\n")
+            articles.append(html_fragment(f'<h1 id="{heading_id}" class="chapter">{heading_text}</h1>'))
+            articles.append("\n")
 
             # Add to TOC
-            toc += f'<li class="toc-chapter"><a href="#{heading_id}" class="toc"></a><ul class="first-level">\n'
+            toc.append(f'<li class="toc-chapter"><a href="#{heading_id}" class="toc"></a><ul class="first-level">\n')
 
             # Update section stack and numbering
             section_stack.append(keypath)
@@ -659,43 +857,108 @@ def convert_to_html(
         if not is_top_level:
             # Use the YAML key text if available, otherwise empty
             toc_text = keypath[-1] if keypath else ""
-            toc += f'<li{front_matter}><a href="#{article_id}-header" class="toc">{toc_text}</a></li>\n'
-
-        # Process and add article content
-        articles += f'<article id="{article_id}">\n'
-        html_content = process_markdown(
-            os.path.join(prefix, file),
-            article_id,  # Pass article_id to process_markdown
-            remove_first_heading=is_top_level,
+            toc.append(f'<li{front_matter}><a href="#{article_id}-header" class="toc">{toc_text}</a></li>\n')
+
+        # Reserve the article's place. For non-top-level files, the headings are
+        # shifted to fit the article's nesting. Tables are numbered by chapter.
+        articles.append(html_fragment(f'<article id="{article_id}">'))
+        articles.append("\n")
+        pending.append(
+            (
+                len(articles),
+                file,
+                article_id,
+                is_top_level,
+                None if is_top_level else len(section_stack),
+                chapter_number if section_stack else None,
+            )
         )
-
-        # For non-top-level files, handle headings
-        if not is_top_level:
-            soup = BeautifulSoup(html_content, "html.parser")
-            shift_headings(soup, len(section_stack), article_id)
-            html_content = str(soup)
-
-        articles += html_content
-        articles += "\n</article>\n"
-
-        # For top-level files, we're done with this file
-        if is_top_level:
-            continue
+        articles.append(None)
+        articles.append("\n</article>\n")
 
     # Close any remaining open sections
     while section_stack:
         section_stack.pop()
-        toc += "</ul></li>\n"
-        articles += "</section>\n"
+        toc.append("</ul></li>\n")
+        articles.append("</section>\n")
+
+    # Time what building a Markdown converter costs, once the extension modules
+    # have been imported, to report what reusing one saves.
+    markdown_converter(syntax_hilite)
+    start = time.perf_counter()
+    new_markdown(syntax_hilite)
+    build_time = time.perf_counter() - start
+
+    # Convert and transform each article. References to tables further on in the
+    # document can only be resolved once those have been captioned.
+    documents = documents or {}
+    table_refs: Dict[str, str] = {}
+    table_seqs: Dict[int, int] = {}  # Next table number in each chapter
+    unresolved = []
+    timers = {}
+    for index, file, article_id, is_top_level, shift_level, chapter in pending:
+        timer = timers[index] = StepTimer()
+        soup = process_markdown(
+            os.path.join(prefix, file),
+            article_id,  # Pass article_id to process_markdown
+            timer,
+            remove_first_heading=is_top_level,
+            shift_level=shift_level,
+        )
+        if chapter is not None:
+            table_seqs[chapter] = caption_tables(
+                soup, chapter, table_refs, table_seqs.get(chapter, 1)
+            )
+        timer.lap("caption_tables")
+        normalise_links(
+            soup,
+            documents,
+            section_map,
+            path_to_id,
+            rewrite_links=rewrite_links,
+            version_majmin=version_majmin,
+            article_id=article_id,
+        )
+        timer.lap("normalise_links")
+        resolved = link_table_references(soup, table_refs, warn=False)
+        timer.lap("link_table_references")
+        if resolved:
+            articles[index] = finish_article(soup, timer)
+        else:
+            articles[index] = soup
+            unresolved.append(index)
+
+    for index in unresolved:
+        soup = articles[index]
+        timer = timers[index]
+        timer.resume()
+        link_table_references(soup, table_refs)
+        timer.lap("link_table_references")
+        articles[index] = finish_article(soup, timer)
+
+    if timings is not None:
+        for index, file, *_ in pending:
+            timings[file] = timers[index].steps
+
+    reused = max(len(path_to_id) - 1, 0)
+    print(
+        f"Markdown converter: reused for {reused} files, "
+        f"saving ~{reused * build_time:.1f}s ({build_time * 1000:.1f}ms per file)"
+    )
 
     # Finish TOC
-    toc += """
+    toc.append(
+        """
     </ul>
 </article>
 """
+    )
+    toc = "".join(toc)
 
-    # Assemble final HTML
-    result = f"""
+    # Assemble final HTML: everything but the articles goes through the same
+    # transforms, and the articles take the place of the marker.
+    marker = "<!--articles-->"
+    shell = f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -708,14 +971,35 @@ def convert_to_html(
     {'<link rel="stylesheet" href="assets/styles/sections.css">' if enumerate_sections else ''}
     <title>{title}</title>
 </head>
-<body>
+<body>{front_pages}
     <div id="title">{title}</div>
     <div style="string-set: build-info '{build_date} ({git_info})'"></div>
     {'<section>' + toc + '</section>' if create_toc else ''}
-    {articles}
+    {marker}
 </body>
 </html>
 """
+    soup = BeautifulSoup(shell, "html.parser")
+    normalise_links(
+        soup,
+        documents,
+        section_map,
+        path_to_id,
+        rewrite_links=rewrite_links,
+        version_majmin=version_majmin,
+    )
+    link_table_references(soup, table_refs)
+    toc_friendly_headings(soup)
+
+    # Insert link to title page CSS
+    css_link = soup.new_tag(
+        "link", rel="stylesheet", href="assets/styles/title-page.css"
+    )
+    soup.head.append(css_link)
+
+    before, after = str(soup).split(marker, 1)
+    result = join_html([before, *articles, after])
+
     return section_map, result, path_to_id  # Return path_to_id
 
 
@@ -824,16 +1108,19 @@ def make_fix_links(current_doc: str, doc_roots: Iterable[str]) -> Callable[[str]
 def normalise_links(
     soup: BeautifulSoup,
     documents: Dict[str, str],
-    table_refs: Dict[str, int],
     section_map: Dict[str, str],
     path_to_id: Dict[str, str],
     rewrite_links: bool = True,
     version_majmin: str = "",
+    article_id: str = None,
 ) -> None:
     """
     Rewrite internal links to point to correct article IDs within the single HTML file using file path resolution.
     Optionally rewrite link text to section numbers for print-friendliness.
     Also handles /files/ links with .pdf or .docx extensions, converting them to docs.dyalog.com URLs.
+    Links to tables are left to link_table_references.
+
+    If the soup is the content of a single article, rather than wrapped in an <article>, article_id gives its id.
     """
 
     def in_table(tag):
@@ -854,17 +1141,15 @@ def normalise_links(
         # Convert slug to readable text
         return text.replace("-", " ").title()
 
+    def parent_article_id(tag):
+        # The id of the article a tag is in, if any
+        if parent_article := tag.find_parent("article"):
+            return parent_article.get("id")
+        return article_id
+
     # Create inverse mapping from article IDs to file paths
     id_to_path = {v: k for k, v in path_to_id.items()}
 
-    # Find all articles and their IDs, excluding copyright page
-    articles = soup.find_all("article")
-    article_ids = {
-        article["id"]
-        for article in articles
-        if not article.get("class") or "copyright-page" not in article.get("class")
-    }
-
     # Process all <a> tags
     for a_tag in soup.find_all("a", href=True):
         href = a_tag["href"]
@@ -874,14 +1159,6 @@ def normalise_links(
 
         a_text = a_tag.get_text()
         if a_text == "TABLE-REFERENCE":
-            if table_id := table_refs.get(href[1:]):
-                a_tag.string = f"Table {table_id}"
-                if "class" in a_tag.attrs:
-                    a_tag["class"].append("internal-link")
-                else:
-                    a_tag["class"] = ["internal-link"]
-            else:
-                print(f'--> Warning: could not find a matching table for id "{href}"')
             continue
 
         # Check for /files/ links with .pdf or .docx extensions
@@ -912,10 +1189,8 @@ def normalise_links(
                 # This is an anchor-only link within the same document
                 # But skip TOC links which are handled elsewhere
                 if anchor and "toc" not in a_tag.get("class", []):
-                    parent_article = a_tag.find_parent("article")
-                    if parent_article and "id" in parent_article.attrs:
-                        article_id = parent_article["id"]
-                        new_href = f"#{article_id}-{anchor}"
+                    if (source_id := parent_article_id(a_tag)) is not None:
+                        new_href = f"#{source_id}-{anchor}"
                         a_tag["href"] = new_href
                 continue
 
@@ -937,9 +1212,7 @@ def normalise_links(
                     print(f"--> Warning: can't resolve absolute link '{href}'")
             else:
                 # Internal link: resolve using source file path
-                parent_article = a_tag.find_parent("article")
-                if parent_article and "id" in parent_article.attrs:
-                    source_id = parent_article["id"]
+                if (source_id := parent_article_id(a_tag)) is not None:
                     if source_id in id_to_path:
                         source_path = id_to_path[source_id]
                         source_dir = os.path.dirname(source_path)
@@ -1044,8 +1317,83 @@ def toplevel_docs(nav: List[Dict[str, str]]) -> Dict[str, str]:
     return result
 
 
-def process_document(document_path):
-    """Process a single document directory."""
+def document_source_dir(document_path: str) -> str:
+    """The docs/ directory of a document, next to its mkdocs.yml."""
+    return str(
+        os.path.join(
+            os.path.abspath(os.path.dirname(args.mkdocs_yml)),
+            document_path.rstrip("/"),
+            "docs",
+        )
+    )
+
+
+def document_size(document_path: str) -> int:
+    """
+    Total size of a document's Markdown sources: a cheap proxy for how long it
+    takes to build.
+    """
+    size = 0
+    for root, _, files in os.walk(document_source_dir(document_path)):
+        size += sum(
+            os.path.getsize(os.path.join(root, f)) for f in files if f.endswith(".md")
+        )
+    return size
+
+
+def stage_images(document_paths: List[str]) -> None:
+    """
+    Copy the img dirs of all documents into a single img dir in the project, for
+    documents built concurrently. Documents must agree on the content of any
+    image path they share.
+    """
+    img_dest_dir = str(os.path.join(args.project_dir, "img"))
+    if os.path.exists(img_dest_dir):
+        shutil.rmtree(img_dest_dir)
+
+    owners = {}
+    for document_path in document_paths:
+        img_src_dir = os.path.join(document_source_dir(document_path), "img")
+        for root, _, files in os.walk(img_src_dir):
+            for f in files:
+                src = os.path.join(root, f)
+                rel = os.path.relpath(src, img_src_dir)
+                dst = os.path.join(img_dest_dir, rel)
+                if rel in owners:
+                    if not filecmp.cmp(owners[rel], src, shallow=False):
+                        sys.exit(
+                            f'--> image "{rel}" differs between documents: '
+                            "build with --jobs 1"
+                        )
+                    continue
+                owners[rel] = src
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+
+
+def weasyprint_command(document_path: str, doc_metadata: dict) -> List[str]:
+    """The command line converting a document's unified HTML-file to PDF."""
+    output_filename = (
+        doc_metadata.get("filename", f"{document_path}.pdf")
+        if doc_metadata
+        else f"{document_path}.pdf"
+    )
+
+    # Set base URL to help WeasyPrint resolve relative paths (especially for images in CSS)
+    base_url = f"file://{os.path.abspath(args.project_dir)}/"
+    cmd = ["weasyprint", "--base-url", base_url, f"{document_path}.htm", output_filename]
+    if not args.verbose:
+        cmd.append("--quiet")
+
+    return cmd
+
+
+def process_document(document_path, stage=True):
+    """
+    Process a single document directory. Unless stage is False, the document's
+    images are copied to the project, and its PDF is made once the HTML is done.
+    Otherwise, returns the WeasyPrint command (or None, if only making HTML).
+    """
     if document_path.endswith("/"):
         document_path = document_path[:-1]
 
@@ -1077,40 +1425,27 @@ def process_document(document_path):
             sys.exit(f'--> document mkdocs.yml file "{doc_mkdocs_file}" not found.')
 
     # Parse the mkdocs.yml file of our actual document
-    yml_data = parse_mkdocs_yml(doc_mkdocs_file, remove=excludes)
+    with profile.phase(f"{document_path}/parse_mkdocs_yml"):
+        yml_data = parse_mkdocs_yml(doc_mkdocs_file, remove=excludes)
 
     # Find all source Markdown files in depth-first traversal order
-    md_files = find_source_files(os.path.dirname(doc_mkdocs_file), yml_data["nav"])
+    with profile.phase(f"{document_path}/find_source_files"):
+        md_files = find_source_files(os.path.dirname(doc_mkdocs_file), yml_data["nav"])
 
     # Copy img dir for this document
     img_src_dir = str(os.path.join(os.path.dirname(doc_mkdocs_file), "docs", "img"))
     img_dest_dir = str(os.path.join(args.project_dir, "img"))
     
-    if os.path.exists(img_src_dir):
-        if os.path.exists(img_dest_dir):
-            shutil.rmtree(img_dest_dir)
-        copy_directory(img_src_dir, img_dest_dir)
-
-    # Convert each Markdown file to HTML, and concatenate to a single string
-    source = f"{args.project_dir}/{document_path}.htm"
-    section_map, html_content, path_to_id = convert_to_html(  # Receive path_to_id
-        md_files,
-        prefix=os.path.join(os.path.dirname(doc_mkdocs_file), "docs"),
-        title=yml_data["site_name"],
-        macros=top_mkdocs_data.get("extra", {}),
-        transforms=[make_fix_links(document_path, DOC_ROOTS)],
-        create_toc=args.toc,
-        enumerate_sections=args.enumerate_sections,
-        syntax_hilite=args.syntax_hilite,
-        git_info=git_info,
-        build_date=build_date,
-    )
-
-    # Global transforms on the unified HTML-file.
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    # Add the title page if metadata is available
+    if stage and os.path.exists(img_src_dir):
+        with profile.phase(f"{document_path}/copy_images"):
+            if os.path.exists(img_dest_dir):
+                shutil.rmtree(img_dest_dir)
+            copy_directory(img_src_dir, img_dest_dir)
+
+    # Title and copyright pages, if metadata is available
+    front_pages = ""
     if doc_metadata:
+        soup = BeautifulSoup("", "html.parser")
         version_majmin = top_mkdocs_data["extra"].get("version_majmin", "")
         title_page = create_title_page(
             soup,
@@ -1119,9 +1454,6 @@ def process_document(document_path):
             version_majmin,
         )
 
-        # Insert title page at the start of the body
-        soup.body.insert(0, title_page)
-
         # Add copyright page
         copyright_html = format_copyright(
             f"{doc_metadata.get('title')} {doc_metadata.get('subtitle', '')}",
@@ -1136,48 +1468,148 @@ def process_document(document_path):
         copyright_article.append(copyright_soup)
         copyright_section.append(copyright_article)
 
-        # Insert copyright section after the title page
-        title_page.insert_after(copyright_section)
+        # The copyright section goes after the title page
+        front_pages = str(title_page) + str(copyright_section)
 
-    table_refs = caption_tables(soup)
+    # Convert each Markdown file to HTML, and concatenate to a single string.
+    # The document-wide transforms are applied as part of this.
+    source = f"{args.project_dir}/{document_path}.htm"
     version_majmin = top_mkdocs_data.get("extra", {}).get("version_majmin", "")
-    normalise_links(
-        soup,
-        documents,
-        table_refs,
-        section_map,
-        path_to_id,
-        rewrite_links=args.link_rewrite,
-        version_majmin=version_majmin,
-    )
-    toc_friendly_headings(soup)
-
-    # Insert link to title page CSS
-    css_link = soup.new_tag(
-        "link", rel="stylesheet", href="assets/styles/title-page.css"
-    )
-    soup.head.append(css_link)
-
-    html_content = str(soup)
+    timings = {}
+    with profile.phase(f"{document_path}/convert_to_html"):
+        _, html_content, _ = convert_to_html(
+            md_files,
+            prefix=os.path.join(os.path.dirname(doc_mkdocs_file), "docs"),
+            title=yml_data["site_name"],
+            macros=top_mkdocs_data.get("extra", {}),
+            transforms=[make_fix_links(document_path, DOC_ROOTS)],
+            create_toc=args.toc,
+            enumerate_sections=args.enumerate_sections,
+            syntax_hilite=args.syntax_hilite,
+            git_info=git_info,
+            build_date=build_date,
+            front_pages=front_pages,
+            documents=documents,
+            rewrite_links=args.link_rewrite,
+            version_majmin=version_majmin,
+            timings=timings,
+            render_cache=RenderCache(args.render_cache) if args.render_cache else None,
+        )
+    for file, steps in timings.items():
+        profile.pages[f"{document_path}/{file}"] = steps
 
     with open(source, "w", encoding="utf-8") as f:
         f.write(html_content)
 
-    if not args.html_only:
-        output_filename = (
-            doc_metadata.get("filename", f"{document_path}.pdf")
-            if doc_metadata
-            else f"{document_path}.pdf"
-        )
+    if args.html_only:
+        return None
 
-        # Set base URL to help WeasyPrint resolve relative paths (especially for images in CSS)
-        base_url = f"file://{os.path.abspath(args.project_dir)}/"
-        cmd = ["weasyprint", "--base-url", base_url, f"{document_path}.htm", output_filename]
-        if not args.verbose:
-            cmd.append("--quiet")
+    cmd = weasyprint_command(document_path, doc_metadata)
+    if not stage:
+        return cmd
 
+    with profile.phase(f"{document_path}/weasyprint"):
         output = Popen(cmd, cwd=args.project_dir)
         output.wait()
+    return None
+
+
+def init_worker(state: dict) -> None:
+    """Set the globals process_document relies on in each worker process."""
+    globals().update(state)
+
+
+def render_document(document_path: str) -> Tuple[str, List[str], Profile]:
+    """
+    Make a document's unified HTML-file in a worker process. Returns the WeasyPrint
+    command, and the timings of the document's build.
+    """
+    global profile
+    print(f"=== building: {document_path} ===")
+    profile = Profile(profile.tool)
+    try:
+        return document_path, process_document(document_path, stage=False), profile
+    except SystemExit as e:
+        # A worker can't end the build itself: hand the reason to the parent.
+        raise RuntimeError(e.code) from None
+
+
+def build_documents(document_paths: List[str], jobs: int) -> None:
+    """
+    Build several documents concurrently. Up to jobs worker processes make the
+    unified HTML-files, and up to jobs WeasyPrint processes convert them to PDF,
+    each started as soon as its HTML-file is ready. The longest documents go
+    first, so that the total time approaches that of the longest document rather
+    than the sum of all of them.
+    """
+    document_paths = sorted(document_paths, key=document_size, reverse=True)
+    with profile.phase("stage_images"):
+        stage_images(document_paths)
+
+    state = {
+        "args": args,
+        "top_mkdocs_data": top_mkdocs_data,
+        "documents": documents,
+        "excludes": excludes,
+        "git_info": git_info,
+        "build_date": build_date,
+        "DOC_ROOTS": DOC_ROOTS,
+    }
+    ready = deque()  # (document, WeasyPrint command) waiting for a free slot
+    running = []  # (document, WeasyPrint process, start time)
+    finished = set()  # Documents done with, whether or not their PDF was made
+    failed = []  # Documents whose WeasyPrint process failed
+    remaining = len(document_paths)
+    try:
+        with mp.Pool(processes=jobs, initializer=init_worker, initargs=(state,)) as pool:
+            results = pool.imap_unordered(render_document, document_paths)
+            while remaining or ready or running:
+                if remaining:
+                    try:
+                        document_path, cmd, timings = results.next(timeout=0.1)
+                        remaining -= 1
+                        profile.merge(timings)
+                        if cmd:
+                            ready.append((document_path, cmd))
+                        else:
+                            finished.add(document_path)
+                    except mp.TimeoutError:
+                        pass
+                    except RuntimeError as e:
+                        sys.exit(str(e))
+                else:
+                    time.sleep(0.1)
+
+                still_running = []
+                for document_path, proc, start in running:
+                    if proc.poll() is None:
+                        still_running.append((document_path, proc, start))
+                    else:
+                        profile.add_phase(
+                            f"{document_path}/weasyprint", time.perf_counter() - start
+                        )
+                        finished.add(document_path)
+                        if proc.returncode != 0:
+                            failed.append(document_path)
+                running = still_running
+                while ready and len(running) < jobs:
+                    document_path, cmd = ready.popleft()
+                    proc = Popen(cmd, cwd=args.project_dir)
+                    running.append((document_path, proc, time.perf_counter()))
+    except BaseException:
+        # The build is abandoned: say what didn't get built.
+        if unfinished := [path for path in document_paths if path not in finished]:
+            print(f"--> not built: {', '.join(unfinished)}", file=sys.stderr)
+        raise
+    finally:
+        for _, proc, _ in running:
+            if proc.poll() is None:
+                proc.terminate()
+        for _, proc, _ in running:
+            proc.wait()
+
+    if failed:
+        sys.exit(f"--> WeasyPrint failed for: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
@@ -1246,6 +1678,24 @@ if __name__ == "__main__":
         action="store_true",
         help="Generate unified HTML-file, but not PDF-conversion",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="With --config, number of documents to build concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--render-cache",
+        type=str,
+        metavar="DIR",
+        help="Directory for rendered Markdown, shared with mkdocs2chm.py (default: no cache)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        metavar="FILE",
+        help="Write a JSON report of the time taken by each build phase and article step",
+    )
 
     args = parser.parse_args()
 
@@ -1296,12 +1746,14 @@ if __name__ == "__main__":
             )
             args.screen = config["settings"].get("screen", args.screen)
             args.html_only = config["settings"].get("html_only", args.html_only)
+            args.jobs = config["settings"].get("jobs", args.jobs)
 
     git_info = get_git_info(os.path.dirname(args.mkdocs_yml))
     build_date = get_build_date()
 
     # Parse the top-level config
-    top_mkdocs_data = parse_mkdocs_yml(args.mkdocs_yml, remove=args.exclude)
+    with profile.phase("parse_mkdocs_yml"):
+        top_mkdocs_data = parse_mkdocs_yml(args.mkdocs_yml, remove=args.exclude)
 
     version = top_mkdocs_data["extra"].get("version_majmin")
     if not version:
@@ -1316,16 +1768,24 @@ if __name__ == "__main__":
 
     # Prepare static assets (done once for all documents)
     os.makedirs(args.project_dir, exist_ok=True)
-    static_assets(args.assets_dir, args.project_dir)
+    with profile.phase("static_assets"):
+        static_assets(args.assets_dir, args.project_dir)
 
     # Process documents
-    if args.config:
-        if not isinstance(config.get("documents"), dict):
-            sys.exit('--> config file must contain a "documents" dictionary')
-        DOC_ROOTS = set(config["documents"].keys())
-        for doc in config["documents"]:
-            print(f"=== building: {doc} ===")
-            process_document(doc)
-    else:
-        DOC_ROOTS = {args.document}
-        process_document(args.document)
+    try:
+        if args.config:
+            if not isinstance(config.get("documents"), dict):
+                sys.exit('--> config file must contain a "documents" dictionary')
+            DOC_ROOTS = set(config["documents"].keys())
+            if args.jobs > 1:
+                build_documents(list(config["documents"]), args.jobs)
+            else:
+                for doc in config["documents"]:
+                    print(f"=== building: {doc} ===")
+                    process_document(doc)
+        else:
+            DOC_ROOTS = {args.document}
+            process_document(args.document)
+    finally:
+        if args.profile:
+            profile.write(args.profile)
@@ -150,7 +150,26 @@ def page_url(guide, relpath):
     return "/" + posixpath.join(guide, p).strip("/") + "/"
 
 
-def resolve_link(root, guides, srcdir, pageurl, target):
+class Tree:
+    """Every directory listing under root, read once. resolve_link probes up to
+    four paths per link; looking them up here saves a stat call each."""
+
+    def __init__(self, root):
+        self.listing = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            self.listing[os.path.normpath(dirpath)] = set(dirnames) | set(filenames)
+            dirnames[:] = [d for d in dirnames if d != ".git"]
+
+    def exists(self, path):
+        path = os.path.normpath(path)
+        parent, name = os.path.split(path)
+        if parent in self.listing:
+            return name in self.listing[parent]
+        # Not below root, or below a directory that wasn't walked (.git, symlinks)
+        return os.path.exists(path)
+
+
+def resolve_link(root, guides, srcdir, pageurl, target, tree=None):
     """True if a relative link resolves.
 
     Two rules, and both are needed:
@@ -165,7 +184,8 @@ def resolve_link(root, guides, srcdir, pageurl, target):
     cross-guide link broken. object-reference alone yields ~224 false positives
     if either is missing.
     """
-    if os.path.exists(os.path.normpath(os.path.join(srcdir, target))):
+    exists = tree.exists if tree else os.path.exists
+    if exists(os.path.normpath(os.path.join(srcdir, target))):
         return True
     parts = [p for p in posixpath.normpath(posixpath.join(pageurl, target)).split("/") if p]
     if not parts or parts[0] not in guides:
@@ -176,7 +196,7 @@ def resolve_link(root, guides, srcdir, pageurl, target):
                   [os.path.join(base, *rest) + ".md",
                    os.path.join(base, *rest, "index.md"),
                    os.path.join(base, *rest)])
-    return any(os.path.exists(c) for c in candidates)
+    return any(exists(c) for c in candidates)
 
 
 def read(path):
@@ -327,6 +347,7 @@ def audit(root, guide="object-reference", model_path=None):
                 f"{'/'.join(sorted(k[:-1] for k in kinds))}")
 
     # -- 7. broken links ------------------------------------------------------
+    tree = Tree(root)
     for dirpath, _, files in os.walk(docs):
         for fn in sorted(files):
             if not fn.endswith(".md"):
@@ -340,7 +361,7 @@ def audit(root, guide="object-reference", model_path=None):
                 t = target.split("#")[0].split("?")[0]
                 if not t:
                     continue
-                if not resolve_link(root, guides, dirpath, purl, t):
+                if not resolve_link(root, guides, dirpath, purl, t, tree):
                     f["broken-links"].append(
                         f"{rel.replace(os.sep, '/')}: [{label or 'image'}] -> {target}")
 
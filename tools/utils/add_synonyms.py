@@ -14,7 +14,8 @@ import sys
 import argparse
 import re
 from typing import Optional, Tuple, Set
-from bs4 import BeautifulSoup
+
+from doc_utils import parse_html, may_contain_tag
 
 
 def extract_apl_symbol(html_content: str) -> Optional[str]:
@@ -23,7 +24,9 @@ def extract_apl_symbol(html_content: str) -> Optional[str]:
     
     Returns the symbol if found, None otherwise.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
+    if not may_contain_tag(html_content, 'h1'):
+        return None
+    soup = parse_html(html_content)
     
     # Find the first h1 tag
     h1 = soup.find('h1')
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark the BeautifulSoup parsers on the documentation corpus.
+
+Times each read-only HTML call site with html.parser and with lxml, and reports
+the speedup, and whether both parsers gave the same results. The CHM and PDF
+builders' call sites are only included if their dependencies are installed.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add the utils directory to the path
+UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, UTILS_DIR)
+
+import doc_utils
+from doc_utils import MkDocsRepo, HTMLLinkExtractor
+from add_synonyms import extract_apl_symbol
+
+PARSERS = ['html.parser', 'lxml']
+
+
+def load_builder(name: str, subdir: str):
+    """Import one of the CHM/PDF build scripts, or return None if it can't be."""
+    path = os.path.normpath(os.path.join(UTILS_DIR, '..', '..', subdir))
+    sys.path.insert(0, path)
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        print(f"Skipping {name}: {e}", file=sys.stderr)
+        return None
+    finally:
+        sys.path.remove(path)
+
+
+def read_files(paths: List[str]) -> Dict[str, str]:
+    """Read all files into memory, so that only parsing is timed."""
+    contents = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            contents[path] = f.read()
+    return contents
+
+
+def time_call_site(fn: Callable, inputs: List, module, parser: str) -> Tuple[float, List]:
+    """Run fn over all inputs with module.HTML_PARSER set to parser."""
+    saved = module.HTML_PARSER
+    module.HTML_PARSER = parser
+    try:
+        start = time.perf_counter()
+        results = [fn(item) for item in inputs]
+        return time.perf_counter() - start, results
+    finally:
+        module.HTML_PARSER = saved
+
+
+def html_files(html_dir: Optional[str]) -> List[str]:
+    """All .htm/.html files below html_dir."""
+    found = []
+    if html_dir:
+        for root, _, files in os.walk(html_dir):
+            for file in files:
+                if file.endswith(('.htm', '.html')):
+                    found.append(os.path.join(root, file))
+    return sorted(found)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare html.parser and lxml on each HTML call site."
+    )
+    parser.add_argument(
+        "--root",
+        default=".",
+        help="Root directory containing mkdocs.yml (default: current directory)",
+    )
+    parser.add_argument(
+        "--html-dir",
+        help="Directory of built HTML (e.g. the CHM project) to also benchmark",
+    )
+    args = parser.parse_args()
+
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        sys.exit("lxml is not installed; nothing to compare.")
+
+    repo = MkDocsRepo(args.root)
+    md_paths = sorted(repo.iter_all_markdown_files())
+    markdown = read_files(md_paths)
+    html = read_files(html_files(args.html_dir))
+    print(f"Corpus: {len(markdown)} markdown files, {len(html)} HTML files\n")
+
+    # (name, function, inputs, module whose HTML_PARSER it uses)
+    call_sites = [
+        ("doc_utils image references (md)",
+         lambda path: [(r.line_number, r.image_path, r.alt_text)
+                       for r in repo.extract_image_references(path)],
+         md_paths, doc_utils),
+        ("doc_utils links (md)", HTMLLinkExtractor.extract_links,
+         list(markdown.values()), doc_utils),
+        ("add_synonyms symbol (md)", extract_apl_symbol,
+         list(markdown.values()), doc_utils),
+    ]
+    if html:
+        call_sites.append(("doc_utils links (html)", HTMLLinkExtractor.extract_links,
+                           list(html.values()), doc_utils))
+
+    if chm := load_builder("mkdocs2chm", "chm"):
+        call_sites.append(("mkdocs2chm extract_h1 (md)", chm.extract_h1,
+                           list(markdown.values()), chm))
+        if html:
+            call_sites.append(("mkdocs2chm extract_h1 (html)", chm.extract_h1,
+                               list(html.values()), chm))
+    if pdf := load_builder("mkdocs2pdf", "pdf"):
+        call_sites.append(("mkdocs2pdf extract_html_h1 (md)", pdf.extract_html_h1,
+                           list(markdown.values()), pdf))
+
+    print(f"{'Call site':<36} {'html.parser':>12} {'lxml':>10} {'speedup':>8}  same")
+    print('-' * 76)
+    for name, fn, inputs, module in call_sites:
+        timings = {}
+        results = {}
+        for p in PARSERS:
+            timings[p], results[p] = time_call_site(fn, inputs, module, p)
+        speedup = timings['html.parser'] / timings['lxml'] if timings['lxml'] else 0.0
+        same = "yes" if results['html.parser'] == results['lxml'] else "NO"
+        print(f"{name:<36} {timings['html.parser']:>11.2f}s {timings['lxml']:>9.2f}s "
+              f"{speedup:>7.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
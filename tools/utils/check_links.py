@@ -1,33 +1,60 @@
 #!/usr/bin/env python3
 """
-Spider a deployed documentation site using a multi-process worker pool
-and report any internal links that fail (HTTP status >= 400).
+Spider a deployed documentation site with an asyncio crawler, keeping
+hundreds of requests in flight from a single process, and report any
+internal links that fail (HTTP status >= 400), or whose #fragment matches
+no id on the target page.
+
+Pages are fetched with conditional requests against a cache of the last
+run's results, and links that worked recently aren't re-checked; with
+--since-cache, only the links on pages whose content changed are.
+
+Pages are discovered from the site's sitemap.xml, and optionally by following
+links breadth first, and are checked while discovery goes on.
+
+With --site-dir, the built site is read from disk instead, and URLs are
+resolved the way the nginx container would serve them.
 """
 
 import argparse
+import asyncio
+import hashlib
+import json
 import multiprocessing as mp
+import os
+import posixpath
 import re
+import sqlite3
 import sys
 import time
-from collections import defaultdict
+import xml.etree.ElementTree as ET
+from collections import defaultdict, deque
 from datetime import datetime
-from typing import Dict, Iterable, List, Sequence, Tuple
-from urllib.parse import urljoin, urlparse, urlunparse
+from functools import partial
+from html import unescape
+from typing import (AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, FrozenSet,
+                    Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar)
+from urllib.parse import unquote, urljoin, urlparse, urlunparse
 
-import requests
+import aiohttp
 from ruamel.yaml import YAML
 
+from doc_utils import default_cache_dir
 
-# Globals initialised in worker processes
-SESSION = None
-BASE_URL = None
-REQUEST_TIMEOUT = None
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 LINK_RE = re.compile(
     r'<a\b[^>]*href\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))',
     re.IGNORECASE | re.DOTALL,
 )
+# These start at the (lower case, as generated) attribute name rather than the
+# tag, so that the regex engine can scan for it as a literal, which is over ten
+# times faster on pages with a large nav. collect_element_ids checks the context.
+ID_RE = re.compile(r'id\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+NAME_RE = re.compile(r'name\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
 ARTICLE_SECTION_RE = re.compile(
     r'<article\b[^>]*>(.*?)</article>',
     re.IGNORECASE | re.DOTALL,
@@ -51,39 +78,101 @@ def extract_primary_content(html: str) -> str:
     return html
 
 
-def collect_internal_links(html: str, page_base: str, base_url: str) -> set:
-    """Extract internal links from the provided HTML snippet using regular expressions."""
-    links = set()
+def iter_internal_links(html: str, page_base: str, base_url: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield (href, url, fragment) for each internal link in the HTML, with the URL
+    normalised. Links to an anchor on the same page yield the page's URL.
+    """
     for match in LINK_RE.finditer(html):
         href = (match.group(1) or match.group(2) or match.group(3) or "").strip()
-        if not href or href.startswith(("#", "javascript:", "mailto:", "tel:")):
+        if not href or href.startswith(("javascript:", "mailto:", "tel:")):
             continue
         absolute_url = urljoin(page_base, href)
         if absolute_url.lower().endswith((".pdf", ".docx")):
             continue
         normalized = normalize_url(absolute_url)
         if is_internal_link(normalized, base_url):
-            links.add(normalized)
-    return links
+            yield href, normalized, unquote(urlparse(absolute_url).fragment)
 
 
-def init_worker(base_url: str, request_timeout: float) -> None:
-    """Initialise a requests.Session in each worker process."""
-    global SESSION, BASE_URL, REQUEST_TIMEOUT
+def collect_internal_links(html: str, page_base: str, base_url: str) -> set:
+    """Extract internal links from the provided HTML snippet using regular expressions."""
+    return {
+        url
+        for href, url, _ in iter_internal_links(html, page_base, base_url)
+        if not href.startswith("#")
+    }
+
+
+def collect_fragment_links(html: str, page_base: str, base_url: str) -> set:
+    """The (url, fragment) pairs of internal links that point at an anchor."""
+    return {
+        (url, fragment)
+        for _, url, fragment in iter_internal_links(html, page_base, base_url)
+        if fragment
+    }
+
 
-    BASE_URL = base_url
-    REQUEST_TIMEOUT = request_timeout
+def collect_element_ids(html: str) -> FrozenSet[str]:
+    """All the anchors a fragment can refer to: element ids, and <a name=...>."""
+    ids = set()
+    for match in ID_RE.finditer(html):
+        # Skip attributes such as data-id= and words such as "valid="
+        if html[match.start() - 1].isspace():
+            ids.add(unescape(match.group(1) or match.group(2) or match.group(3) or ""))
+    for match in NAME_RE.finditer(html):
+        tag = html[html.rfind("<", 0, match.start()):match.start()]
+        if html[match.start() - 1].isspace() and ">" not in tag and \
+                tag[:3].lower() in ("<a ", "<a\t", "<a\n"):
+            ids.add(unescape(match.group(1) or match.group(2) or match.group(3) or ""))
+    return frozenset(ids)
 
-    session = requests.Session()
-    adapter = requests.adapters.HTTPAdapter(
-        pool_connections=32,
-        pool_maxsize=32,
-        max_retries=0,
+
+def create_session(concurrency: int, per_host: int, request_timeout: float) -> aiohttp.ClientSession:
+    """
+    Create the HTTP session shared by all requests. Its connector pools up to
+    `per_host` keep-alive connections to each host, and `concurrency` in total.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=concurrency,
+        limit_per_host=per_host,
+        keepalive_timeout=30,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        # Like requests' timeout: a limit on connecting and on each read, not on
+        # the whole request, which would include time queued for a connection.
+        timeout=aiohttp.ClientTimeout(
+            total=None, sock_connect=request_timeout, sock_read=request_timeout
+        ),
     )
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
 
-    SESSION = session
+
+async def imap_unordered(
+    func: Callable[[T], Awaitable[R]], items: Iterable[T], concurrency: int
+) -> AsyncIterator[R]:
+    """
+    Apply an async function to each item, with at most `concurrency` calls in
+    flight, and yield the results as they complete: Pool.imap_unordered for I/O.
+    """
+    items = iter(items)
+    pending = {asyncio.ensure_future(func(item)) for _, item in zip(range(concurrency), items)}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            for item in items:
+                pending.add(asyncio.ensure_future(func(item)))
+                break
+            yield task.result()
+
+
+class BaseURLError(Exception):
+    """The landing page of the site could not be loaded."""
+
+
+def describe_error(exc: Exception) -> str:
+    """Error text for the report; timeouts and some connection errors have no message."""
+    return f"Error: {str(exc) or type(exc).__name__}"
 
 
 def normalize_url(url: str) -> str:
@@ -130,54 +219,191 @@ def extract_navigation_pages(html: str, base_url: str) -> Sequence[str]:
     return tuple(sorted(pages))
 
 
-def get_requests_session() -> requests.Session:
-    """Return the session initialised for the current worker."""
-    if SESSION is None:
-        raise RuntimeError("Worker session not initialised")
-    return SESSION
+class LinkCache:
+    """
+    Persistent SQLite cache of a crawl's results. For each page it keeps the
+    validators (ETag, Last-Modified and a hash of the content) and what
+    index_page extracted from it, so an unchanged page is neither downloaded
+    again (the server answers a conditional GET with 304) nor re-parsed. For
+    each link it keeps the outcome of check_link and when it was checked.
+    All data is dropped whenever this script (and so the extraction) changes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, sha256 TEXT,
+            result TEXT, checked_at REAL);
+        CREATE TABLE IF NOT EXISTS links (
+            url TEXT PRIMARY KEY, ok INTEGER, status TEXT, checked_at REAL);
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(self.SCHEMA)
+
+        version = self.code_version()
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != version:
+            with self.db:
+                self.db.execute("DROP TABLE pages")
+                self.db.execute("DROP TABLE links")
+            self.db.executescript(self.SCHEMA)
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+
+    @staticmethod
+    def code_version() -> str:
+        """A fingerprint of this script, whose extraction the cached pages reflect."""
+        with open(os.path.abspath(__file__), "rb") as handle:
+            return hashlib.sha256(handle.read()).hexdigest()
+
+    @staticmethod
+    def default_path() -> str:
+        """The cache lives in the cache directory of the current (repo) directory."""
+        return os.path.join(default_cache_dir(os.getcwd()), "link-results.sqlite")
 
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
 
-def process_page(page_url: str) -> Dict[str, object]:
+    def page(self, url: str) -> Optional[Dict[str, object]]:
+        """The cached validators and index_page result of a page, if any."""
+        row = self.db.execute(
+            "SELECT etag, last_modified, sha256, result FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row[3])
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "sha256": row[2],
+            "links": tuple(result["links"]),
+            "fragments": tuple(tuple(pair) for pair in result["fragments"]),
+            "ids": frozenset(result["ids"]),
+        }
+
+    def store_page(
+        self, url: str, etag: Optional[str], last_modified: Optional[str], sha256: str,
+        result: Dict[str, object],
+    ) -> None:
+        data = json.dumps({
+            "links": result["links"],
+            "fragments": result["fragments"],
+            "ids": sorted(result["ids"]),
+        })
+        self.db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, sha256, data, time.time()),
+        )
+
+    def link(self, url: str) -> Optional[Tuple[bool, object, float]]:
+        """The cached (ok, status, checked_at) of a link, if any."""
+        row = self.db.execute(
+            "SELECT ok, status, checked_at FROM links WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return bool(row[0]), json.loads(row[1]), row[2]
+
+    def store_link(self, url: str, ok: bool, status: object) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?)",
+            (url, int(ok), json.dumps(status), time.time()),
+        )
+
+
+def index_page(result: Dict[str, object], html: str, base_url: str) -> None:
+    """
+    Record the internal links inside a fetched page's main content, the anchors
+    those links point at, and the ids anywhere on the page that anchors may match.
+    """
+    page_url = result["page_url"]
+    content_html = extract_primary_content(html)
+    links = collect_internal_links(content_html, page_url, base_url)
+
+    result["links"] = tuple(sorted(links))
+    result["fragments"] = tuple(sorted(collect_fragment_links(content_html, page_url, base_url)))
+    result["ids"] = collect_element_ids(html)
+
+
+async def process_page(
+    session: aiohttp.ClientSession, page_url: str, base_url: str,
+    cache: Optional[LinkCache] = None,
+) -> Dict[str, object]:
     """
     Fetch a single page, extract all internal links inside the main content, and
-    return a summary dictionary describing the outcome.
+    return a summary dictionary describing the outcome. With a cache, the page
+    is only downloaded and parsed if it has changed; "changed" is False if not.
     """
-    session = get_requests_session()
     result: Dict[str, object] = {
         "page_url": page_url,
         "links": [],
+        "fragments": [],
+        "ids": frozenset(),
         "status": None,
         "error": None,
+        "changed": True,
     }
 
+    cached = cache.page(page_url) if cache else None
+    headers = {}
+    if cached and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached["last_modified"]:
+        headers["If-Modified-Since"] = cached["last_modified"]
+
     try:
-        response = session.get(page_url, timeout=REQUEST_TIMEOUT)
-        result["status"] = response.status_code
-        if response.status_code >= 400:
-            result["error"] = f"Status {response.status_code}"
-            return result
-        html = response.text
+        async with session.get(page_url, headers=headers) as response:
+            result["status"] = response.status
+            if response.status == 304 and cached:
+                body = None
+            elif response.status >= 400:
+                result["error"] = f"Status {response.status}"
+                return result
+            else:
+                body = await response.read()
+                html = await response.text(errors="replace")
+            # A 304 needn't repeat the validators
+            etag = response.headers.get("ETag") or (cached and cached["etag"])
+            last_modified = (response.headers.get("Last-Modified")
+                             or (cached and cached["last_modified"]))
     except Exception as exc:  # pylint: disable=broad-except
-        result["error"] = f"Error: {exc}"
+        result["error"] = describe_error(exc)
         return result
 
-    content_html = extract_primary_content(html)
-    links = collect_internal_links(content_html, page_url, BASE_URL)
-
-    result["links"] = tuple(sorted(links))
+    if cached and body is None:
+        sha256 = cached["sha256"]
+    else:
+        sha256 = hashlib.sha256(body).hexdigest()
+    if cached and cached["sha256"] == sha256:
+        # Not modified, or rebuilt with the same content
+        result["status"] = 200
+        for key in ("links", "fragments", "ids"):
+            result[key] = cached[key]
+        result["changed"] = False
+    else:
+        index_page(result, html, base_url)
+    if cache:
+        cache.store_page(page_url, etag, last_modified, sha256, result)
     return result
 
 
-def check_link(url: str) -> Dict[str, object]:
+async def check_link(session: aiohttp.ClientSession, url: str) -> Dict[str, object]:
     """Check a single link and report status information."""
-    session = get_requests_session()
     try:
-        response = session.head(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
-        status = response.status_code
+        async with session.head(url, allow_redirects=True) as response:
+            status = response.status
         if status in (405, 403) or status >= 400:
-            # Fall back to GET for servers that dislike HEAD or to confirm failures
-            response = session.get(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
-            status = response.status_code
+            # Fall back to GET for servers that dislike HEAD or to confirm failures.
+            # The body is read, so that the connection can be reused.
+            async with session.get(url, allow_redirects=True) as response:
+                status = response.status
+                await response.read()
         return {
             "url": url,
             "ok": status < 400,
@@ -187,7 +413,7 @@ def check_link(url: str) -> Dict[str, object]:
         return {
             "url": url,
             "ok": False,
-            "status": f"Error: {exc}",
+            "status": describe_error(exc),
         }
 
 
@@ -241,20 +467,567 @@ def write_yaml_output(
             handle.write("# No broken links found\n{}\n")
 
 
+def log_progress(
+    label: str, idx: int, total: Optional[int], start_time: float, every: int
+) -> None:
+    """
+    Print a progress line every `every` items, and after the last one. The total
+    is None while it isn't known yet, as when pages are still being discovered.
+    """
+    if idx % every == 0 or idx == total:
+        elapsed = time.time() - start_time
+        rate = idx / elapsed if elapsed else 0.0
+        count = idx if total is None else f"{idx}/{total}"
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] "
+            f"{label}: {count} ({rate:.1f}/s)",
+            file=sys.stderr,
+        )
+
+
+def record_page_result(
+    result: Dict[str, object],
+    nav_errors: List[Tuple[str, str]],
+    link_to_pages: Dict[str, List[str]],
+    page_ids: Dict[str, FrozenSet[str]],
+    page_fragments: Dict[str, Sequence[Tuple[str, str]]],
+) -> None:
+    """
+    Add a page's outcome from process_page to the crawl's running totals. A
+    followed page that fails isn't a navigation error: the link to it is
+    reported as broken on the pages that have it.
+    """
+    page_url = result["page_url"]
+    error = result["error"]
+    if error:
+        if not result.get("followed"):
+            nav_errors.append((page_url, error))
+    else:
+        for link_url in result["links"]:
+            link_to_pages[link_url].append(page_url)
+        page_ids[page_url] = result["ids"]
+        if result["fragments"]:
+            page_fragments[page_url] = result["fragments"]
+
+
+def find_broken_anchors(
+    page_fragments: Dict[str, Sequence[Tuple[str, str]]],
+    page_ids: Dict[str, FrozenSet[str]],
+    page_broken_links: Dict[str, List[Dict[str, object]]],
+) -> int:
+    """
+    Check each link's #fragment against the ids of the page it points at, and
+    add the ones that match nothing to page_broken_links. Only pages that were
+    fetched have an id index; anchors on other targets are not checked, as that
+    would take more requests. Returns the number of anchors checked.
+    """
+    checked = 0
+    for page_url, fragments in page_fragments.items():
+        for url, fragment in fragments:
+            ids = page_ids.get(url)
+            if ids is None:
+                # The landing page is processed as base_url, without the slash
+                ids = page_ids.get(url.rstrip("/"))
+            if ids is None:
+                continue
+            checked += 1
+            # Browsers scroll to the top for #top when there's no such id
+            if fragment in ids or fragment.lower() == "top":
+                continue
+            page_broken_links[page_url].append(
+                {"url": f"{url}#{fragment}", "status": "Missing anchor"}
+            )
+    return checked
+
+
+def attribute_broken_links(
+    link_to_pages: Dict[str, List[str]],
+    link_status: Dict[str, Tuple[bool, object]],
+    page_fragments: Dict[str, Sequence[Tuple[str, str]]],
+    page_ids: Dict[str, FrozenSet[str]],
+) -> Dict[str, List[Dict[str, object]]]:
+    """Map each page to the broken links and missing anchors it contains."""
+    page_broken_links: Dict[str, List[Dict[str, object]]] = defaultdict(list)
+    for link_url, pages_with_link in link_to_pages.items():
+        ok, status = link_status.get(link_url, (False, "Unknown"))
+        if ok:
+            continue
+        for page_url in pages_with_link:
+            page_broken_links[page_url].append({"url": link_url, "status": status})
+
+    links_broken = sum(len(entries) for entries in page_broken_links.values())
+    checked = find_broken_anchors(page_fragments, page_ids, page_broken_links)
+    missing = sum(len(entries) for entries in page_broken_links.values()) - links_broken
+    print(
+        f"[{datetime.now().strftime('%H:%M:%S')}] "
+        f"Checked {checked} anchors against page ids: {missing} missing",
+        file=sys.stderr,
+    )
+    return page_broken_links
+
+
+def sitemap_page_urls(events: Iterable[Tuple[str, ET.Element]], base_url: str) -> Iterator[str]:
+    """
+    Yield the internal page URLs from the "end" events of parsing a sitemap.xml
+    incrementally, clearing each <url> once read. mkdocs writes the URLs with the
+    site_url of the deployed site, so they are moved to the host of base_url.
+    """
+    base = urlparse(base_url)
+    for _, element in events:
+        if element.tag.rpartition("}")[2] != "url":
+            continue
+        for child in element:
+            if child.tag.rpartition("}")[2] == "loc" and child.text:
+                loc = urlparse(child.text.strip())
+                url = normalize_url(urlunparse((base.scheme, base.netloc) + tuple(loc[2:])))
+                if is_internal_link(url, base_url):
+                    yield url
+        element.clear()
+
+
+def looks_like_page(url: str) -> bool:
+    """Whether a link may be to an HTML page, rather than an image or other asset."""
+    name = posixpath.basename(urlparse(url).path)
+    return "." not in name or name.lower().endswith((".html", ".htm"))
+
+
+async def stream_sitemap(session: aiohttp.ClientSession, base_url: str) -> AsyncIterator[str]:
+    """Yield the pages in the site's sitemap.xml as it downloads, if there is one."""
+    parser = ET.XMLPullParser(events=("end",))
+    try:
+        async with session.get(base_url + "/sitemap.xml") as response:
+            if response.status >= 400:
+                return
+            async for chunk in response.content.iter_chunked(1 << 16):
+                parser.feed(chunk)
+                for url in sitemap_page_urls(parser.read_events(), base_url):
+                    yield url
+    except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError) as exc:
+        print(f"WARNING: Failed to read sitemap.xml: {describe_error(exc)}", file=sys.stderr)
+
+
+def read_sitemap(site_dir: str, base_url: str) -> Iterator[str]:
+    """stream_sitemap for a site on disk."""
+    _, sitemap_path = resolve_site_url(base_url + "/sitemap.xml", site_dir)
+    if sitemap_path is None:
+        return
+    try:
+        yield from sitemap_page_urls(ET.iterparse(sitemap_path, events=("end",)), base_url)
+    except ET.ParseError as exc:
+        print(f"WARNING: Failed to read sitemap.xml: {describe_error(exc)}", file=sys.stderr)
+
+
+def log_sitemap_discovery(found: int) -> None:
+    """Report how many pages the sitemap gave, or that the navigation is used instead."""
+    if found:
+        message = f"Discovered {found} pages in sitemap.xml"
+    else:
+        # mkdocs only lists pages in the sitemap if site_url is set
+        message = "No pages in sitemap.xml; using the landing page's navigation"
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", file=sys.stderr)
+
+
+async def discover_pages(
+    session: aiohttp.ClientSession, base_url: str, discovery: str
+) -> AsyncIterator[str]:
+    """
+    Yield the pages to process as they are discovered: the landing page, then
+    those in the sitemap, or in the landing page's navigation if the sitemap
+    lists none or discovery is "nav". Raises BaseURLError if the landing page
+    can't be loaded.
+    """
+    yield base_url
+    if discovery == "sitemap":
+        found = 0
+        async for url in stream_sitemap(session, base_url):
+            found += 1
+            yield url
+        log_sitemap_discovery(found)
+        if found:
+            return
+
+    try:
+        home_url = base_url if base_url.endswith("/") else base_url + "/"
+        async with session.get(home_url) as response:
+            response.raise_for_status()
+            navigation_html = await response.text(errors="replace")
+    except Exception as exc:  # pylint: disable=broad-except
+        raise BaseURLError(describe_error(exc)) from exc
+
+    for url in discovered_pages(navigation_html, base_url):
+        yield url
+
+
+async def crawl_pages(
+    func: Callable[[str], Awaitable[Dict[str, object]]],
+    seeds: AsyncIterable[str],
+    concurrency: int,
+    follow: bool = False,
+) -> AsyncIterator[Dict[str, object]]:
+    """
+    Process each page as soon as it is discovered, with at most `concurrency`
+    in flight, and yield the results as they complete. Pages come from seeds,
+    and, with follow, breadth first from the links on processed pages; results
+    for the latter have "followed" set. Each page is processed once. If seeds
+    or func fail, the tasks still outstanding are cancelled.
+    """
+    seen = set()
+    followed = set()
+    frontier: deque = deque()
+    pending = set()
+    seed_iter = seeds.__aiter__()
+    next_seed = asyncio.ensure_future(seed_iter.__anext__())
+
+    def discover(url: str) -> None:
+        if url not in seen:
+            seen.add(url)
+            frontier.append(url)
+
+    try:
+        while next_seed or pending or frontier:
+            while frontier and len(pending) < concurrency:
+                pending.add(asyncio.ensure_future(func(frontier.popleft())))
+            waiting = (pending | {next_seed}) if next_seed else pending
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if next_seed in done:
+                try:
+                    discover(next_seed.result())
+                    next_seed = asyncio.ensure_future(seed_iter.__anext__())
+                except StopAsyncIteration:
+                    next_seed = None
+            for task in done & pending:
+                pending.discard(task)
+                result = task.result()
+                result["followed"] = result["page_url"] in followed
+                if follow and not result["error"]:
+                    for url in result["links"]:
+                        if looks_like_page(url) and url not in seen:
+                            followed.add(url)
+                            discover(url)
+                yield result
+    finally:
+        outstanding = pending | ({next_seed} if next_seed else set())
+        for task in outstanding:
+            task.cancel()
+        if outstanding:
+            await asyncio.gather(*outstanding, return_exceptions=True)
+
+
+def discovered_pages(navigation_html: str, base_url: str) -> Sequence[str]:
+    """The pages to process: everything linked from the landing page, and the page itself."""
+    pages = set(extract_navigation_pages(navigation_html, base_url))
+    pages.add(base_url)  # Ensure the landing page is included
+    pages = tuple(sorted(pages))
+
+    print(
+        f"[{datetime.now().strftime('%H:%M:%S')}] Discovered {len(pages)} pages",
+        file=sys.stderr,
+    )
+    return pages
+
+
+def reusable_link_results(
+    links: Iterable[str],
+    cache: LinkCache,
+    ttl_hours: float,
+    changed_links: Optional[set] = None,
+) -> Dict[str, Tuple[bool, object]]:
+    """
+    The cached results that needn't be checked again: those of working links
+    checked within the last ttl_hours, or, given the links on changed pages
+    (--since-cache), of all working links not among them. Broken links are
+    always checked again, so that fixes show up.
+    """
+    oldest = time.time() - ttl_hours * 3600
+    reusable = {}
+    for url in links:
+        cached = cache.link(url)
+        if cached is None:
+            continue
+        ok, status, checked_at = cached
+        if ok and (checked_at >= oldest
+                   or (changed_links is not None and url not in changed_links)):
+            reusable[url] = (ok, status)
+    return reusable
+
+
+async def crawl(
+    base_url: str, concurrency: int, per_host: int, request_timeout: float,
+    cache: Optional[LinkCache] = None, ttl_hours: float = 0.0, since_cache: bool = False,
+    discovery: str = "sitemap", follow: bool = False,
+) -> Tuple[Sequence[str], List[Tuple[str, str]], Dict[str, List[Dict[str, object]]], Sequence[str]]:
+    """
+    Discover the pages of the site, fetch them, and check every internal link
+    they contain. Returns (pages, nav_errors, page_broken_links, unique_links).
+    Pages are fetched while discovery (see discover_pages and crawl_pages) goes on.
+    With a cache, unchanged pages aren't downloaded again, and the links that
+    reusable_link_results allows aren't checked again. Raises BaseURLError if
+    the landing page can't be loaded.
+    """
+    start_time = time.time()
+
+    async with create_session(concurrency, per_host, request_timeout) as session:
+        pages: List[str] = []
+        nav_errors: List[Tuple[str, str]] = []
+        link_to_pages: Dict[str, List[str]] = defaultdict(list)
+        page_ids: Dict[str, FrozenSet[str]] = {}
+        page_fragments: Dict[str, Sequence[Tuple[str, str]]] = {}
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Processing pages...",
+            file=sys.stderr,
+        )
+
+        changed_links = set()
+        unchanged_pages = 0
+        async for result in crawl_pages(
+            lambda page_url: process_page(session, page_url, base_url, cache),
+            discover_pages(session, base_url, discovery), concurrency, follow,
+        ):
+            pages.append(result["page_url"])
+            record_page_result(result, nav_errors, link_to_pages, page_ids, page_fragments)
+            if not result["changed"]:
+                unchanged_pages += 1
+            elif not result["error"]:
+                changed_links.update(result["links"])
+            log_progress("Pages processed", len(pages), None, start_time, 50)
+        log_progress("Pages processed", len(pages), len(pages), start_time, 50)
+        if cache:
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] "
+                f"Unchanged since the cached run: {unchanged_pages} pages",
+                file=sys.stderr,
+            )
+
+        unique_links = tuple(sorted(link_to_pages.keys()))
+        link_status: Dict[str, Tuple[bool, object]] = {}
+        if cache:
+            link_status = reusable_link_results(
+                unique_links, cache, ttl_hours, changed_links if since_cache else None
+            )
+        to_check = [url for url in unique_links if url not in link_status]
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Checking {len(to_check)} unique links"
+            + (f" ({len(link_status)} more reused from the cache)..." if cache else "..."),
+            file=sys.stderr,
+        )
+
+        idx = 0
+        async for result in imap_unordered(
+            lambda url: check_link(session, url), to_check, concurrency
+        ):
+            idx += 1
+            link_status[result["url"]] = (result["ok"], result["status"])
+            if cache:
+                cache.store_link(result["url"], result["ok"], result["status"])
+            log_progress("Links checked", idx, len(to_check), start_time, 200)
+
+    page_broken_links = attribute_broken_links(
+        link_to_pages, link_status, page_fragments, page_ids
+    )
+    return tuple(sorted(pages)), nav_errors, page_broken_links, unique_links
+
+
+def resolve_site_url(url: str, site_dir: str) -> Tuple[int, Optional[str]]:
+    """
+    Return the status and file that tools/nginx/nginx.conf would serve for a URL,
+    with site_dir as the server's root: `try_files $uri $uri/ $uri.html` for most
+    paths, and `$1/index.html $1.html` for paths that end in a slash. The
+    redirect from / to the current version isn't modelled: / serves index.html.
+    """
+    path = unquote(urlparse(url).path) or "/"
+    parts = [part for part in posixpath.normpath(path).split("/") if part]
+    if ".." in parts:
+        return 404, None
+    local_path = os.path.join(site_dir, *parts)
+
+    if path.endswith("/"):
+        candidates = [os.path.join(local_path, "index.html")]
+        if parts:
+            candidates.append(local_path + ".html")
+    else:
+        if os.path.isfile(local_path):
+            return 200, local_path
+        if os.path.isdir(local_path):
+            # $uri/ serves the directory's index page, and nginx forbids
+            # directories without one, as autoindex is off.
+            index_path = os.path.join(local_path, "index.html")
+            if os.path.isfile(index_path):
+                return 200, index_path
+            return 403, None
+        candidates = [local_path + ".html"]
+
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return 200, candidate
+    return 404, None
+
+
+def process_site_page(page_url: str, base_url: str, site_dir: str) -> Dict[str, object]:
+    """process_page for a site on disk: read the page nginx would serve for the URL."""
+    status, file_path = resolve_site_url(page_url, site_dir)
+    result: Dict[str, object] = {
+        "page_url": page_url,
+        "links": [],
+        "fragments": [],
+        "ids": frozenset(),
+        "status": status,
+        "error": None,
+    }
+    if file_path is None:
+        result["error"] = f"Status {status}"
+        return result
+
+    try:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as handle:
+            html = handle.read()
+    except OSError as exc:
+        result["error"] = describe_error(exc)
+        return result
+
+    index_page(result, html, base_url)
+    return result
+
+
+def discover_site_pages(
+    base_url: str, site_dir: str, home_path: str, discovery: str
+) -> Iterator[str]:
+    """discover_pages for a site on disk, whose landing page is home_path."""
+    yield base_url
+    if discovery == "sitemap":
+        found = 0
+        for url in read_sitemap(site_dir, base_url):
+            found += 1
+            yield url
+        log_sitemap_discovery(found)
+        if found:
+            return
+
+    with open(home_path, "r", encoding="utf-8", errors="replace") as handle:
+        navigation_html = handle.read()
+    yield from discovered_pages(navigation_html, base_url)
+
+
+def check_site_dir(
+    base_url: str, site_dir: str, processes: int,
+    discovery: str = "sitemap", follow: bool = False,
+) -> Tuple[Sequence[str], List[Tuple[str, str]], Dict[str, List[Dict[str, object]]], Sequence[str]]:
+    """
+    crawl for a built site directory: pages are read from disk by a process
+    pool, and links are resolved against the files nginx would serve. With
+    follow, the pages linked from each level of pages make up the next level.
+    Raises BaseURLError if there is no landing page.
+    """
+    start_time = time.time()
+
+    home_url = base_url if base_url.endswith("/") else base_url + "/"
+    status, home_path = resolve_site_url(home_url, site_dir)
+    if home_path is None:
+        raise BaseURLError(f"Status {status}")
+
+    pages: List[str] = []
+    seen = set()
+
+    def unseen(urls: Iterable[str]) -> Iterator[str]:
+        for url in urls:
+            if url not in seen:
+                seen.add(url)
+                yield url
+
+    nav_errors: List[Tuple[str, str]] = []
+    link_to_pages: Dict[str, List[str]] = defaultdict(list)
+    page_ids: Dict[str, FrozenSet[str]] = {}
+    page_fragments: Dict[str, Sequence[Tuple[str, str]]] = {}
+
+    print(
+        f"[{datetime.now().strftime('%H:%M:%S')}] Processing pages...",
+        file=sys.stderr,
+    )
+
+    worker = partial(process_site_page, base_url=base_url, site_dir=site_dir)
+    with mp.Pool(processes=processes) as pool:
+        # The pool takes pages from the generator while discovery goes on
+        level = unseen(discover_site_pages(base_url, site_dir, home_path, discovery))
+        depth = 0
+        while level:
+            next_level = []
+            for result in pool.imap_unordered(worker, level, chunksize=8):
+                result["followed"] = depth > 0
+                pages.append(result["page_url"])
+                record_page_result(result, nav_errors, link_to_pages, page_ids, page_fragments)
+                if follow and not result["error"]:
+                    next_level.extend(url for url in result["links"] if looks_like_page(url))
+                log_progress("Pages processed", len(pages), None, start_time, 50)
+            level = list(unseen(next_level))
+            depth += 1
+    log_progress("Pages processed", len(pages), len(pages), start_time, 50)
+
+    unique_links = tuple(sorted(link_to_pages.keys()))
+    print(
+        f"[{datetime.now().strftime('%H:%M:%S')}] Checking {len(unique_links)} unique links...",
+        file=sys.stderr,
+    )
+
+    # Resolving a link is a few stat calls, so needs no pool.
+    link_status: Dict[str, Tuple[bool, object]] = {}
+    for idx, url in enumerate(unique_links, 1):
+        status, _ = resolve_site_url(url, site_dir)
+        link_status[url] = (status < 400, status)
+        log_progress("Links checked", idx, len(unique_links), start_time, 200)
+
+    page_broken_links = attribute_broken_links(
+        link_to_pages, link_status, page_fragments, page_ids
+    )
+    return tuple(sorted(pages)), nav_errors, page_broken_links, unique_links
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
-        description="Multiprocess link checker for deployed documentation sites."
+        description="Asynchronous link checker for deployed documentation sites."
     )
     parser.add_argument(
         "--base-url",
         default="http://localhost:8080",
-        help="Base URL of the deployed documentation site.",
+        help="Base URL of the deployed documentation site. With --site-dir, the "
+             "directory is taken to be served at the root of this URL's host.",
+    )
+    parser.add_argument(
+        "--site-dir",
+        help="Check a built site directory on disk instead of a running server, "
+             "resolving URLs as tools/nginx/nginx.conf does.",
+    )
+    parser.add_argument(
+        "--discovery",
+        choices=("sitemap", "nav"),
+        default="sitemap",
+        help="Where to find the pages to check: the site's sitemap.xml, falling "
+             "back to the navigation if it lists none (default), or the "
+             "landing page's navigation.",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Also check the pages linked from checked pages, breadth first, "
+             "to find pages that are only linked from content.",
     )
     parser.add_argument(
         "--processes",
         type=int,
-        default=max(mp.cpu_count() - 1, 1),
-        help="Number of worker processes to use (default: CPU count - 1).",
+        default=max(1, mp.cpu_count() - 1),
+        help="Number of worker processes for --site-dir (default: CPU count - 1).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=200,
+        help="Maximum number of requests in flight (default: 200).",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=0,
+        help="Maximum number of connections to one host (default: 0, no limit "
+             "beyond --concurrency).",
     )
     parser.add_argument(
         "--timeout",
@@ -267,18 +1040,47 @@ def main() -> None:
         default="broken_links.yaml",
         help="Path to the YAML output file.",
     )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=6.0,
+        help="Don't re-check working links checked within this many hours "
+             "(default: 6).",
+    )
+    parser.add_argument(
+        "--since-cache",
+        action="store_true",
+        help="Only re-check the links on pages whose content changed since the "
+             "cached run, and links that were broken.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use or update the page and link results in .cache/",
+    )
 
     args = parser.parse_args()
+    if args.site_dir and args.since_cache:
+        parser.error("--since-cache applies to crawling a server, not --site-dir")
+    if args.no_cache and args.since_cache:
+        parser.error("--since-cache needs the cache")
     base_url = args.base_url.rstrip("/")
 
     print(
         f"[{datetime.now().strftime('%H:%M:%S')}] Starting link check for: {base_url}",
         file=sys.stderr,
     )
-    print(
-        f"[{datetime.now().strftime('%H:%M:%S')}] Worker processes: {args.processes}",
-        file=sys.stderr,
-    )
+    if args.site_dir:
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Site directory: {args.site_dir} "
+            f"({args.processes} worker processes)",
+            file=sys.stderr,
+        )
+    else:
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Concurrent requests: {args.concurrency}",
+            file=sys.stderr,
+        )
     print(
         f"[{datetime.now().strftime('%H:%M:%S')}] Output file: {args.output}",
         file=sys.stderr,
@@ -286,85 +1088,26 @@ def main() -> None:
 
     start_time = time.time()
 
-    # Fetch navigation in the main process
-    session = requests.Session()
     try:
-        home_url = base_url if base_url.endswith("/") else base_url + "/"
-        response = session.get(home_url, timeout=args.timeout)
-        response.raise_for_status()
-        navigation_html = response.text
-    except Exception as exc:  # pylint: disable=broad-except
+        if args.site_dir:
+            pages, nav_errors, page_broken_links, unique_links = check_site_dir(
+                base_url, args.site_dir, args.processes, args.discovery, args.follow
+            )
+        else:
+            cache = None if args.no_cache else LinkCache(LinkCache.default_path())
+            try:
+                pages, nav_errors, page_broken_links, unique_links = asyncio.run(
+                    crawl(base_url, args.concurrency, args.per_host, args.timeout,
+                          cache, args.cache_ttl, args.since_cache, args.discovery,
+                          args.follow)
+                )
+            finally:
+                if cache:
+                    cache.close()
+    except BaseURLError as exc:
         print(f"ERROR: Failed to load base page: {exc}", file=sys.stderr)
         sys.exit(1)
 
-    pages = set(extract_navigation_pages(navigation_html, base_url))
-    pages.add(base_url)  # Ensure the landing page is included
-    pages = tuple(sorted(pages))
-
-    print(
-        f"[{datetime.now().strftime('%H:%M:%S')}] Discovered {len(pages)} pages",
-        file=sys.stderr,
-    )
-
-    page_broken_links: Dict[str, List[Dict[str, object]]] = defaultdict(list)
-    nav_errors: List[Tuple[str, str]] = []
-    link_to_pages: Dict[str, List[str]] = defaultdict(list)
-
-    with mp.Pool(
-        processes=args.processes,
-        initializer=init_worker,
-        initargs=(base_url, args.timeout),
-    ) as pool:
-        print(
-            f"[{datetime.now().strftime('%H:%M:%S')}] Processing pages...",
-            file=sys.stderr,
-        )
-
-        for idx, result in enumerate(pool.imap_unordered(process_page, pages), start=1):
-            page_url = result["page_url"]
-            error = result["error"]
-            if error:
-                nav_errors.append((page_url, error))
-            else:
-                links = result["links"]
-                for link_url in links:
-                    link_to_pages[link_url].append(page_url)
-
-            if idx % 50 == 0 or idx == len(pages):
-                elapsed = time.time() - start_time
-                rate = idx / elapsed if elapsed else 0.0
-                print(
-                    f"[{datetime.now().strftime('%H:%M:%S')}] "
-                    f"Pages processed: {idx}/{len(pages)} ({rate:.1f}/s)",
-                    file=sys.stderr,
-                )
-
-        unique_links = tuple(sorted(link_to_pages.keys()))
-        print(
-            f"[{datetime.now().strftime('%H:%M:%S')}] Checking {len(unique_links)} unique links...",
-            file=sys.stderr,
-        )
-
-        link_status: Dict[str, Tuple[bool, object]] = {}
-        for idx, result in enumerate(pool.imap_unordered(check_link, unique_links), start=1):
-            link_status[result["url"]] = (result["ok"], result["status"])
-            if idx % 200 == 0 or idx == len(unique_links):
-                elapsed = time.time() - start_time
-                rate = idx / elapsed if elapsed else 0.0
-                print(
-                    f"[{datetime.now().strftime('%H:%M:%S')}] "
-                    f"Links checked: {idx}/{len(unique_links)} ({rate:.1f}/s)",
-                    file=sys.stderr,
-                )
-
-    # Accumulate broken links per page
-    for link_url, pages_with_link in link_to_pages.items():
-        ok, status = link_status.get(link_url, (False, "Unknown"))
-        if ok:
-            continue
-        for page_url in pages_with_link:
-            page_broken_links[page_url].append({"url": link_url, "status": status})
-
     total_broken = sum(len(entries) for entries in page_broken_links.values())
 
     elapsed = time.time() - start_time
@@ -20,10 +20,14 @@ def check_file_exists(base_path, file_ref):
     return os.path.exists(file_path), file_path
 
 
-def process_config(config_path, base_path, files_found):
-    """Process a mkdocs.yml file to extract nav files."""
-    loader = YAMLLoader()
-    config = loader.load_file(config_path)
+def process_config(config_path, base_path, files_found, load_config=None):
+    """
+    Process a mkdocs.yml file to extract nav files. load_config, if given, is
+    used to parse the YAML files, e.g. MkDocsRepo.load_config to share its cache.
+    """
+    if load_config is None:
+        load_config = YAMLLoader().load_file
+    config = load_config(config_path)
     
     if not config or 'nav' not in config:
         return
@@ -43,13 +47,13 @@ def process_config(config_path, base_path, files_found):
         full_include_path = os.path.join(base_path, include_path)
         if os.path.exists(full_include_path):
             include_dir = os.path.dirname(full_include_path)
-            process_config(full_include_path, include_dir, files_found)
+            process_config(full_include_path, include_dir, files_found, load_config)
             
             # Also check for print_mkdocs.yml
             print_mkdocs = os.path.join(include_dir, 'print_mkdocs.yml')
             if os.path.exists(print_mkdocs):
                 print(f"Found print_mkdocs.yml in {os.path.basename(include_dir)}")
-                process_config(print_mkdocs, include_dir, files_found)
+                process_config(print_mkdocs, include_dir, files_found, load_config)
 
 
 def main():
@@ -4,11 +4,14 @@ from __future__ import annotations
 
 import argparse
 import ast
+import os
 import sys
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Iterable, List, Tuple
 
+from doc_utils import FileTree
+
 
 @dataclass
 class HelpUrlEntry:
@@ -202,15 +205,16 @@ def parse_help_urls(lines: Iterable[str]) -> Tuple[List[HelpUrlEntry], Dict[str,
     return entries, macros
 
 
-def resolve_entry(entry: HelpUrlEntry, project_root: Path) -> ResolvedEntry:
+def resolve_entry(entry: HelpUrlEntry, project_root: Path, tree: FileTree | None = None) -> ResolvedEntry:
+    exists = tree.exists if tree is not None else os.path.exists
     relative = Path(entry.relative_path)
     candidate = project_root / relative
-    if candidate.exists():
+    if exists(candidate):
         return ResolvedEntry(entry=entry, found_path=candidate, dropped_segments=0)
     parts = relative.parts
     for dropped in range(1, len(parts)):
         candidate = project_root.joinpath(*parts[dropped:])
-        if candidate.exists():
+        if exists(candidate):
             return ResolvedEntry(entry=entry, found_path=candidate, dropped_segments=dropped)
     return ResolvedEntry(entry=entry, found_path=None, dropped_segments=len(parts))
 
@@ -229,7 +233,8 @@ def main() -> int:
         return 2
 
     entries, _ = parse_help_urls(help_urls_path.read_text(encoding="utf-8").splitlines())
-    resolved_entries = [resolve_entry(entry, project_root) for entry in entries]
+    tree = FileTree(str(project_root))
+    resolved_entries = [resolve_entry(entry, project_root, tree) for entry in entries]
 
     missing = [item for item in resolved_entries if item.found_path is None]
     trimmed = [item for item in resolved_entries if item.found_path is not None and item.dropped_segments > 0]
@@ -6,7 +6,7 @@ Check for dangling local links in markdown files referenced in mkdocs.yml naviga
 import os
 import sys
 import argparse
-from doc_utils import MkDocsRepo, LinkExtractor, LinkValidator, SummaryReporter
+from doc_utils import MkDocsRepo, LinkValidator, SummaryReporter, CorpusIndex, FileTree
 
 
 def is_internal_non_anchor_link(url):
@@ -18,20 +18,12 @@ def is_internal_non_anchor_link(url):
     )
 
 
-def check_file_links(file_path, root_dir, site_mappings, verbose=False):
+def check_file_links(file_path, root_dir, site_mappings, index, tree=None):
     """Check all links in a single markdown file."""
     dangling_links = []
 
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-    except Exception as e:
-        if verbose:
-            print(f"Error reading {file_path}: {e}")
-        return dangling_links
-
     # Extract all links from the file
-    links = LinkExtractor.extract_markdown_links(content)
+    links = index.markdown_links(file_path)
 
     for link_text, link_url in links:
         # Skip external links, anchors, and special links
@@ -50,7 +42,7 @@ def check_file_links(file_path, root_dir, site_mappings, verbose=False):
 
         # Check if the link is valid
         is_valid = LinkValidator.is_valid_relative_path(
-            file_path, link_url_no_anchor, root_dir, site_mappings
+            file_path, link_url_no_anchor, root_dir, site_mappings, tree
         )
         if not is_valid:
             dangling_links.append((link_text, link_url))
@@ -58,18 +50,8 @@ def check_file_links(file_path, root_dir, site_mappings, verbose=False):
     return dangling_links
 
 
-def check_dangling_links(
-    directory,
-    mkdocs_file=None,
-    target_subsite=None,
-    stats_only=False,
-    debug=False,
-    verbose=False,
-):
-    # Initialise repo
-    repo = MkDocsRepo(directory)
-
-    # Get navigation files to check
+def collect_nav_files(repo, tree, target_subsite=None, debug=False):
+    """The existing markdown files referenced in navigation, optionally of one subsite."""
     nav_files = []
     for base_path, file_ref in repo.iter_nav_files(target_subsite):
         file_path = repo.resolver.markdown_file_path(base_path, file_ref)
@@ -80,10 +62,28 @@ def check_dangling_links(
             if file_subsite != target_subsite:
                 continue
 
-        if os.path.exists(file_path):
+        if tree.exists(file_path):
             nav_files.append(file_path)
         elif debug:
             print(f"Warning: Navigation file does not exist: {file_path}")
+    return nav_files
+
+
+def check_dangling_links(
+    directory,
+    mkdocs_file=None,
+    target_subsite=None,
+    stats_only=False,
+    debug=False,
+    use_cache=True,
+):
+    # Initialise repo
+    repo = MkDocsRepo(directory, use_cache=use_cache)
+    index = CorpusIndex.for_repo(repo, persistent=use_cache)
+    tree = FileTree.for_repo(repo, persistent=use_cache)
+
+    # Get navigation files to check
+    nav_files = collect_nav_files(repo, tree, target_subsite, debug)
 
     # Get site mappings for cross-reference resolution
     site_mappings = repo.site_mappings
@@ -104,16 +104,10 @@ def check_dangling_links(
             print(f"Checking file [{i}/{total_files}]: {relative_path}", end="\r")
 
         # Check links in this file
-        file_dangling = check_file_links(file_path, directory, site_mappings, verbose)
+        file_dangling = check_file_links(file_path, directory, site_mappings, index, tree)
 
         # Count total links
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            all_links = LinkExtractor.extract_markdown_links(content)
-            total_links += len(all_links)
-        except:
-            pass
+        total_links += len(index.markdown_links(file_path))
 
         if file_dangling:
             # Determine subsite
@@ -198,11 +192,18 @@ def main():
         "--output", help="Write results to this file instead of console"
     )
     parser.add_argument(
-        "--verbose", action="store_true", help="Print more detailed information"
+        "--verbose",
+        action="store_true",
+        help="No longer has any effect: read errors are always reported by the corpus index",
     )
     parser.add_argument(
         "--debug", action="store_true", help="Show debug information during processing"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use or update the corpus index, parsed YAML and file tree snapshot in .cache/",
+    )
 
     args = parser.parse_args()
 
@@ -232,13 +233,18 @@ def main():
                 args.subsite,
                 args.stats,
                 args.debug,
-                args.verbose,
+                not args.no_cache,
             )
             sys.stdout = original_stdout
         print(f"Results written to {args.output}")
     else:
         dangling_links = check_dangling_links(
-            args.dir, mkdocs_path, args.subsite, args.stats, args.debug, args.verbose
+            args.dir,
+            mkdocs_path,
+            args.subsite,
+            args.stats,
+            args.debug,
+            not args.no_cache,
         )
 
     # Exit with error code if dangling links found
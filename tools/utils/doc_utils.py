@@ -4,9 +4,15 @@ Common utilities for processing mkdocs documentation.
 Provides shared functionality for scripts that analyse and validate documentation.
 """
 
+import hashlib
+import json
 import os
+import pickle
 import re
+import sqlite3
 import sys
+from bisect import bisect_right
+from itertools import zip_longest
 from typing import Dict, List, Set, Tuple, Optional, Iterator
 from urllib.parse import urlparse, unquote
 try:
@@ -14,6 +20,11 @@ try:
 except ImportError:  # pragma: no cover - optional dependency
     BeautifulSoup = None
 
+try:
+    import lxml  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    lxml = None
+
 try:
     from ruamel.yaml import YAML
 except ImportError:  # pragma: no cover - optional dependency
@@ -26,13 +37,89 @@ else:
     pyyaml = None
 
 
+# The BeautifulSoup parser used wherever HTML is only read, not written back, here
+# and by the CHM and PDF builders: lxml when it is installed, as it is faster than
+# Python's html.parser, and gives the same results on our documentation. HTML that
+# is serialised always uses html.parser, as lxml would reshape its markup. Set
+# DOCS_HTML_PARSER to override.
+HTML_PARSER = os.environ.get('DOCS_HTML_PARSER') or ('lxml' if lxml else 'html.parser')
+
+
+def parse_html(markup: str, parser: Optional[str] = None) -> 'BeautifulSoup':
+    """Parse markup with BeautifulSoup, using HTML_PARSER unless a parser is given."""
+    if BeautifulSoup is None:
+        raise RuntimeError("BeautifulSoup is required for HTML parsing; please install bs4.")
+    return BeautifulSoup(markup, parser or HTML_PARSER)
+
+
+# The start of an <img> tag, in group 1, or a comment, which can't contain one
+IMG_TAG_START_RE = re.compile(r'<!--.*?-->|(<img\b)', re.IGNORECASE | re.DOTALL)
+
+
+def may_contain_tag(markup: str, tag: str) -> bool:
+    """
+    Quick check for whether markup could contain the given tag, so that parsing
+    can be skipped for the many pages with no HTML of interest.
+    """
+    return re.search(rf'<{tag}\b', markup, re.IGNORECASE) is not None
+
+
+def default_cache_dir(root_dir: str) -> str:
+    """The (git-ignored) .cache directory of a documentation repo, or $DOCS_CACHE_DIR."""
+    return os.environ.get('DOCS_CACHE_DIR') or os.path.join(root_dir, '.cache')
+
+
+class LineIndex:
+    """
+    Line and column numbers of offsets in a text, found by bisecting the offsets
+    at which its lines start, rather than counting newlines for each match.
+    Lines and columns are numbered from 1, as editors show them.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self.line_starts = [0]
+        pos = content.find('\n')
+        while pos >= 0:
+            self.line_starts.append(pos + 1)
+            pos = content.find('\n', pos + 1)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'LineIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    def line(self, offset: int) -> int:
+        """The line that the character at offset is on."""
+        return bisect_right(self.line_starts, offset)
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """The (line, column) of the character at offset."""
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def offset(self, line: int, column: int = 1) -> int:
+        """The offset of a (line, column) position."""
+        return self.line_starts[line - 1] + column - 1
+
+    def lines(self) -> List[str]:
+        """The lines of the text, with their newlines, as file.readlines() gives them."""
+        ends = self.line_starts[1:] + [len(self.content)]
+        lines = [self.content[start:end] for start, end in zip(self.line_starts, ends)]
+        if lines and not lines[-1]:
+            lines.pop()
+        return lines
+
+
 class ImageReference:
     """Represents an image reference found in markdown."""
 
-    def __init__(self, alt_text: str, image_path: str, line_number: int, raw_text: str = ''):
+    def __init__(self, alt_text: str, image_path: str, line_number: int, raw_text: str = '',
+                 column: int = 0):
         self.alt_text = alt_text
         self.image_path = image_path
         self.line_number = line_number
+        self.column = column  # 0 if unknown
         self.raw_text = raw_text  # The actual markdown text as it appears in the file
 
     def __repr__(self):
@@ -42,18 +129,58 @@ class ImageReference:
 class YAMLLoader:
     """Unified YAML loader with mkdocs custom tag support."""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None):
         self.yaml = YAML()
         self.yaml.preserve_quotes = True
+        # If set, parsed files are pickled here, and reused while the file's
+        # mtime and size are unchanged.
+        self.cache_dir = cache_dir
     
     def load_file(self, filepath: str) -> Optional[Dict]:
         """Load a YAML file, handling mkdocs custom tags."""
         try:
+            stat = os.stat(filepath)
+            key = (stat.st_mtime_ns, stat.st_size)
+            cached = self._read_cache(filepath, key)
+            if cached is not None:
+                return cached
             with open(filepath, 'r', encoding='utf-8') as f:
-                return self.yaml.load(f)
+                config = self.yaml.load(f)
         except Exception as e:
             print(f"Error loading {filepath}: {e}", file=sys.stderr)
             return None
+        self._write_cache(filepath, key, config)
+        return config
+
+    def _cache_file(self, filepath: str) -> str:
+        name = hashlib.sha256(os.path.abspath(filepath).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, 'yaml', name + '.pickle')
+
+    def _read_cache(self, filepath: str, key: Tuple[int, int]) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_file(filepath), 'rb') as f:
+                cached_key, config = pickle.load(f)
+        except Exception:
+            # Missing, or written by another version of ruamel: parse again
+            return None
+        return config if cached_key == key else None
+
+    def _write_cache(self, filepath: str, key: Tuple[int, int], config) -> None:
+        if not self.cache_dir or config is None:
+            return
+        cache_file = self._cache_file(filepath)
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            # Write then rename, so that a concurrent reader never sees half a file
+            tmp_file = f'{cache_file}.{os.getpid()}'
+            with open(tmp_file, 'wb') as f:
+                pickle.dump((key, config), f)
+            os.replace(tmp_file, cache_file)
+        except Exception:
+            # The cache is only a shortcut; a config it can't hold is parsed each run
+            pass
 
 
 class NavTraverser:
@@ -167,31 +294,56 @@ class PathResolver:
 class LinkExtractor:
     """Extract links from markdown content."""
     
+    HTML_LINK_PATTERN = re.compile(r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>', re.IGNORECASE)
+    
     @staticmethod
     def extract_markdown_links(content: str) -> List[Tuple[str, str]]:
         """
         Extract markdown links from content, excluding code blocks.
         Returns list of (text, url) tuples.
         """
-        # First, identify code blocks and create a mask to exclude them
+        return [(match.group('text'), match.group('url'))
+                for match in LinkExtractor._markdown_link_matches(content)]
+    
+    @staticmethod
+    def find_markdown_links(content: str,
+                            line_index: Optional['LineIndex'] = None) -> List[Tuple[str, str, int, int]]:
+        """
+        As extract_markdown_links, with positions: (text, url, line, column) tuples.
+        Pass the LineIndex of the content if there is one already.
+        """
+        if line_index is None:
+            line_index = LineIndex(content)
+        return [(match.group('text'), match.group('url'), *line_index.position(match.start()))
+                for match in LinkExtractor._markdown_link_matches(content)]
+    
+    @staticmethod
+    def _markdown_link_matches(content: str) -> List['re.Match']:
+        # First, identify code blocks, to exclude them. They don't overlap, so the
+        # block a position could be in is the last one starting at or before it.
         code_block_pattern = re.compile(r'```.*?```', re.DOTALL)
         code_blocks = [(m.start(), m.end()) for m in code_block_pattern.finditer(content)]
+        block_starts = [start for start, _ in code_blocks]
         
-        # Create a function to check if a position is inside a code block
         def is_in_code_block(pos):
-            return any(start <= pos <= end for start, end in code_blocks)
+            i = bisect_right(block_starts, pos) - 1
+            return i >= 0 and pos <= code_blocks[i][1]
         
         # Pattern to match markdown links [text](url) - excluding image links
         md_link_pattern = re.compile(r'(?<!!)\[(?P<text>[^\]]+)\]\((?P<url>[^)]+)\)')
         
         # Find all markdown style links, excluding those in code blocks
-        md_links = []
-        for match in md_link_pattern.finditer(content):
-            if not is_in_code_block(match.start()):
-                md_links.append((match.group('text'), match.group('url')))
-        
-        return md_links
+        return [match for match in md_link_pattern.finditer(content)
+                if not is_in_code_block(match.start())]
     
+    @staticmethod
+    def extract_html_links(content: str) -> List[str]:
+        """
+        Extract the href of HTML <a> tags embedded in markdown content.
+        A quick regex scan: use HTMLLinkExtractor for parsed HTML.
+        """
+        return LinkExtractor.HTML_LINK_PATTERN.findall(content)
+
     @staticmethod
     def extract_image_refs(content: str) -> List[str]:
         """Extract image references from markdown content."""
@@ -220,29 +372,75 @@ class HTMLLinkExtractor:
         """Extract all links from HTML content."""
         if BeautifulSoup is None:
             raise RuntimeError("BeautifulSoup is required for HTML link extraction; please install bs4.")
-        soup = BeautifulSoup(html_content, 'html.parser')
+        if not may_contain_tag(html_content, 'a'):
+            return []
+        soup = parse_html(html_content)
         links = []
         for a_tag in soup.find_all('a', href=True):
             links.append(a_tag['href'])
         return links
 
 
+class FilenameMatcher:
+    """
+    Find which of many file names occur anywhere in a text, in one pass.
+    
+    Each name is anchored on its extension: the text is searched for the few
+    distinct extensions, and the characters before each hit are looked up in a
+    set of the names of every length with that extension. This finds every
+    occurrence, overlapping ones included, as a fixed-string search per name would.
+    """
+    
+    def __init__(self, names):
+        # extension -> {name length -> names}
+        self._by_anchor: Dict[str, Dict[int, Set[str]]] = {}
+        for name in set(names):
+            dot = name.rfind('.')
+            anchor = name[dot:] if dot >= 0 else name
+            self._by_anchor.setdefault(anchor, {}).setdefault(len(name), set()).add(name)
+    
+    def search(self, text: str) -> Set[str]:
+        """Return the names that occur in text."""
+        found = set()
+        for anchor, by_length in self._by_anchor.items():
+            pos = text.find(anchor)
+            while pos >= 0:
+                end = pos + len(anchor)
+                for length, names in by_length.items():
+                    if length <= end and text[end - length:end] in names:
+                        found.add(text[end - length:end])
+                pos = text.find(anchor, pos + 1)
+        return found
+
+
 class MkDocsRepo:
     """Represent a mkdocs monorepo structure."""
     
-    def __init__(self, root_dir: str):
+    def __init__(self, root_dir: str, use_cache: bool = False):
         self.root_dir = os.path.abspath(root_dir)
-        self.loader = YAMLLoader()
+        # With use_cache, parsed YAML is also kept on disk between runs
+        self.loader = YAMLLoader(default_cache_dir(self.root_dir) if use_cache else None)
         self.resolver = PathResolver(root_dir)
         self._main_config = None
         self._site_mappings = None
+        self._configs: Dict[str, Optional[Dict]] = {}
+        self._include_paths: Optional[List[str]] = None
+        self._subsites: Optional[List[Tuple[str, str, Dict]]] = None
+        self._subsite_trie: Optional[Dict] = None
+    
+    def load_config(self, filepath: str) -> Optional[Dict]:
+        """Load a YAML file once; later calls return the same parsed config."""
+        filepath = os.path.abspath(filepath)
+        if filepath not in self._configs:
+            self._configs[filepath] = self.loader.load_file(filepath)
+        return self._configs[filepath]
     
     @property
     def main_config(self) -> Dict:
         """Load and cache the main mkdocs.yml configuration."""
         if self._main_config is None:
             config_path = os.path.join(self.root_dir, 'mkdocs.yml')
-            self._main_config = self.loader.load_file(config_path)
+            self._main_config = self.load_config(config_path)
             if self._main_config is None:
                 self._main_config = {}
         return self._main_config
@@ -257,18 +455,12 @@ class MkDocsRepo:
     
     def _build_site_mappings(self):
         """Build subsite name to directory mappings from included subsites."""
-        if 'nav' not in self.main_config:
-            return
-        
-        includes = NavTraverser.find_includes(self.main_config['nav'])
-        for include in includes:
-            include_path = self.resolver.resolve_include(include)
-            if os.path.exists(include_path):
-                site_dir = os.path.dirname(include_path)
-                # Use directory name as key, matching the original script
-                subsite_name = os.path.basename(site_dir)
-                site_rel_path = os.path.relpath(site_dir, self.root_dir)
-                self._site_mappings[subsite_name] = site_rel_path
+        for include_path in self.include_paths():
+            site_dir = os.path.dirname(include_path)
+            # Use directory name as key, matching the original script
+            subsite_name = os.path.basename(site_dir)
+            site_rel_path = os.path.relpath(site_dir, self.root_dir)
+            self._site_mappings[subsite_name] = site_rel_path
     
     @staticmethod
     def _site_name_to_url(site_name: str) -> str:
@@ -276,22 +468,32 @@ class MkDocsRepo:
         # Simple conversion - in reality mkdocs might have more complex rules
         return site_name.lower().replace(' ', '-').replace('.', '')
     
+    def include_paths(self) -> List[str]:
+        """Absolute paths of the existing subsite configs included by the main nav."""
+        if self._include_paths is None:
+            self._include_paths = []
+            if 'nav' in self.main_config:
+                for include in NavTraverser.find_includes(self.main_config['nav']):
+                    include_path = self.resolver.resolve_include(include)
+                    if os.path.exists(include_path):
+                        self._include_paths.append(include_path)
+        return self._include_paths
+    
     def iter_subsites(self) -> Iterator[Tuple[str, str, Dict]]:
         """
         Iterate over all subsites.
         Yields (name, path, config) tuples.
-        """
-        if 'nav' not in self.main_config:
-            return
         
-        includes = NavTraverser.find_includes(self.main_config['nav'])
-        for include in includes:
-            include_path = self.resolver.resolve_include(include)
-            if os.path.exists(include_path):
-                config = self.loader.load_file(include_path)
+        The subsite configs are parsed on the first call only.
+        """
+        if self._subsites is None:
+            self._subsites = []
+            for include_path in self.include_paths():
+                config = self.load_config(include_path)
                 if config:
                     name = os.path.basename(os.path.dirname(include_path))
-                    yield name, os.path.dirname(include_path), config
+                    self._subsites.append((name, os.path.dirname(include_path), config))
+        yield from self._subsites
     
     def iter_all_markdown_files(self) -> Iterator[str]:
         """Iterate over all markdown files in all subsites."""
@@ -359,6 +561,19 @@ class MkDocsRepo:
             if os.path.exists(print_config):
                 yield name, print_config
     
+    def _build_subsite_trie(self) -> Dict:
+        """
+        A trie of the subsite directories, by path component. A node that ends a
+        subsite directory holds its (mapping order, name) under the '' key.
+        """
+        trie: Dict = {}
+        for order, site_dir in enumerate(self.site_mappings.values()):
+            node = trie
+            for part in os.path.normpath(site_dir).split(os.sep):
+                node = node.setdefault(part, {})
+            node.setdefault('', (order, os.path.basename(site_dir)))
+        return trie
+
     def determine_file_subsite(self, file_path: str) -> str:
         """
         Determine which subsite a file belongs to.
@@ -369,16 +584,23 @@ class MkDocsRepo:
         Returns:
             Subsite name or 'root' if not in a subsite
         """
+        if self._subsite_trie is None:
+            self._subsite_trie = self._build_subsite_trie()
+
         rel_path = os.path.relpath(file_path, self.root_dir)
-        
-        # Check against site directory mappings
-        for url_name, site_dir in self.site_mappings.items():
-            site_rel_path = os.path.relpath(site_dir, self.root_dir)
-            if rel_path.startswith(site_rel_path + os.sep):
-                # Return the directory name as the subsite identifier
-                return os.path.basename(site_dir)
 
-        return 'root'
+        # Walk the file's parent directories down the trie. Should subsites ever
+        # nest, the first one in the site mappings wins, as it always has.
+        match = None
+        node = self._subsite_trie
+        for part in rel_path.split(os.sep)[:-1]:
+            node = node.get(part)
+            if node is None:
+                break
+            if '' in node and (match is None or node[''] < match):
+                match = node['']
+
+        return match[1] if match else 'root'
 
     def find_all_image_files(self, image_extensions: Optional[Set[str]] = None) -> Set[str]:
         """
@@ -417,7 +639,8 @@ class MkDocsRepo:
 
         return image_files
 
-    def extract_image_references(self, md_file: str) -> List[ImageReference]:
+    @staticmethod
+    def extract_image_references(md_file: str) -> List[ImageReference]:
         """
         Extract all image references from a markdown file with line numbers.
         Handles both markdown syntax ![](path) and HTML <img> tags.
@@ -428,60 +651,238 @@ class MkDocsRepo:
         Returns:
             List of ImageReference objects
         """
+        try:
+            return MkDocsRepo.find_image_references(LineIndex.from_file(md_file))
+        except Exception as e:
+            print(f"Warning: Could not read {md_file}: {e}", file=sys.stderr)
+            return []
+
+    @staticmethod
+    def find_image_references(line_index: LineIndex) -> List[ImageReference]:
+        """As extract_image_references, for content that has already been read."""
         refs = []
+        content = line_index.content
+
+        # Pattern for markdown images: ![alt text](path), on a single line
+        md_pattern = re.compile(r'!\[([^\]\n]*)\]\(([^)\n]+)\)')
+
+        # First pass: Find markdown-style images with line numbers
+        for match in md_pattern.finditer(content):
+            alt_text = match.group(1)
+            image_path = match.group(2)
+            raw_text = match.group(0)  # Full match: ![alt](path)
+            line_num, column = line_index.position(match.start())
+            refs.append(ImageReference(alt_text, image_path, line_num, raw_text, column))
+
+        # Second pass: Use BeautifulSoup to find HTML img tags
+        # This handles multi-line HTML tags better than regex
+        if not may_contain_tag(content, 'img'):
+            return refs
+        soup = parse_html(content)
+
+        # The soup's tags are in document order, as are the places where they start,
+        # found in one scan; any "<img" in a comment is not a tag.
+        tag_starts = [
+            match.start() for match in IMG_TAG_START_RE.finditer(content) if match.group(1)
+        ]
+        for img_tag, tag_start in zip_longest(soup.find_all('img'), tag_starts):
+            if img_tag is None:
+                break
+            src = img_tag.get('src')
+            alt = img_tag.get('alt', '')
 
-        try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                lines = content.splitlines(keepends=True)
-
-            # Pattern for markdown images: ![alt text](path)
-            md_pattern = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
-
-            # First pass: Find markdown-style images with line numbers
-            for line_num, line in enumerate(lines, start=1):
-                for match in md_pattern.finditer(line):
-                    alt_text = match.group(1)
-                    image_path = match.group(2)
-                    raw_text = match.group(0)  # Full match: ![alt](path)
-                    refs.append(ImageReference(alt_text, image_path, line_num, raw_text))
-
-            # Second pass: Use BeautifulSoup to find HTML img tags
-            # This handles multi-line HTML tags better than regex
-            soup = BeautifulSoup(content, 'html.parser')
-            for img_tag in soup.find_all('img', src=True):
-                src = img_tag.get('src')
-                alt = img_tag.get('alt', '')
-
-                # Convert to strings and handle None values
-                src_str = str(src) if src else ''
-                alt_str = str(alt) if alt else ''
-
-                # Skip if no valid src
-                if not src_str:
-                    continue
+            # Convert to strings and handle None values
+            src_str = str(src) if src else ''
+            alt_str = str(alt) if alt else ''
+
+            # Skip if no valid src
+            if not src_str:
+                continue
+
+            line_num, column = line_index.position(tag_start) if tag_start is not None else (1, 0)
+            refs.append(ImageReference(alt_str, src_str, line_num, str(img_tag), column))
 
-                # Reconstruct the HTML tag as it appears
-                raw_html = str(img_tag)
+        return refs
+
+
+class FileTree:
+    """
+    In-memory snapshot of the files and directories below a root directory, so that
+    link resolvers can probe many candidate paths without a stat call for each.
+    
+    exists(), isfile() and isdir() answer as the os.path functions would when the tree
+    was scanned. Paths outside the root, or inside hidden directories, __pycache__ and
+    symbolic links, which are not scanned, are passed on to os.path.
+    
+    A snapshot can be saved and loaded again; it is only reused while no scanned
+    directory has been modified, so adding, removing or renaming a file invalidates it.
+    """
 
-                # Find which line this tag appears on
-                # Search for the tag in the original content
-                tag_start = content.find(raw_html)
-                if tag_start >= 0:
-                    # Count line breaks before this position
-                    line_num = content[:tag_start].count('\n') + 1
+    VERSION = 1
+
+    def __init__(self, root_dir: str, scan: bool = True):
+        self.root_dir = os.path.abspath(root_dir)
+        self.files: Set[str] = set()  # Paths relative to the root
+        self.dir_mtimes: Dict[str, int] = {}  # Relative path ('.' for the root) -> mtime_ns
+        self.unscanned: Set[str] = set()
+        if scan:
+            self._scan()
+
+    @staticmethod
+    def _skip(entry: os.DirEntry) -> bool:
+        return entry.name.startswith('.') or entry.name == '__pycache__' or entry.is_symlink()
+
+    def _scan(self) -> None:
+        self.dir_mtimes['.'] = os.stat(self.root_dir).st_mtime_ns
+        pending = ['.']
+        while pending:
+            rel_dir = pending.pop()
+            try:
+                with os.scandir(os.path.join(self.root_dir, rel_dir)) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = os.path.normpath(os.path.join(rel_dir, entry.name))
+                if entry.is_dir(follow_symlinks=False):
+                    if self._skip(entry):
+                        self.unscanned.add(rel_path)
+                    else:
+                        self.dir_mtimes[rel_path] = entry.stat(follow_symlinks=False).st_mtime_ns
+                        pending.append(rel_path)
+                elif entry.is_symlink():
+                    self.unscanned.add(rel_path)
                 else:
-                    # Fallback: search for just the src attribute
-                    search_str = f'src="{src_str}"' if '"' in raw_html else f"src='{src_str}'"
-                    tag_start = content.find(search_str)
-                    line_num = content[:tag_start].count('\n') + 1 if tag_start >= 0 else 1
+                    self.files.add(rel_path)
 
-                refs.append(ImageReference(alt_str, src_str, line_num, raw_html))
+    @staticmethod
+    def default_path(root_dir: str) -> str:
+        return os.path.join(default_cache_dir(root_dir), 'file-tree.json')
 
-        except Exception as e:
-            print(f"Warning: Could not read {md_file}: {e}", file=sys.stderr)
+    @classmethod
+    def for_repo(cls, repo: 'MkDocsRepo', persistent: bool = False) -> 'FileTree':
+        """
+        Snapshot the tree of a repo. If persistent, the snapshot in its cache
+        directory is reused if still current, and otherwise replaced.
+        """
+        if not persistent:
+            return cls(repo.root_dir)
+        path = cls.default_path(repo.root_dir)
+        tree = cls.load(path, repo.root_dir)
+        if tree is None:
+            # Creating the cache directory after the scan would make the snapshot stale
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tree = cls(repo.root_dir)
+            tree.save(path)
+        return tree
+
+    def save(self, path: str) -> None:
+        """Write the snapshot to a JSON file, if possible."""
+        data = {
+            'version': self.VERSION,
+            'root_dir': self.root_dir,
+            'files': sorted(self.files),
+            'dir_mtimes': self.dir_mtimes,
+            'unscanned': sorted(self.unscanned),
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not save file tree snapshot {path}: {e}", file=sys.stderr)
+
+    @classmethod
+    def load(cls, path: str, root_dir: str) -> Optional['FileTree']:
+        """Read a saved snapshot of root_dir, or return None if there is no current one."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        tree = cls(root_dir, scan=False)
+        if data.get('version') != cls.VERSION or data.get('root_dir') != tree.root_dir:
+            return None
+        tree.files = set(data['files'])
+        tree.dir_mtimes = data['dir_mtimes']
+        tree.unscanned = set(data['unscanned'])
+        return tree if tree.is_current() else None
+
+    def is_current(self) -> bool:
+        """Whether no scanned directory has changed since the snapshot was taken."""
+        for rel_dir, mtime_ns in self.dir_mtimes.items():
+            try:
+                if os.stat(os.path.join(self.root_dir, rel_dir)).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _kind(self, path):
+        """'file', 'dir' or None if path doesn't exist; NotImplemented if the snapshot can't tell."""
+        path = os.fspath(path)
+        if not os.path.isabs(path):
+            path = os.path.join(os.getcwd(), path)
+        prefix = self.root_dir + os.sep
+        if (path.startswith(prefix) and not path.endswith(os.sep)
+                and os.sep + '.' not in path and os.sep + os.sep not in path):
+            # The common case: a plain path below the root, which can be looked up directly
+            rel_path = path[len(prefix):]
+            if rel_path in self.files:
+                return 'file'
+            if rel_path in self.dir_mtimes:
+                return 'dir'
+            if (rel_path not in self.unscanned
+                    and (os.path.dirname(rel_path) or '.') in self.dir_mtimes):
+                return None
+        return self._walk(path)
+
+    def _walk(self, full: str):
+        """
+        As _kind, following the components of an absolute path one by one, as the
+        OS would, so that e.g. 'page.md/..' or 'page.md/' don't exist.
+        """
+        if full == self.root_dir:
+            return 'dir'
+        if not full.startswith(self.root_dir + os.sep):
+            return NotImplemented
+        kind = 'dir'
+        parts: List[str] = []
+        for part in full[len(self.root_dir) + 1:].split(os.sep):
+            if kind != 'dir':
+                return None
+            if part in ('', '.'):
+                continue
+            if part == '..':
+                if not parts:
+                    return NotImplemented
+                parts.pop()
+                continue
+            parts.append(part)
+            rel_path = os.sep.join(parts)
+            if rel_path in self.dir_mtimes:
+                kind = 'dir'
+            elif rel_path in self.files:
+                kind = 'file'
+            elif rel_path in self.unscanned:
+                return NotImplemented
+            else:
+                return None
+        return kind
 
-        return refs
+    def exists(self, path) -> bool:
+        kind = self._kind(path)
+        return os.path.exists(path) if kind is NotImplemented else kind is not None
+
+    def isfile(self, path) -> bool:
+        kind = self._kind(path)
+        return os.path.isfile(path) if kind is NotImplemented else kind == 'file'
+
+    def isdir(self, path) -> bool:
+        kind = self._kind(path)
+        return os.path.isdir(path) if kind is NotImplemented else kind == 'dir'
 
 
 class LinkValidator:
@@ -490,11 +891,13 @@ class LinkValidator:
     @staticmethod
     def is_valid_relative_path(source_file: str, relative_link: str, 
                               root_dir: Optional[str] = None,
-                              site_mappings: Optional[Dict[str, str]] = None) -> bool:
+                              site_mappings: Optional[Dict[str, str]] = None,
+                              tree: Optional[FileTree] = None) -> bool:
         """
         Check if a relative link from source_file is valid.
         
         This is an exact port of the validate_links logic from the original dangling_links.py.
+        Candidate paths are looked up in tree, if given, rather than on disk.
         """
         base_dir = os.path.dirname(source_file)
         subsites = site_mappings or {}
@@ -648,9 +1051,10 @@ class LinkValidator:
                     paths_to_check.append(os.path.join(docs_path, 'index.md'))
         
         # Check all possible paths
+        exists = tree.exists if tree is not None else os.path.exists
         for check_path in paths_to_check:
             checked_paths.append(check_path)
-            if os.path.exists(check_path):
+            if exists(check_path):
                 target_found = True
                 break
         
@@ -720,9 +1124,11 @@ class SummaryReporter:
 class FootnoteReference:
     """Represents a markdown footnote reference or definition."""
 
-    def __init__(self, label: str, line_number: int, is_definition: bool, raw_text: str = ''):
+    def __init__(self, label: str, line_number: int, is_definition: bool, raw_text: str = '',
+                 column: int = 0):
         self.label = label
         self.line_number = line_number
+        self.column = column  # 0 if unknown
         self.is_definition = is_definition
         self.raw_text = raw_text
 
@@ -753,17 +1159,23 @@ class FootnoteExtractor:
         Returns:
             List of FootnoteReference instances
         """
-        results: List[FootnoteReference] = []
-        fence_delimiter: Optional[str] = None
-
         try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            line_index = LineIndex.from_file(md_file)
         except Exception as exc:
             print(f"Warning: Could not read {md_file}: {exc}", file=sys.stderr)
-            return results
+            return []
+        return FootnoteExtractor.find_footnotes(line_index, include_references,
+                                                include_definitions)
+
+    @staticmethod
+    def find_footnotes(line_index: LineIndex,
+                       include_references: bool = True,
+                       include_definitions: bool = True) -> List[FootnoteReference]:
+        """As extract_footnotes, for content that has already been read."""
+        results: List[FootnoteReference] = []
+        fence_delimiter: Optional[str] = None
 
-        for idx, line in enumerate(lines, start=1):
+        for idx, line in enumerate(line_index.lines(), start=1):
             stripped = line.rstrip('\n')
 
             # Track fenced code blocks (``` or ~~~)
@@ -789,7 +1201,8 @@ class FootnoteExtractor:
                             label=label,
                             line_number=idx,
                             is_definition=True,
-                            raw_text=stripped
+                            raw_text=stripped,
+                            column=def_match.start('label') - 1  # The [ of [^label]
                         )
                     )
                     continue  # Avoid double-counting definitions as references
@@ -802,7 +1215,8 @@ class FootnoteExtractor:
                             label=label,
                             line_number=idx,
                             is_definition=False,
-                            raw_text=stripped
+                            raw_text=stripped,
+                            column=match.start() + 1
                         )
                     )
 
@@ -813,10 +1227,12 @@ class AdmonitionReference:
     """Represents an admonition found in markdown."""
 
     def __init__(self, adm_type: str, title: str, line_number: int,
-                 is_collapsible: bool = False, raw_text: str = '', body: str = ''):
+                 is_collapsible: bool = False, raw_text: str = '', body: str = '',
+                 column: int = 0):
         self.adm_type = adm_type
         self.title = title
         self.line_number = line_number
+        self.column = column  # 0 if unknown
         self.is_collapsible = is_collapsible
         self.raw_text = raw_text  # The opening line as it appears
         self.body = body  # The content of the admonition
@@ -965,74 +1381,88 @@ class AdmonitionExtractor:
         Returns:
             List of AdmonitionReference objects
         """
-        admonitions = []
-
         try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            # Pattern for admonition start: !!! or ??? followed by type and optional title
-            # Examples:
-            #   !!! note
-            #   !!! info "Custom Title"
-            #   ??? warning "Collapsible Warning"
-            adm_pattern = re.compile(r'^(\?\?\?|!!!)\s+(\w+)(?:\s+"([^"]+)")?')
-
-            i = 0
-            while i < len(lines):
-                line = lines[i]
-                match = adm_pattern.match(line.strip())
-
-                if match:
-                    prefix = match.group(1)
-                    adm_type = match.group(2).lower()
-                    title = match.group(3) or ""  # Empty string if no custom title
-                    is_collapsible = (prefix == "???")
-                    line_num = i + 1
-
-                    # Extract the body content (indented lines following the admonition)
-                    body_lines = []
-                    i += 1  # Move to next line
-
-                    # Admonition body is indented (typically 4 spaces)
-                    # Continue until we hit a non-indented line or end of file
-                    while i < len(lines):
-                        next_line = lines[i]
-                        # Check if line is indented or empty
-                        if next_line.strip() == '' or next_line.startswith((' ', '\t')):
-                            body_lines.append(next_line.rstrip())
-                            i += 1
-                        else:
-                            # Non-indented line means admonition ended
-                            break
-
-                    # Join body lines
-                    body = '\n'.join(body_lines)
-
-                    adm = AdmonitionReference(
-                        adm_type=adm_type,
-                        title=title,
-                        line_number=line_num,
-                        is_collapsible=is_collapsible,
-                        raw_text=line.strip(),
-                        body=body
-                    )
-
-                    # Apply filters if specified
-                    passes_type_filter = (filter_types is None or adm_type in filter_types)
-                    passes_content_filter = (filter_contains is None or
-                                            adm.contains(filter_contains, case_sensitive))
-
-                    if passes_type_filter and passes_content_filter:
-                        admonitions.append(adm)
-                else:
-                    i += 1
-
+            line_index = LineIndex.from_file(md_file)
         except Exception as e:
             print(f"Warning: Could not read {md_file}: {e}", file=sys.stderr)
+            return []
+        return AdmonitionExtractor.find_admonitions(line_index, filter_types, filter_contains,
+                                                    case_sensitive)
+
+    @staticmethod
+    def find_admonitions(line_index: LineIndex, filter_types: Set[str] = None,
+                         filter_contains: str = None,
+                         case_sensitive: bool = False) -> List[AdmonitionReference]:
+        """As extract_admonitions, for content that has already been read."""
+        admonitions = []
+        lines = line_index.lines()
+
+        # Pattern for admonition start: !!! or ??? followed by type and optional title
+        # Examples:
+        #   !!! note
+        #   !!! info "Custom Title"
+        #   ??? warning "Collapsible Warning"
+        adm_pattern = re.compile(r'^(\?\?\?|!!!)\s+(\w+)(?:\s+"([^"]+)")?')
+
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            match = adm_pattern.match(line.strip())
+
+            if match:
+                prefix = match.group(1)
+                adm_type = match.group(2).lower()
+                title = match.group(3) or ""  # Empty string if no custom title
+                is_collapsible = (prefix == "???")
+                line_num = i + 1
+
+                # Extract the body content (indented lines following the admonition)
+                body_lines = []
+                i += 1  # Move to next line
+
+                # Admonition body is indented (typically 4 spaces)
+                # Continue until we hit a non-indented line or end of file
+                while i < len(lines):
+                    next_line = lines[i]
+                    # Check if line is indented or empty
+                    if next_line.strip() == '' or next_line.startswith((' ', '\t')):
+                        body_lines.append(next_line.rstrip())
+                        i += 1
+                    else:
+                        # Non-indented line means admonition ended
+                        break
+
+                # Join body lines
+                body = '\n'.join(body_lines)
+
+                adm = AdmonitionReference(
+                    adm_type=adm_type,
+                    title=title,
+                    line_number=line_num,
+                    is_collapsible=is_collapsible,
+                    raw_text=line.strip(),
+                    body=body,
+                    column=len(line) - len(line.lstrip()) + 1
+                )
+
+                # Apply filters if specified
+                if AdmonitionExtractor.matches_filters(adm, filter_types, filter_contains,
+                                                       case_sensitive):
+                    admonitions.append(adm)
+            else:
+                i += 1
 
         return admonitions
 
+    @staticmethod
+    def matches_filters(adm: AdmonitionReference, filter_types: Set[str] = None,
+                        filter_contains: str = None, case_sensitive: bool = False) -> bool:
+        """Check an admonition against the type and content filters of extract_admonitions."""
+        passes_type_filter = (filter_types is None or adm.adm_type in filter_types)
+        passes_content_filter = (filter_contains is None or
+                                 adm.contains(filter_contains, case_sensitive))
+        return passes_type_filter and passes_content_filter
+
     @staticmethod
     def get_unknown_types(admonitions: List[AdmonitionReference]) -> Set[str]:
         """
@@ -1049,3 +1479,263 @@ class AdmonitionExtractor:
             if adm.adm_type not in AdmonitionExtractor.KNOWN_TYPES:
                 unknown.add(adm.adm_type)
         return unknown
+
+
+class CorpusIndex:
+    """
+    Persistent SQLite index of what the checkers extract from each markdown file:
+    markdown and HTML links, image references, footnotes and admonitions.
+
+    A file is re-extracted only when its mtime or size has changed and its content
+    hash no longer matches, so a full check suite reads each file once, and later
+    runs only re-read what was edited. All data is dropped whenever this module (and
+    so the extractors) changes.
+
+    Query methods take a markdown file path, and bring its entry up to date first.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, sha256 TEXT);
+        CREATE TABLE IF NOT EXISTS links (
+            path TEXT, seq INTEGER, text TEXT, url TEXT, line INTEGER, col INTEGER);
+        CREATE TABLE IF NOT EXISTS html_links (
+            path TEXT, seq INTEGER, url TEXT);
+        CREATE TABLE IF NOT EXISTS images (
+            path TEXT, seq INTEGER, alt_text TEXT, image_path TEXT, line INTEGER, raw_text TEXT,
+            col INTEGER);
+        CREATE TABLE IF NOT EXISTS footnotes (
+            path TEXT, seq INTEGER, label TEXT, line INTEGER, is_definition INTEGER,
+            raw_text TEXT, col INTEGER);
+        CREATE TABLE IF NOT EXISTS admonitions (
+            path TEXT, seq INTEGER, adm_type TEXT, title TEXT, line INTEGER,
+            is_collapsible INTEGER, raw_text TEXT, body TEXT, col INTEGER);
+        CREATE INDEX IF NOT EXISTS links_path ON links (path);
+        CREATE INDEX IF NOT EXISTS html_links_path ON html_links (path);
+        CREATE INDEX IF NOT EXISTS images_path ON images (path);
+        CREATE INDEX IF NOT EXISTS footnotes_path ON footnotes (path);
+        CREATE INDEX IF NOT EXISTS admonitions_path ON admonitions (path);
+    """
+    DATA_TABLES = ('links', 'html_links', 'images', 'footnotes', 'admonitions')
+
+    def __init__(self, db_path: str = ':memory:'):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(self.SCHEMA)
+        self._checked: Set[str] = set()
+        self.indexed = 0  # Files (re-)extracted by this instance
+
+        version = self.extractor_version()
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != version:
+            # Tables are recreated, as the schema may have changed along with the code
+            with self.db:
+                for table in ('files',) + self.DATA_TABLES:
+                    self.db.execute(f'DROP TABLE {table}')
+            self.db.executescript(self.SCHEMA)
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+
+    @staticmethod
+    def extractor_version() -> str:
+        """A fingerprint of the extraction code: this module and the HTML parser."""
+        digest = hashlib.sha256()
+        with open(os.path.abspath(__file__), 'rb') as f:
+            digest.update(f.read())
+        digest.update(HTML_PARSER.encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def default_path(root_dir: str) -> str:
+        """The index of a documentation repo lives in its cache directory."""
+        return os.path.join(default_cache_dir(root_dir), 'corpus-index.sqlite')
+
+    @classmethod
+    def for_repo(cls, repo: 'MkDocsRepo', persistent: bool = True) -> 'CorpusIndex':
+        """
+        Open the index of a repo, dropping entries for files that no longer exist.
+        If persistent is False, the index is built in memory, for this run only.
+        """
+        index = cls(cls.default_path(repo.root_dir) if persistent else ':memory:')
+        index.prune()
+        return index
+
+    def close(self) -> None:
+        self.db.close()
+
+    def prune(self) -> None:
+        """Drop the entries of files that have been deleted."""
+        gone = [path for (path,) in self.db.execute('SELECT path FROM files')
+                if not os.path.exists(path)]
+        with self.db:
+            for path in gone:
+                self._delete(path)
+
+    def _delete(self, path: str) -> None:
+        for table in ('files',) + self.DATA_TABLES:
+            self.db.execute(f'DELETE FROM {table} WHERE path = ?', (path,))
+
+    def refresh(self, md_file: str) -> str:
+        """
+        Bring the entry of a file up to date, and return its key. Each file is
+        checked at most once per instance.
+        """
+        path = os.path.abspath(md_file)
+        if path in self._checked:
+            return path
+        self._checked.add(path)
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self.db:
+                self._delete(path)
+            return path
+
+        row = self.db.execute('SELECT mtime_ns, size, sha256 FROM files WHERE path = ?',
+                              (path,)).fetchone()
+        if row and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return path
+
+        try:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return path
+
+        with self.db:
+            if row and row[2] == digest:
+                # Touched, but not changed
+                self.db.execute('UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?',
+                                (stat.st_mtime_ns, stat.st_size, path))
+            else:
+                self._delete(path)
+                self._extract(path)
+                self.db.execute('INSERT INTO files VALUES (?, ?, ?, ?)',
+                                (path, stat.st_mtime_ns, stat.st_size, digest))
+                self.indexed += 1
+        return path
+
+    def is_current(self, md_file: str) -> bool:
+        """Whether the entry of a file is up to date, judging by its mtime and size only."""
+        path = os.path.abspath(md_file)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        row = self.db.execute('SELECT mtime_ns, size FROM files WHERE path = ?',
+                              (path,)).fetchone()
+        return row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size
+
+    def store(self, md_file: str, mtime_ns: int, size: int, digest: str,
+              rows: Dict[str, List[tuple]]) -> None:
+        """
+        Replace the entry of a file with what extract() found in it, so that a file
+        can be read and extracted elsewhere, e.g. in a worker process.
+        """
+        path = os.path.abspath(md_file)
+        self._checked.add(path)
+        with self.db:
+            self._delete(path)
+            self._insert(path, rows)
+            self.db.execute('INSERT INTO files VALUES (?, ?, ?, ?)',
+                            (path, mtime_ns, size, digest))
+        self.indexed += 1
+
+    def _extract(self, path: str) -> None:
+        """Run all extractors on a file, and store their results."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception as e:
+            print(f"Warning: Could not read {path}: {e}", file=sys.stderr)
+            content = ''
+        self._insert(path, self.extract(content, path))
+
+    @staticmethod
+    def extract(content: str, path: str = '') -> Dict[str, List[tuple]]:
+        """
+        Run all extractors on the content of a file. Returns the rows of each data
+        table, without their path column.
+        """
+        # One line table, shared by all the extractors
+        line_index = LineIndex(content)
+        try:
+            images = MkDocsRepo.find_image_references(line_index)
+        except Exception as e:
+            print(f"Warning: Could not read {path}: {e}", file=sys.stderr)
+            images = []
+        return {
+            'links': [(seq, text, url, line, column)
+                      for seq, (text, url, line, column)
+                      in enumerate(LinkExtractor.find_markdown_links(content, line_index))],
+            'html_links': [(seq, url)
+                           for seq, url in enumerate(LinkExtractor.extract_html_links(content))],
+            'images': [(seq, ref.alt_text, ref.image_path, ref.line_number, ref.raw_text,
+                        ref.column)
+                       for seq, ref in enumerate(images)],
+            'footnotes': [(seq, fn.label, fn.line_number, fn.is_definition, fn.raw_text,
+                           fn.column)
+                          for seq, fn in enumerate(FootnoteExtractor.find_footnotes(line_index))],
+            'admonitions': [(seq, adm.adm_type, adm.title, adm.line_number, adm.is_collapsible,
+                             adm.raw_text, adm.body, adm.column)
+                            for seq, adm
+                            in enumerate(AdmonitionExtractor.find_admonitions(line_index))],
+        }
+
+    def _insert(self, path: str, rows: Dict[str, List[tuple]]) -> None:
+        for table in self.DATA_TABLES:
+            if rows[table]:
+                placeholders = ', '.join('?' * (len(rows[table][0]) + 1))
+                self.db.executemany(f'INSERT INTO {table} VALUES ({placeholders})',
+                                    [(path,) + row for row in rows[table]])
+
+    def _query(self, table: str, columns: str, md_file: str) -> List[tuple]:
+        path = self.refresh(md_file)
+        return self.db.execute(f'SELECT {columns} FROM {table} WHERE path = ? ORDER BY seq',
+                               (path,)).fetchall()
+
+    def markdown_links(self, md_file: str) -> List[Tuple[str, str]]:
+        """As LinkExtractor.extract_markdown_links: (text, url) tuples."""
+        return self._query('links', 'text, url', md_file)
+
+    def markdown_link_positions(self, md_file: str) -> List[Tuple[str, str, int, int]]:
+        """As LinkExtractor.find_markdown_links: (text, url, line, column) tuples."""
+        return self._query('links', 'text, url, line, col', md_file)
+
+    def html_links(self, md_file: str) -> List[str]:
+        """As LinkExtractor.extract_html_links."""
+        return [url for (url,) in self._query('html_links', 'url', md_file)]
+
+    def image_references(self, md_file: str) -> List[ImageReference]:
+        """As MkDocsRepo.extract_image_references."""
+        return [ImageReference(alt_text, image_path, line, raw_text, column)
+                for alt_text, image_path, line, raw_text, column
+                in self._query('images', 'alt_text, image_path, line, raw_text, col', md_file)]
+
+    def footnotes(self, md_file: str, include_references: bool = True,
+                  include_definitions: bool = True) -> List[FootnoteReference]:
+        """As FootnoteExtractor.extract_footnotes."""
+        return [FootnoteReference(label, line, bool(is_definition), raw_text, column)
+                for label, line, is_definition, raw_text, column
+                in self._query('footnotes', 'label, line, is_definition, raw_text, col', md_file)
+                if (include_definitions if is_definition else include_references)]
+
+    def admonitions(self, md_file: str, filter_types: Set[str] = None,
+                    filter_contains: str = None,
+                    case_sensitive: bool = False) -> List[AdmonitionReference]:
+        """As AdmonitionExtractor.extract_admonitions."""
+        admonitions = [
+            AdmonitionReference(adm_type, title, line, bool(is_collapsible), raw_text, body,
+                                column)
+            for adm_type, title, line, is_collapsible, raw_text, body, column
+            in self._query('admonitions',
+                           'adm_type, title, line, is_collapsible, raw_text, body, col', md_file)
+        ]
+        return [adm for adm in admonitions
+                if AdmonitionExtractor.matches_filters(adm, filter_types, filter_contains,
+                                                       case_sensitive)]
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+doclint.py - Run the documentation checks in one pass
+
+Runs the checks of dangling_links.py, find_orphans.py, validate_images.py,
+find_footnotes.py, find_admonitions.py, check_search_exclusions.py and
+check_yml_files.py together, and writes their results to one report.
+
+Each markdown file is read once, in a pool of worker processes, which run the
+CorpusIndex extractors on it, and pass its content on to any checker that
+scans content itself. The checkers then report from the shared index in the
+main process. Without --no-cache, the corpus index, parsed YAML and file tree
+snapshot in .cache/ are used, so files that are unchanged since the last run
+are only read by the checkers that need their content.
+
+Usage:
+    # Local, from the documentation root:
+    python tools/utils/doclint.py --output doclint.yaml
+
+    # Docker:
+    docker compose run --rm utils python /utils/doclint.py --root-dir /docs
+
+    # Some checks only, as JSON:
+    python tools/utils/doclint.py --checks links,images --output doclint.json
+
+The report has a section per check, in the format of that check's own script
+where it has one, and lists the checks that failed. The exit status is 1 if
+any check failed: dangling links, broken image references, conflicting search
+exclusions or missing nav files. Orphans, footnotes and admonitions are
+reported only.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+# Add the utils directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from doc_utils import MkDocsRepo, CorpusIndex, FileTree, FilenameMatcher  # noqa: E402
+from dangling_links import collect_nav_files, check_file_links  # noqa: E402
+from find_orphans import OrphanFinder  # noqa: E402
+from validate_images import ImageValidator  # noqa: E402
+from find_footnotes import FootnoteFinder  # noqa: E402
+from find_admonitions import AdmonitionFinder  # noqa: E402
+from check_search_exclusions import (  # noqa: E402
+    parse_mkdocs_includes, find_markdown_files, check_content)
+from check_yml_files import process_config, check_file_exists  # noqa: E402
+
+
+class LintContext:
+    """What the checkers of a run share: the repo, its corpus index and file tree."""
+
+    def __init__(self, root_dir: str, use_cache: bool = True, exclude_subsites: Set[str] = None,
+                 help_urls_file: Optional[Path] = None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.repo = MkDocsRepo(self.root_dir, use_cache=use_cache)
+        self.index = CorpusIndex.for_repo(self.repo, persistent=use_cache)
+        self.tree = FileTree.for_repo(self.repo, persistent=use_cache)
+        self.exclude_subsites = exclude_subsites or set()
+        self.help_urls_file = help_urls_file
+
+    def relpath(self, path: str) -> str:
+        return os.path.relpath(path, self.root_dir)
+
+
+class Checker:
+    """
+    A check run by doclint.
+
+    A checker lists the markdown files whose corpus index entries it queries, and
+    those whose content it scans itself. Both are read once for all checkers; scan
+    runs in a worker process, on each of the scanned files, so it must be a
+    picklable callable (md_file, content) that returns a picklable result, or None.
+    report then runs in the main process, with the results of scan by file.
+    """
+
+    name = ''
+    scan = None
+
+    def __init__(self, context: LintContext):
+        self.context = context
+
+    def indexed_files(self) -> Iterable[str]:
+        return ()
+
+    def scanned_files(self) -> Iterable[str]:
+        return ()
+
+    def report(self, scans: Dict[str, object]) -> Dict:
+        raise NotImplementedError
+
+    def failed(self, report: Dict) -> bool:
+        return False
+
+    def summary(self, report: Dict) -> str:
+        raise NotImplementedError
+
+
+class DanglingLinksChecker(Checker):
+    """Local links in nav pages that lead nowhere, as dangling_links.py."""
+
+    name = 'links'
+
+    def indexed_files(self):
+        self.nav_files = collect_nav_files(self.context.repo, self.context.tree)
+        return self.nav_files
+
+    def report(self, scans):
+        context = self.context
+        site_mappings = context.repo.site_mappings
+        total_links = 0
+        dangling: Dict[str, List[str]] = {}
+        for file_path in self.nav_files:
+            total_links += len(context.index.markdown_links(file_path))
+            file_dangling = check_file_links(
+                file_path, context.root_dir, site_mappings, context.index, context.tree)
+            if file_dangling:
+                dangling[context.relpath(file_path)] = [
+                    f"[{link_text}]({link_url})" if link_text else f"({link_url})"
+                    for link_text, link_url in file_dangling
+                ]
+        return {
+            'summary': {
+                'files_checked': len(self.nav_files),
+                'total_links': total_links,
+                'dangling_links': sum(len(links) for links in dangling.values()),
+            },
+            'dangling_links': dangling,
+        }
+
+    def failed(self, report):
+        return report['summary']['dangling_links'] > 0
+
+    def summary(self, report):
+        summary = report['summary']
+        return (f"{summary['dangling_links']} dangling links, in {summary['total_links']} links "
+                f"from {summary['files_checked']} nav pages")
+
+
+class OrphansChecker(Checker):
+    """Pages that no output format or link reaches, as find_orphans.py."""
+
+    name = 'orphans'
+
+    def indexed_files(self):
+        context = self.context
+        self.finder = OrphanFinder(Path(context.root_dir) / 'mkdocs.yml',
+                                   exclude_subsites=context.exclude_subsites,
+                                   help_urls_file=context.help_urls_file,
+                                   repo=context.repo, index=context.index)
+        self.finder.find_all_markdown_files()
+        return [str(md_file) for md_file in self.finder.all_md_files]
+
+    def report(self, scans):
+        orphans, reference_sources = self.finder.find_orphans()
+        return self.finder.generate_report(orphans, reference_sources)
+
+    def summary(self, report):
+        summary = report['summary']
+        return (f"{summary['orphaned_files']} orphaned files, "
+                f"of {summary['total_markdown_files']} markdown files")
+
+
+class ScannedImageValidator(ImageValidator):
+    """An ImageValidator that takes its filename search results from doclint's scan."""
+
+    def __init__(self, *args, matches: Dict[str, Set[str]], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.matches = matches
+
+    def find_filename_references(self, filenames):
+        references: Dict[str, List[str]] = {filename: [] for filename in filenames}
+        for md_file, found in self.matches.items():
+            for filename in found:
+                if filename in references:
+                    references[filename].append(md_file)
+        return references
+
+
+def search_filenames(matcher: FilenameMatcher, md_file: str, content: str) -> Set[str]:
+    return matcher.search(content)
+
+
+class ImagesChecker(Checker):
+    """Broken, cross-document and unreferenced images, as validate_images.py."""
+
+    name = 'images'
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.validator = ImageValidator(context.root_dir, repo=context.repo, index=context.index)
+        # Which image names each markdown file mentions; the candidates for deletion
+        # are only known once all the references are resolved
+        names = {os.path.basename(path) for path in context.repo.find_all_image_files()}
+        self.scan = partial(search_filenames, FilenameMatcher(names))
+
+    def indexed_files(self):
+        return self.context.repo.iter_all_markdown_files()
+
+    def scanned_files(self):
+        return self.validator.iter_searchable_markdown_files()
+
+    def report(self, scans):
+        context = self.context
+        validator = ScannedImageValidator(context.root_dir, repo=context.repo,
+                                          index=context.index, matches=scans)
+        validator.validate_all()
+        return validator.build_report()
+
+    def failed(self, report):
+        return report['summary']['broken_images'] > 0
+
+    def summary(self, report):
+        summary = report['summary']
+        return (f"{summary['broken_images']} broken, {summary['cross_document_refs']} "
+                f"files with cross-document and {summary['unreferenced_images']} unreferenced "
+                f"images, of {summary['total_images']} references")
+
+
+class FootnotesChecker(Checker):
+    """Pages that use footnotes, as find_footnotes.py."""
+
+    name = 'footnotes'
+
+    def indexed_files(self):
+        return self.context.repo.iter_all_markdown_files()
+
+    def report(self, scans):
+        context = self.context
+        finder = FootnoteFinder(context.root_dir, repo=context.repo, index=context.index)
+        finder.scan()
+        return finder.build_report()
+
+    def summary(self, report):
+        summary = report['summary']
+        return (f"{summary['files_with_footnotes']} files with "
+                f"{summary['total_footnotes']} footnotes")
+
+
+class AdmonitionsChecker(Checker):
+    """Admonition usage, as find_admonitions.py."""
+
+    name = 'admonitions'
+
+    def indexed_files(self):
+        return self.context.repo.iter_all_markdown_files()
+
+    def report(self, scans):
+        context = self.context
+        finder = AdmonitionFinder(context.root_dir, repo=context.repo, index=context.index)
+        finder.scan_all()
+        return finder.build_report()
+
+    def summary(self, report):
+        summary = report['summary']
+        return (f"{summary['total_admonitions']} admonitions in "
+                f"{summary['files_with_admonitions']} files")
+
+
+class SearchExclusionsChecker(Checker):
+    """Pages excluded from search that have synonym divs, as check_search_exclusions.py."""
+
+    name = 'search-exclusions'
+    scan = staticmethod(check_content)
+
+    def scanned_files(self):
+        root_dir = self.context.root_dir
+        self.files = []
+        for dir_name in parse_mkdocs_includes(os.path.join(root_dir, 'mkdocs.yml')):
+            dir_path = os.path.join(root_dir, dir_name)
+            if os.path.exists(dir_path):
+                self.files.extend(find_markdown_files(dir_path))
+        return self.files
+
+    def report(self, scans):
+        conflicts = []
+        for path in sorted(scans):
+            conflict = dict(scans[path])
+            conflict['path'] = self.context.relpath(conflict['path'])
+            conflicts.append(conflict)
+        return {
+            'summary': {
+                'files_checked': len(self.files),
+                'conflicts': len(conflicts),
+            },
+            'conflicts': conflicts,
+        }
+
+    def failed(self, report):
+        return report['summary']['conflicts'] > 0
+
+    def summary(self, report):
+        summary = report['summary']
+        return (f"{summary['conflicts']} conflicts, in {summary['files_checked']} files")
+
+
+class NavFilesChecker(Checker):
+    """Nav entries of the mkdocs.yml files whose pages don't exist, as check_yml_files.py."""
+
+    name = 'nav-files'
+
+    def report(self, scans):
+        root_dir = self.context.root_dir
+        files_found = set()
+        process_config(os.path.join(root_dir, 'mkdocs.yml'), root_dir, files_found,
+                       self.context.repo.load_config)
+        missing: Dict[str, List[str]] = {}
+        for base_path, file_ref in sorted(files_found):
+            exists, _ = check_file_exists(base_path, file_ref)
+            if not exists:
+                missing.setdefault(self.context.relpath(base_path), []).append(file_ref)
+        return {
+            'summary': {
+                'files_checked': len(files_found),
+                'missing_files': sum(len(files) for files in missing.values()),
+            },
+            'missing_files': missing,
+        }
+
+    def failed(self, report):
+        return report['summary']['missing_files'] > 0
+
+    def summary(self, report):
+        summary = report['summary']
+        return (f"{summary['missing_files']} missing, of {summary['files_checked']} "
+                f"nav entries")
+
+
+CHECKERS = {
+    checker.name: checker
+    for checker in (
+        DanglingLinksChecker,
+        OrphansChecker,
+        ImagesChecker,
+        FootnotesChecker,
+        AdmonitionsChecker,
+        SearchExclusionsChecker,
+        NavFilesChecker,
+    )
+}
+
+
+# The scan functions of the checkers, by name, in each worker process
+_scanners: Dict[str, object] = {}
+
+
+def init_worker(scanners: Dict[str, object]) -> None:
+    global _scanners
+    _scanners = scanners
+
+
+def read_file(task):
+    """
+    Read a markdown file, in a worker process. Returns the file's path; its
+    stat, digest and extracted rows, for CorpusIndex.store, if it is to be
+    indexed; and the results of the scanners that it is to be scanned by.
+    """
+    path, index_it, scanner_names = task
+    try:
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        print(f"Warning: Could not read {path}: {e}", file=sys.stderr)
+        return path, None, {}
+
+    # As reading in text mode, with universal newlines, would
+    try:
+        content = data.decode('utf-8')
+        text = content
+    except UnicodeDecodeError as e:
+        print(f"Warning: Could not read {path}: {e}", file=sys.stderr)
+        content = ''
+        text = data.decode('utf-8', errors='replace')
+    if '\r' in text:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+    indexed = None
+    if index_it:
+        indexed = (stat.st_mtime_ns, stat.st_size, hashlib.sha256(data).hexdigest(),
+                   CorpusIndex.extract(content, path))
+    scans = {name: _scanners[name](path, text) for name in scanner_names}
+    return path, indexed, scans
+
+
+def run_checks(context: LintContext, checkers: List[Checker],
+               processes: int = 1) -> Dict[str, Dict]:
+    """
+    Run checks, reading the files they need first. Returns the report of each
+    check, by name.
+    """
+    # Which files to read, and what for: [index it, names of the checkers scanning it]
+    tasks: Dict[str, list] = {}
+    for checker in checkers:
+        for md_file in checker.indexed_files():
+            task = tasks.setdefault(os.path.abspath(md_file), [None, []])
+            if task[0] is None:
+                task[0] = not context.index.is_current(md_file)
+        if checker.scan is not None:
+            for md_file in checker.scanned_files():
+                task = tasks.setdefault(os.path.abspath(md_file), [None, []])
+                task[1].append(checker.name)
+    todo = [(path, bool(index_it), scanner_names)
+            for path, (index_it, scanner_names) in tasks.items()
+            if index_it or scanner_names]
+    scanners = {checker.name: checker.scan for checker in checkers if checker.scan is not None}
+
+    print(f"Reading {len(todo)} of {len(tasks)} markdown files...")
+    scans: Dict[str, Dict[str, object]] = {checker.name: {} for checker in checkers}
+
+    def collect(results):
+        for path, indexed, file_scans in results:
+            if indexed:
+                context.index.store(path, *indexed)
+            for name, result in file_scans.items():
+                if result:
+                    scans[name][path] = result
+
+    if processes > 1 and len(todo) > 1:
+        with mp.Pool(processes=processes, initializer=init_worker,
+                     initargs=(scanners,)) as pool:
+            collect(pool.imap_unordered(read_file, todo, chunksize=16))
+    else:
+        init_worker(scanners)
+        collect(map(read_file, todo))
+
+    reports = {}
+    for checker in checkers:
+        print(f"\n--- {checker.name} ---")
+        reports[checker.name] = checker.report(scans[checker.name])
+    return reports
+
+
+def write_report(report: Dict, output_file: str) -> None:
+    """Write the combined report, as JSON if the file name ends in .json, else as YAML."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        if output_file.endswith('.json'):
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        else:
+            from ruamel.yaml import YAML
+            yaml = YAML()
+            yaml.default_flow_style = False
+            yaml.width = 4096  # Prevent line wrapping
+            yaml.dump(report, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the documentation checks in one pass, and write a combined report",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Checks: " + ", ".join(CHECKERS),
+    )
+    parser.add_argument("--root-dir", default=".",
+                        help="Root directory of the documentation (default: current directory)")
+    parser.add_argument("--output", default="doclint.yaml",
+                        help="Report file, written as JSON if it ends in .json "
+                             "(default: doclint.yaml)")
+    parser.add_argument("--checks",
+                        help="Comma-separated checks to run (default: all)")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 1) - 1),
+                        help="Number of worker processes reading files (default: CPU count - 1)")
+    parser.add_argument("--help_urls", type=Path,
+                        help="Parse C header file for HELP_URL references, for orphans")
+    parser.add_argument("--exclude", type=str,
+                        help="Comma-separated list of subsites to exclude from orphans")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't use or update the corpus index, parsed YAML and file tree "
+                             "snapshot in .cache/")
+    args = parser.parse_args()
+
+    root_dir = os.path.abspath(args.root_dir)
+    if not os.path.exists(os.path.join(root_dir, 'mkdocs.yml')):
+        print(f"Error: {root_dir} does not appear to be a mkdocs documentation root",
+              file=sys.stderr)
+        print("       (mkdocs.yml not found)", file=sys.stderr)
+        sys.exit(1)
+
+    names = list(CHECKERS)
+    if args.checks:
+        names = [name.strip() for name in args.checks.split(',') if name.strip()]
+        unknown = [name for name in names if name not in CHECKERS]
+        if unknown:
+            parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    help_urls_file = None
+    if args.help_urls:
+        help_urls_file = args.help_urls.resolve()
+        if not help_urls_file.is_file():
+            sys.exit(f"[ERROR] Help URLs file not found: {help_urls_file}")
+    exclude_subsites = set()
+    if args.exclude:
+        exclude_subsites = {s.strip() for s in args.exclude.split(',') if s.strip()}
+
+    context = LintContext(root_dir, use_cache=not args.no_cache,
+                          exclude_subsites=exclude_subsites, help_urls_file=help_urls_file)
+    checkers = [CHECKERS[name](context) for name in names]
+    reports = run_checks(context, checkers, args.processes)
+
+    failed = [checker.name for checker in checkers if checker.failed(reports[checker.name])]
+    report = {
+        'summary': {
+            'checks': names,
+            'failed': failed,
+        },
+        'checks': reports,
+    }
+
+    print("\n" + "=" * 70)
+    print("DOCLINT SUMMARY")
+    print("=" * 70)
+    for checker in checkers:
+        status = "FAIL" if checker.name in failed else "ok"
+        print(f"  {checker.name:18} {status:5} {checker.summary(reports[checker.name])}")
+
+    write_report(report, args.output)
+    print(f"\nReport written to: {args.output}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    mp.freeze_support()
+    main()
@@ -48,7 +48,7 @@ from typing import Dict, List, Set, Tuple
 # Add utils to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'utils'))
 
-from doc_utils import MkDocsRepo, AdmonitionReference, AdmonitionExtractor
+from doc_utils import MkDocsRepo, AdmonitionReference, AdmonitionExtractor, CorpusIndex
 from ruamel.yaml import YAML
 
 
@@ -56,9 +56,11 @@ class AdmonitionFinder:
     """Find admonitions in markdown files."""
 
     def __init__(self, root_dir: str, filter_contains: str = None, case_sensitive: bool = False,
-                 filter_types: Set[str] = None):
+                 filter_types: Set[str] = None, use_cache: bool = True,
+                 repo: MkDocsRepo = None, index: CorpusIndex = None):
         self.root_dir = os.path.abspath(root_dir)
-        self.repo = MkDocsRepo(root_dir)
+        self.repo = repo or MkDocsRepo(root_dir, use_cache=use_cache)
+        self.index = index or CorpusIndex.for_repo(self.repo, persistent=use_cache)
         self.filter_contains = filter_contains
         self.case_sensitive = case_sensitive
         self.filter_types = set(t.lower() for t in filter_types) if filter_types else None
@@ -80,8 +82,8 @@ class AdmonitionFinder:
         Returns:
             List of AdmonitionReference objects
         """
-        # Use the shared extractor from doc_utils
-        admonitions = AdmonitionExtractor.extract_admonitions(
+        # Use the shared corpus index from doc_utils
+        admonitions = self.index.admonitions(
             md_file,
             filter_types=self.filter_types,
             filter_contains=self.filter_contains,
@@ -180,13 +182,8 @@ class AdmonitionFinder:
                 print(f"  {i:2}. {file_path}")
                 print(f"      Count: {len(adms)} ({types_str})")
 
-    def write_report(self, output_file: str):
-        """Write findings to a YAML file."""
-        yaml = YAML()
-        yaml.default_flow_style = False
-        yaml.width = 120
-        yaml.preserve_quotes = True
-
+    def build_report(self) -> Dict:
+        """The findings, as written to the report."""
         # Convert by_file to serializable format
         by_file_dict = {}
         for file_path, adms in self.by_file.items():
@@ -235,9 +232,17 @@ class AdmonitionFinder:
             'by_file': by_file_dict,
             'by_type': by_type_dict
         }
+        return report
+
+    def write_report(self, output_file: str):
+        """Write findings to a YAML file."""
+        yaml = YAML()
+        yaml.default_flow_style = False
+        yaml.width = 120
+        yaml.preserve_quotes = True
 
         with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(report, f)
+            yaml.dump(self.build_report(), f)
 
         print(f"\nDetailed report written to: {output_file}")
 
@@ -321,6 +326,12 @@ Output format:
         help='Make the --contains filter case-sensitive (default: case-insensitive)'
     )
 
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Don't use or update the corpus index and parsed YAML in .cache/"
+    )
+
     args = parser.parse_args()
 
     # Parse type filter
@@ -341,7 +352,8 @@ Output format:
     finder = AdmonitionFinder(root_dir,
                              filter_contains=args.contains,
                              case_sensitive=args.case_sensitive,
-                             filter_types=filter_types)
+                             filter_types=filter_types,
+                             use_cache=not args.no_cache)
     finder.scan_all()
 
     # Print summary
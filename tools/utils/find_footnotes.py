@@ -19,15 +19,17 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 if SCRIPT_DIR not in sys.path:
     sys.path.insert(0, SCRIPT_DIR)
 
-from doc_utils import MkDocsRepo, FootnoteExtractor, FootnoteReference  # noqa: E402
+from doc_utils import MkDocsRepo, CorpusIndex, FootnoteReference  # noqa: E402
 
 
 class FootnoteFinder:
     """Scan markdown files for footnote usage."""
 
-    def __init__(self, root_dir: str, include_references: bool = True, include_definitions: bool = True):
+    def __init__(self, root_dir: str, include_references: bool = True, include_definitions: bool = True,
+                 use_cache: bool = True, repo: MkDocsRepo = None, index: CorpusIndex = None):
         self.root_dir = os.path.abspath(root_dir)
-        self.repo = MkDocsRepo(self.root_dir)
+        self.repo = repo or MkDocsRepo(self.root_dir, use_cache=use_cache)
+        self.index = index or CorpusIndex.for_repo(self.repo, persistent=use_cache)
         self.include_references = include_references
         self.include_definitions = include_definitions
         self.files_with_footnotes: Dict[str, List[FootnoteReference]] = defaultdict(list)
@@ -35,7 +37,7 @@ class FootnoteFinder:
     def scan(self) -> None:
         """Scan every markdown file and record those containing footnotes."""
         for md_file in self.repo.iter_all_markdown_files():
-            footnotes = FootnoteExtractor.extract_footnotes(
+            footnotes = self.index.footnotes(
                 md_file,
                 include_references=self.include_references,
                 include_definitions=self.include_definitions,
@@ -44,6 +46,21 @@ class FootnoteFinder:
                 rel_path = os.path.relpath(md_file, self.root_dir)
                 self.files_with_footnotes[rel_path] = footnotes
 
+    def build_report(self) -> Dict:
+        """The files that contain footnotes, and their footnotes, as a dictionary."""
+        return {
+            'summary': {
+                'files_with_footnotes': len(self.files_with_footnotes),
+                'total_footnotes': sum(len(v) for v in self.files_with_footnotes.values()),
+            },
+            'by_file': {
+                path: [{'label': item.label, 'line': item.line_number,
+                        'definition': item.is_definition}
+                       for item in self.files_with_footnotes[path]]
+                for path in sorted(self.files_with_footnotes)
+            },
+        }
+
     def render_report(self, show_counts: bool = False) -> None:
         """Print a summary of files that contain footnotes."""
         total_files = len(self.files_with_footnotes)
@@ -100,6 +117,11 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Show reference/definition counts for each file.",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use or update the corpus index and parsed YAML in .cache/.",
+    )
     return parser
 
 
@@ -124,6 +146,7 @@ def main() -> None:
         root_dir=root_dir,
         include_references=include_references,
         include_definitions=include_definitions,
+        use_cache=not args.no_cache,
     )
     finder.scan()
     finder.render_report(show_counts=args.show_counts)
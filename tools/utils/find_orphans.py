@@ -43,7 +43,6 @@ Options:
 import argparse
 import os
 import sys
-import re
 from pathlib import Path
 from typing import Set, Dict, List, Tuple
 from collections import defaultdict
@@ -51,20 +50,22 @@ from collections import defaultdict
 # Add the utils directory to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from doc_utils import MkDocsRepo, YAMLLoader, NavTraverser, LinkExtractor, HelpUrlsParser
+from doc_utils import MkDocsRepo, NavTraverser, HelpUrlsParser, CorpusIndex
 
 
 class OrphanFinder:
     """Find orphaned markdown files across all output formats."""
 
-    def __init__(self, root_yaml: Path, verbose: bool = False, exclude_subsites: Set[str] = None, help_urls_file: Path = None):
+    def __init__(self, root_yaml: Path, verbose: bool = False, exclude_subsites: Set[str] = None, help_urls_file: Path = None,
+                 use_cache: bool = True, repo: MkDocsRepo = None, index: CorpusIndex = None):
         self.root_yaml = root_yaml.resolve()
         self.root_dir = root_yaml.parent
         self.verbose = verbose
         self.exclude_subsites = exclude_subsites or set()
         self.help_urls_file = help_urls_file
-        self.loader = YAMLLoader()
-        self.repo = MkDocsRepo(str(self.root_dir))
+        # A repo and index may be shared with other checkers, as doclint.py does
+        self.repo = repo or MkDocsRepo(str(self.root_dir), use_cache=use_cache)
+        self.index = index or CorpusIndex.for_repo(self.repo, persistent=use_cache)
 
         # Sets to track referenced files
         self.referenced_files: Set[Path] = set()
@@ -99,7 +100,7 @@ class OrphanFinder:
         self.log("Discovering all markdown files...")
 
         # Main config
-        main_config = self.loader.load_file(str(self.root_yaml))
+        main_config = self.repo.load_config(str(self.root_yaml))
         if not main_config:
             sys.exit(f"[ERROR] Cannot parse {self.root_yaml}")
 
@@ -140,7 +141,7 @@ class OrphanFinder:
         self.log("Collecting nav references from mkdocs.yml files...")
 
         # Main mkdocs.yml
-        main_config = self.loader.load_file(str(self.root_yaml))
+        main_config = self.repo.load_config(str(self.root_yaml))
         if main_config and 'nav' in main_config:
             docs_dir = main_config.get("docs_dir", "docs").lstrip("./\\")
             docs_root = (self.root_dir / docs_dir).resolve()
@@ -175,7 +176,7 @@ class OrphanFinder:
         for name, subsite_dir, config in self.repo.iter_subsites():
             print_config_path = Path(subsite_dir) / 'print_mkdocs.yml'
             if print_config_path.exists():
-                print_config = self.loader.load_file(str(print_config_path))
+                print_config = self.repo.load_config(str(print_config_path))
                 if print_config and 'nav' in print_config:
                     docs_dir = print_config.get("docs_dir", "docs").lstrip("./\\")
                     docs_root = (Path(subsite_dir) / docs_dir).resolve()
@@ -214,11 +215,8 @@ class OrphanFinder:
         link_count = 0
         for md_file in self.all_md_files:
             try:
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                # Extract markdown links
-                links = LinkExtractor.extract_markdown_links(content)
+                # Markdown links, from the corpus index
+                links = self.index.markdown_links(str(md_file))
 
                 for link_text, url in links:
                     # Skip external links, anchors, etc.
@@ -243,17 +241,11 @@ class OrphanFinder:
         """Collect files that might be referenced via HTML links in markdown."""
         self.log("Collecting HTML link references...")
 
-        html_link_pattern = re.compile(r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>', re.IGNORECASE)
         link_count = 0
 
         for md_file in self.all_md_files:
             try:
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                for match in html_link_pattern.finditer(content):
-                    url = match.group(1)
-
+                for url in self.index.html_links(str(md_file)):
                     # Skip external links, anchors, etc.
                     if url.startswith(('http://', 'https://', '#', 'mailto:', 'javascript:')):
                         continue
@@ -445,6 +437,8 @@ Examples:
                         help="Comma-separated list of subsites to exclude (e.g., object-reference,unix-user-guide)")
     parser.add_argument("-v", "--verbose", action="store_true",
                         help="Show detailed progress")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't use or update the corpus index and parsed YAML in .cache/")
     args = parser.parse_args()
 
     root_yaml = args.root.resolve()
@@ -464,7 +458,8 @@ Examples:
             sys.exit(f"[ERROR] Help URLs file not found: {help_urls_file}")
 
     # Find orphans
-    finder = OrphanFinder(root_yaml, verbose=args.verbose, exclude_subsites=exclude_subsites, help_urls_file=help_urls_file)
+    finder = OrphanFinder(root_yaml, verbose=args.verbose, exclude_subsites=exclude_subsites, help_urls_file=help_urls_file,
+                          use_cache=not args.no_cache)
     orphans, reference_sources = finder.find_orphans()
 
     # Generate report
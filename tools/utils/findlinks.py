@@ -12,31 +12,27 @@ from typing import List, Tuple
 # Add the utils directory to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from doc_utils import MkDocsRepo, LinkExtractor
+from doc_utils import MkDocsRepo, CorpusIndex
 
 
-def find_links_in_file(filepath: str, target_substring: str) -> List[Tuple[str, str]]:
+def find_links_in_file(
+    filepath: str, target_substring: str, index: CorpusIndex
+) -> List[Tuple[str, str]]:
     """
     Search a markdown file for links whose URL contains a specified substring.
 
     Args:
         filepath: Path to the markdown file to search
         target_substring: Substring to search for in the URLs
+        index: The corpus index to take the file's links from
 
     Returns:
         List of (link_text, url) tuples where URL contains the target substring
     """
     results = []
 
-    try:
-        with open(filepath, "r", encoding="utf-8") as file:
-            content = file.read()
-    except Exception as e:
-        print(f"Error reading {filepath}: {e}", file=sys.stderr)
-        return results
-
-    # Use LinkExtractor to get links (excludes code blocks)
-    links = LinkExtractor.extract_markdown_links(content)
+    # The index holds the links found by LinkExtractor (excludes code blocks)
+    links = index.markdown_links(filepath)
 
     for link_text, url in links:
         if target_substring in url:
@@ -59,6 +55,11 @@ def main() -> None:
         default=".",
         help="Root directory containing mkdocs.yml (default: current directory)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't use or update the corpus index and parsed YAML in .cache/",
+    )
 
     args = parser.parse_args()
     target_substring = args.target
@@ -70,7 +71,8 @@ def main() -> None:
         sys.exit(f"Error: mkdocs.yml not found at {mkdocs_path}")
 
     # Create MkDocsRepo instance
-    repo = MkDocsRepo(root_dir)
+    repo = MkDocsRepo(root_dir, use_cache=not args.no_cache)
+    index = CorpusIndex.for_repo(repo, persistent=not args.no_cache)
 
     # Track files we've already processed (to avoid duplicates from print_mkdocs.yml)
     processed_files = set()
@@ -98,7 +100,7 @@ def main() -> None:
             continue
 
         # Find links in the file
-        links = find_links_in_file(file_path, target_substring)
+        links = find_links_in_file(file_path, target_substring, index)
 
         if links:
             # Display relative path for cleaner output
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+The render stage shared by the CHM and PDF builders, chm/mkdocs2chm.py and
+pdf/mkdocs2pdf.py: a Markdown page, to an HTML fragment plus what the builders
+need to know about it.
+
+Both builders strip the front matter, expand the mkdocs-macros {{ templates }},
+apply their Markdown transforms and convert the result, each with its own set
+of Markdown extensions: a RenderProfile. A PageRenderer does this for a profile,
+and keeps the fragments and their metadata (front matter, h1 title, headings,
+ids, tables and images) in a content-addressed RenderCache. Entries are keyed by
+the profile and the Markdown as it is converted, so any number of builds, of
+either builder, render each page once per profile until it changes.
+
+A Profile collects the timings of a build, for the builders' --profile option.
+"""
+
+import contextlib
+import hashlib
+from dataclasses import asdict, dataclass, field
+from html import unescape
+from importlib import metadata
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Pattern, Tuple
+
+from ruamel.yaml import YAML
+
+from doc_utils import parse_html
+
+# Packages that shape the converted HTML
+RENDER_PACKAGES = [
+    "markdown",
+    "pymdown-extensions",
+    "markdown-tables-extended",
+    "caption",
+    "pygments",
+]
+
+
+def expand_macros(data: str, macros: dict) -> str:
+    """
+    The mkdocs macro extension makes use of templates of the type {{ macro-id }} where
+    the substitution value is stored in the "extra:" section in the mkdocs.yml file.
+    """
+
+    def replace(match):
+        key = match.group(1).strip()
+        value = macros.get(key)
+        return str(value) if not isinstance(value, dict) else match.group(0)
+
+    return re.sub(r"\{\{\s*(.*?)\s*}}", replace, data)
+
+
+def load_front_matter(text: str) -> dict:
+    """Parse YAML front matter, or return {} if it isn't valid."""
+    try:
+        front_matter = YAML().load(text)
+    except Exception:
+        return {}
+    return front_matter if front_matter is not None else {}
+
+
+def tool_version(script: str, packages: List[str]) -> str:
+    """
+    A fingerprint of conversion code: a script and this module, plus the versions
+    of the given packages that shape its output.
+    """
+    digest = hashlib.sha256()
+    for path in (script, __file__):
+        with open(os.path.abspath(path), "rb") as f:
+            digest.update(f.read())
+    for package in packages:
+        try:
+            digest.update(f"{package}={metadata.version(package)}".encode("utf-8"))
+        except metadata.PackageNotFoundError:
+            digest.update(f"{package}=".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class RenderProfile:
+    """
+    How a builder renders Markdown. convert turns Markdown into HTML with the
+    builder's extensions; front_matter_re matches the front matter the builder
+    strips, with its YAML in a group named "yaml". version fingerprints all that
+    the output depends on (see tool_version). Profiles must be picklable, to be
+    used by worker processes.
+    """
+
+    name: str
+    convert: Callable[[str], str]
+    front_matter_re: Pattern
+    version: str = ""
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(f"{self.name}\0{self.version}".encode("utf-8")).hexdigest()
+
+
+HEADING_RE = re.compile(r"<h([1-6])\b([^>]*)>(.*?)</h\1\s*>", re.IGNORECASE | re.DOTALL)
+ID_RE = re.compile(r"""\sid\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+IMG_SRC_RE = re.compile(
+    r"""<img\b[^>]*?\ssrc\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE
+)
+TABLE_RE = re.compile(r"<table\b", re.IGNORECASE)
+TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _attr(match: "re.Match") -> str:
+    return unescape(match.group(1) if match.group(1) is not None else match.group(2))
+
+
+def h1_title(h1: str) -> str:
+    """The text of an h1's name span if it has one, else of the whole h1."""
+    tag = parse_html(h1).find("h1")
+    if tag is None:
+        return ""
+    if name := tag.find("span", class_="name"):
+        return name.get_text().strip()
+    return tag.get_text().strip()
+
+
+@dataclass
+class RenderedPage:
+    """
+    A rendered page: its HTML fragment, and its metadata. headings are
+    (level, id, text) for each heading, in order; ids are all the ids in the page;
+    images are the src attributes of its images, as written.
+    """
+
+    html: str
+    front_matter: dict = field(default_factory=dict)
+    title: str = ""
+    headings: List[Tuple[int, str, str]] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    tables: int = 0
+    images: List[str] = field(default_factory=list)
+    cached: bool = False  # Taken from the cache; not stored
+
+    @classmethod
+    def from_html(cls, html: str, front_matter: dict) -> "RenderedPage":
+        """Collect the metadata of a fragment, with a few regex scans."""
+        headings = []
+        title = ""
+        for match in HEADING_RE.finditer(html):
+            id_match = ID_RE.search(match.group(2))
+            text = unescape(TAG_RE.sub("", match.group(3))).strip()
+            headings.append((int(match.group(1)), _attr(id_match) if id_match else "", text))
+            if match.group(1) == "1" and not title:
+                title = h1_title(match.group(0))
+        return cls(
+            html=html,
+            front_matter=front_matter,
+            title=title,
+            headings=headings,
+            ids=[_attr(match) for match in ID_RE.finditer(html)],
+            tables=len(TABLE_RE.findall(html)),
+            images=[_attr(match) for match in IMG_SRC_RE.finditer(html)],
+        )
+
+    def record(self) -> dict:
+        record = asdict(self)
+        del record["cached"]
+        return record
+
+    @classmethod
+    def from_record(cls, record: dict) -> "RenderedPage":
+        record["headings"] = [tuple(heading) for heading in record["headings"]]
+        return cls(**record, cached=True)
+
+
+@dataclass
+class RenderCache:
+    """
+    Content-addressed on-disk cache of rendered pages, shared by the builders:
+    each entry is a JSON file named by its key.
+    """
+
+    directory: str
+
+    def __post_init__(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, record: dict) -> None:
+        # Write-then-rename, so concurrent builds never see a partial entry.
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp, path)
+
+
+class PageRenderer:
+    """
+    Render pages with a profile, the macros from the "extra:" section of the
+    mkdocs.yml file, and transforms applied to the Markdown before conversion.
+    With a cache, a page whose Markdown, once expanded and transformed, was
+    rendered before with the same profile, is not converted again.
+    """
+
+    def __init__(
+        self,
+        profile: RenderProfile,
+        macros: dict,
+        transforms: List[Callable[[str], str]] = (),
+        cache: RenderCache = None,
+    ):
+        self.profile = profile
+        self.macros = macros
+        self.transforms = list(transforms)
+        self.cache = cache
+        self.fingerprint = profile.fingerprint
+
+    def key(self, front_matter: str, md: str) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode("utf-8"))
+        for part in (front_matter, md):
+            digest.update(b"\0")
+            digest.update(part.encode("utf-8"))
+        return digest.hexdigest()
+
+    def render(self, source: str, lap: Callable[[str], None] = None) -> RenderedPage:
+        """
+        Render the source of a page. If lap is given, it is called with the name of
+        each step as it is done, for timing.
+        """
+        lap = lap or (lambda step: None)
+
+        front_matter = ""
+        if match := self.profile.front_matter_re.match(source):
+            front_matter = match.group("yaml")
+            source = source[match.end():]
+
+        # Macros are defined in the "extra:" section in the mkdocs.yml file. In the
+        # Markdown source, they are templates of the type
+        #
+        #    {{ macro-name }}
+        md = expand_macros(source, self.macros)
+        lap("expand_macros")
+
+        # Hook point for transforms we may want to apply to the source Markdown
+        # before it's converted to HTML.
+        for fun in self.transforms:
+            md = fun(md)
+            lap(getattr(fun, "__name__", "transform"))
+
+        key = None
+        if self.cache is not None:
+            key = self.key(front_matter, md)
+            if record := self.cache.get(key):
+                lap("render_cache")
+                return RenderedPage.from_record(record)
+
+        html = self.profile.convert(md)
+        lap("markdown")
+        page = RenderedPage.from_html(html, load_front_matter(front_matter) if front_matter else {})
+        lap("page_metadata")
+
+        if self.cache is not None:
+            self.cache.put(key, page.record())
+        return page
+
+
+class StepTimer:
+    """
+    Times the consecutive steps of converting a page: each lap() records the time
+    since the previous one (or since resume()) against the named step.
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, float] = {}
+        self.resume()
+
+    def resume(self) -> None:
+        self._last = time.perf_counter()
+
+    def lap(self, step: str) -> None:
+        now = time.perf_counter()
+        self.steps[step] = self.steps.get(step, 0.0) + now - self._last
+        self._last = now
+
+
+@dataclass
+class Profile:
+    """
+    Wall-clock timings of a build, for --profile: one per build phase, and for each
+    page, one per conversion step. report() summarises them as JSON, listing the
+    slowest pages and steps.
+
+    Phases and pages may be named "<group>/<name>". If phase_groups is given, the
+    report totals the phases of each group under that key, and lists only the
+    others as phases; if page_groups is given, it totals the pages of each group
+    under that key, with the ungrouped pages as "(top level)".
+    """
+
+    tool: str
+    phase_groups: str = ""
+    page_groups: str = ""
+    phases: Dict[str, float] = field(default_factory=dict)
+    pages: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    start: float = field(default_factory=time.perf_counter)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_page(self, page: str, steps: Dict[str, float]) -> None:
+        self.pages[page] = steps
+
+    def merge(self, other: "Profile") -> None:
+        """Add the timings from a worker process."""
+        for name, seconds in other.phases.items():
+            self.add_phase(name, seconds)
+        self.pages.update(other.pages)
+
+    def report(self, top: int = 25) -> dict:
+        page_totals = {page: sum(steps.values()) for page, steps in self.pages.items()}
+
+        steps: Dict[str, dict] = {}
+        for page, page_steps in self.pages.items():
+            for step, seconds in page_steps.items():
+                entry = steps.setdefault(
+                    step, {"total": 0.0, "pages": 0, "max": 0.0, "slowest_page": None}
+                )
+                entry["total"] += seconds
+                entry["pages"] += 1
+                if seconds >= entry["max"]:
+                    entry["max"] = seconds
+                    entry["slowest_page"] = page
+
+        def by_total(items: Dict[str, dict]) -> Dict[str, dict]:
+            return dict(sorted(items.items(), key=lambda kv: -kv[1]["total"]))
+
+        report = {"tool": self.tool, "total": time.perf_counter() - self.start}
+        report["phases"] = self.phases
+        if self.phase_groups:
+            phase_groups: Dict[str, dict] = {}
+            for name, seconds in self.phases.items():
+                if "/" in name:
+                    group, phase = name.split("/", 1)
+                    entry = phase_groups.setdefault(group, {"total": 0.0, "phases": {}})
+                    entry["total"] += seconds
+                    entry["phases"][phase] = seconds
+            report["phases"] = {name: t for name, t in self.phases.items() if "/" not in name}
+            report[self.phase_groups] = by_total(phase_groups)
+
+        if self.page_groups:
+            page_groups: Dict[str, dict] = {}
+            for page, seconds in page_totals.items():
+                group = page.split("/", 1)[0] if "/" in page else "(top level)"
+                entry = page_groups.setdefault(group, {"total": 0.0, "pages": 0})
+                entry["total"] += seconds
+                entry["pages"] += 1
+            report[self.page_groups] = by_total(page_groups)
+
+        slowest = sorted(page_totals, key=lambda page: -page_totals[page])[:top]
+        report["steps"] = by_total(steps)
+        report["slowest_pages"] = [
+            {
+                "page": page,
+                "total": page_totals[page],
+                "steps": dict(sorted(self.pages[page].items(), key=lambda kv: -kv[1])),
+            }
+            for page in slowest
+        ]
+        return report
+
+    def write(self, filename: str) -> None:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"Profile written to {filename}")
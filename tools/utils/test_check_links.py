@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Tests for the check_links crawler, run against a local http.server.
+"""
+
+import asyncio
+import functools
+import io
+import os
+import shutil
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from ruamel.yaml import YAML
+
+pytest.importorskip('aiohttp')
+
+from check_links import (BaseURLError, crawl, crawl_pages, check_link, create_session, imap_unordered, write_yaml_output,
+                         resolve_site_url, check_site_dir, collect_element_ids,
+                         process_page, LinkCache, reusable_link_results, sitemap_page_urls)
+
+PAGES = {
+    'index.html': """<html><body>
+<nav><a href="docs/a/">A</a> <a href="docs/b/">B</a> <a href="docs/gone/">Gone</a></nav>
+<article><a href="docs/a/">A</a></article>
+</body></html>""",
+    'docs/a/index.html': """<html><body><article>
+<a href="../b/#section">B</a>
+<a href="../missing/">Missing</a>
+<a href="https://example.com/">External</a>
+<a href="/docs/a/image.png">Image</a>
+<a name="old-name"></a>
+</article></body></html>""",
+    'docs/b/index.html': """<html><body><article>
+<h2 id="section">Section</h2>
+<a href="../a/">A</a>
+<a href="../missing/">Missing</a>
+<a href="#section">Here</a> <a href="#nowhere">Nowhere</a> <a href="#top">Top</a>
+<a href="../a/#old-name">Old</a> <a href="../a/#gone">Gone</a>
+<a href="../a/image.png#frag">Image</a>
+<a href="../c/">Only linked from here</a>
+</article></body></html>""",
+    'docs/c/index.html': """<html><body><article>
+<a href="../a/">A</a> <a href="../d/">Missing</a>
+</article></body></html>""",
+    'docs/a/image.png': "",
+}
+
+SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <url>
+         <loc>https://docs.example.com/docs/a/</loc>
+         <lastmod>2026-01-01</lastmod>
+    </url>
+    <url>
+         <loc>https://docs.example.com/docs/c/</loc>
+    </url>
+</urlset>
+"""
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Serve files without logging each request to stderr."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestCrawler:
+    """Test the asyncio crawler against a local site."""
+
+    def setup_method(self):
+        self.site_dir = tempfile.mkdtemp()
+        for path, content in PAGES.items():
+            full_path = os.path.join(self.site_dir, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'w') as f:
+                f.write(content)
+        handler = functools.partial(QuietHandler, directory=self.site_dir)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.site_dir)
+
+    def test_check_link(self):
+        """HEAD responses decide the status; failures are confirmed with GET."""
+        async def run():
+            async with create_session(10, 0, 5) as session:
+                return await asyncio.gather(
+                    check_link(session, f"{self.base_url}/docs/a/"),
+                    check_link(session, f"{self.base_url}/docs/missing/"),
+                    check_link(session, "http://127.0.0.1:1/"),
+                )
+
+        ok, missing, refused = asyncio.run(run())
+        assert ok == {"url": f"{self.base_url}/docs/a/", "ok": True, "status": 200}
+        assert missing["ok"] is False
+        assert missing["status"] == 404
+        assert refused["ok"] is False
+        assert refused["status"].startswith("Error: ")
+
+    def test_crawl(self):
+        """Test that pages are discovered and broken links attributed to them."""
+        pages, nav_errors, page_broken_links, unique_links = asyncio.run(
+            crawl(self.base_url, 50, 0, 5)
+        )
+
+        base = self.base_url
+        assert pages == (base, f"{base}/docs/a/", f"{base}/docs/b/", f"{base}/docs/gone/")
+        assert nav_errors == [(f"{base}/docs/gone/", "Status 404")]
+        assert f"{base}/docs/b/" in unique_links
+        assert "https://example.com/" not in unique_links
+        assert dict(page_broken_links) == {
+            f"{base}/docs/a/": [{"url": f"{base}/docs/missing/", "status": 404}],
+            f"{base}/docs/b/": [
+                {"url": f"{base}/docs/missing/", "status": 404},
+                {"url": f"{base}/docs/a/#gone", "status": "Missing anchor"},
+                {"url": f"{base}/docs/b/#nowhere", "status": "Missing anchor"},
+            ],
+        }
+
+    def test_report(self):
+        """Test that the crawl results produce the YAML report."""
+        pages, nav_errors, page_broken_links, unique_links = asyncio.run(
+            crawl(self.base_url, 50, 0, 5)
+        )
+        output = os.path.join(self.site_dir, 'broken_links.yaml')
+        write_yaml_output(self.base_url, output, nav_errors, page_broken_links,
+                          len(unique_links))
+
+        with open(output) as f:
+            report = f.read()
+        assert f"# Links checked: {len(unique_links)}\n" in report
+        assert YAML(typ='safe').load(report) == {
+            "Bad nav links:": ["/docs/gone/ (Status: Status 404)"],
+            "/docs/a/": ["/docs/missing/ (Status: 404)"],
+            "/docs/b/": ["/docs/a/#gone (Status: Missing anchor)",
+                         "/docs/b/#nowhere (Status: Missing anchor)",
+                         "/docs/missing/ (Status: 404)"],
+        }
+
+    def test_sitemap_discovery(self):
+        """Test that pages come from sitemap.xml, on the host being checked."""
+        with open(os.path.join(self.site_dir, 'sitemap.xml'), 'w') as f:
+            f.write(SITEMAP)
+        base = self.base_url
+        pages, nav_errors, _, _ = asyncio.run(crawl(base, 50, 0, 5))
+        assert pages == (base, f"{base}/docs/a/", f"{base}/docs/c/")
+        assert nav_errors == []
+        assert check_site_dir(base, self.site_dir, 1)[:2] == (pages, nav_errors)
+
+        pages, _, _, _ = asyncio.run(crawl(base, 50, 0, 5, discovery="nav"))
+        assert f"{base}/docs/gone/" in pages
+
+    def test_follow(self):
+        """Test that --follow finds pages only linked from content."""
+        base = self.base_url
+        crawled = asyncio.run(crawl(base, 50, 0, 5, follow=True))
+        pages, nav_errors, page_broken_links, _ = crawled
+        assert pages == (base, f"{base}/docs/a/", f"{base}/docs/b/", f"{base}/docs/c/",
+                         f"{base}/docs/d/", f"{base}/docs/gone/", f"{base}/docs/missing/")
+        # Followed pages that fail are broken links, not navigation errors
+        assert nav_errors == [(f"{base}/docs/gone/", "Status 404")]
+        assert page_broken_links[f"{base}/docs/c/"] == [{"url": f"{base}/docs/d/", "status": 404}]
+        assert check_site_dir(base, self.site_dir, 1, follow=True) == crawled
+
+    def test_cached_crawl(self):
+        """Test that a crawl with a warm cache gives the same results."""
+        cache = LinkCache()
+        first = asyncio.run(crawl(self.base_url, 50, 0, 5, cache, 6))
+        assert asyncio.run(crawl(self.base_url, 50, 0, 5, cache, 6)) == first
+        assert asyncio.run(crawl(self.base_url, 50, 0, 5, cache, 6, since_cache=True)) == first
+        assert asyncio.run(crawl(self.base_url, 50, 0, 5)) == first
+
+    def test_conditional_page_fetch(self):
+        """Test that unchanged pages are reused from the cache, and changed ones aren't."""
+        cache = LinkCache()
+        page_url = f"{self.base_url}/docs/b/"
+
+        async def fetch():
+            async with create_session(10, 0, 5) as session:
+                return await process_page(session, page_url, self.base_url, cache)
+
+        first = asyncio.run(fetch())
+        assert first["changed"] is True
+        first_hash = cache.page(page_url)["sha256"]
+        second = asyncio.run(fetch())
+        assert second["changed"] is False
+        for key in ("links", "fragments", "ids"):
+            assert second[key] == first[key]
+
+        # Same content with a new date, as after a rebuild: matched by its hash
+        path = os.path.join(self.site_dir, 'docs/b/index.html')
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        assert asyncio.run(fetch())["changed"] is False
+
+        with open(path, 'a') as f:
+            f.write('<a href="../c/">C</a>')
+        os.utime(path, (stat.st_atime, stat.st_mtime + 20))
+        third = asyncio.run(fetch())
+        assert third["changed"] is True
+        assert third["links"] == first["links"]  # Outside the <article>
+        assert cache.page(page_url)["sha256"] != first_hash
+
+    def test_unreachable_base_url(self):
+        """Test that a site that can't be loaded fails with BaseURLError."""
+        for discovery in ("sitemap", "nav"):
+            with pytest.raises(BaseURLError, match="Error: "):
+                asyncio.run(crawl("http://127.0.0.1:1", 50, 0, 5, discovery=discovery))
+        with tempfile.TemporaryDirectory() as empty_dir:
+            with pytest.raises(BaseURLError, match="Status 404"):
+                check_site_dir("http://127.0.0.1:1", empty_dir, 1)
+
+    def test_crawl_pages_cancels_on_failure(self):
+        """Test that the pages in flight are cancelled when discovery fails."""
+        cancelled = []
+
+        async def seeds():
+            yield "a"
+            yield "b"
+            raise BaseURLError("Status 404")
+
+        async def func(url):
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+
+        async def run():
+            async for _ in crawl_pages(func, seeds(), 10):
+                pass
+
+        with pytest.raises(BaseURLError):
+            asyncio.run(run())
+        assert sorted(cancelled) == ["a", "b"]
+
+    def test_site_dir_matches_crawl(self):
+        """Test that checking the files on disk gives the same results as the crawl."""
+        crawled = asyncio.run(crawl(self.base_url, 50, 0, 5))
+        assert check_site_dir(self.base_url, self.site_dir, 1) == crawled
+
+
+class TestSitemap:
+    """Test reading sitemap.xml as it arrives."""
+
+    def test_incremental_parse(self):
+        """Test that URLs are found in any chunking, and moved to the checked host."""
+        parser = ET.XMLPullParser(events=("end",))
+        urls = []
+        for i in range(0, len(SITEMAP), 7):
+            parser.feed(SITEMAP[i:i + 7])
+            urls.extend(sitemap_page_urls(parser.read_events(), "http://localhost:8080"))
+        assert urls == ["http://localhost:8080/docs/a/", "http://localhost:8080/docs/c/"]
+
+        # URLs outside the versioned site being checked are dropped
+        events = ET.iterparse(io.StringIO(SITEMAP), events=("end",))
+        assert list(sitemap_page_urls(events, "http://localhost:8080/docs")) == [
+            "http://localhost:8080/docs/a/", "http://localhost:8080/docs/c/"
+        ]
+        events = ET.iterparse(io.StringIO(SITEMAP), events=("end",))
+        assert list(sitemap_page_urls(events, "http://localhost:8080/20.0")) == []
+
+
+class TestLinkCache:
+    """Test which cached link results are reused."""
+
+    def test_reusable_link_results(self):
+        """Working links are reused within the TTL, or off changed pages with --since-cache."""
+        cache = LinkCache()
+        cache.store_link("http://x/ok", True, 200)
+        cache.store_link("http://x/broken", False, 404)
+        cache.store_link("http://x/old", True, 200)
+        cache.db.execute("UPDATE links SET checked_at = 0 WHERE url = 'http://x/old'")
+        links = ["http://x/ok", "http://x/broken", "http://x/old", "http://x/new"]
+
+        assert reusable_link_results(links, cache, 6) == {"http://x/ok": (True, 200)}
+        assert reusable_link_results(links, cache, 0) == {}
+        assert reusable_link_results(links, cache, 0, changed_links={"http://x/ok"}) == {
+            "http://x/old": (True, 200)
+        }
+
+    def test_persistent(self):
+        """Test that results survive reopening the cache, but not a change of version."""
+        db_path = os.path.join(tempfile.mkdtemp(), 'cache', 'links.sqlite')
+        try:
+            cache = LinkCache(db_path)
+            cache.store_link("http://x/a", False, "Error: Timeout")
+            cache.close()
+
+            cache = LinkCache(db_path)
+            assert cache.link("http://x/a")[:2] == (False, "Error: Timeout")
+            cache.db.execute("UPDATE meta SET value = 'old' WHERE key = 'version'")
+            cache.close()
+
+            cache = LinkCache(db_path)
+            assert cache.link("http://x/a") is None
+            cache.close()
+        finally:
+            shutil.rmtree(os.path.dirname(os.path.dirname(db_path)))
+
+
+class TestElementIds:
+    """Test the id index used to check anchors."""
+
+    def test_collect_element_ids(self):
+        """Test that ids and <a name=...> are found, and other attributes aren't."""
+        html = """<h2 id="a&amp;b" data-id="x" valid=3>A</h2>
+<span id='single'></span><div class="c" id=bare>
+<a name=old href="#">x</a><meta name="viewport"><a
+name="multiline"></a>"""
+        assert collect_element_ids(html) == {'a&b', 'single', 'bare', 'old', 'multiline'}
+
+
+class TestResolveSiteURL:
+    """Test that URLs resolve to the files nginx.conf would serve."""
+
+    def setup_method(self):
+        self.site_dir = tempfile.mkdtemp()
+        for path in ['20.0/index.html', '20.0/guide/index.html', '20.0/page.html',
+                     '20.0/image.png', '20.0/assets/style.css', '20.0/my page/index.html']:
+            full_path = os.path.join(self.site_dir, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            open(full_path, 'w').close()
+
+    def teardown_method(self):
+        shutil.rmtree(self.site_dir)
+
+    def resolve(self, path):
+        status, file_path = resolve_site_url("http://localhost:8080" + path, self.site_dir)
+        if file_path:
+            file_path = os.path.relpath(file_path, self.site_dir)
+        return status, file_path
+
+    def test_try_files(self):
+        """Test $uri, then $uri/, then $uri.html."""
+        assert self.resolve('/20.0/image.png') == (200, '20.0/image.png')
+        assert self.resolve('/20.0/guide') == (200, '20.0/guide/index.html')
+        assert self.resolve('/20.0/page') == (200, '20.0/page.html')
+        assert self.resolve('/20.0') == (200, '20.0/index.html')
+        assert self.resolve('/20.0/assets') == (403, None)
+        assert self.resolve('/20.0/missing') == (404, None)
+
+    def test_trailing_slash(self):
+        """Test $1/index.html, then $1.html, for paths ending in a slash."""
+        assert self.resolve('/20.0/') == (200, '20.0/index.html')
+        assert self.resolve('/20.0/guide/') == (200, '20.0/guide/index.html')
+        assert self.resolve('/20.0/page/') == (200, '20.0/page.html')
+        assert self.resolve('/20.0/assets/') == (404, None)
+        assert self.resolve('/20.0/image.png/') == (404, None)
+
+    def test_url_paths(self):
+        """Test that paths are decoded, and can't leave the site."""
+        assert self.resolve('/20.0/my%20page/?q=1') == (200, '20.0/my page/index.html')
+        assert self.resolve('/20.0/guide/../page') == (200, '20.0/page.html')
+        assert self.resolve('/20.0/../../etc/passwd') == (404, None)
+        assert self.resolve('/19.0/') == (404, None)
+        assert self.resolve('') == (404, None)
+
+
+class TestImapUnordered:
+    """Test the bounded-concurrency task runner."""
+
+    def test_concurrency_limit(self):
+        """Test that every item is processed with at most `concurrency` in flight."""
+        in_flight = 0
+        peak = 0
+
+        async def work(item):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001 * (item % 3))
+            in_flight -= 1
+            return item * 2
+
+        async def run():
+            return [result async for result in imap_unordered(work, range(50), 8)]
+
+        results = asyncio.run(run())
+        assert sorted(results) == [item * 2 for item in range(50)]
+        assert peak == 8
+
+    def test_empty(self):
+        """Test that no items gives no results."""
+        async def run():
+            return [result async for result in imap_unordered(asyncio.sleep, [], 8)]
+
+        assert asyncio.run(run()) == []
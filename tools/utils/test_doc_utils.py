@@ -7,10 +7,16 @@ import os
 import pytest
 import tempfile
 import shutil
+import doc_utils
 from doc_utils import (
     YAMLLoader, NavTraverser, PathResolver, LinkExtractor,
-    HTMLLinkExtractor, LinkValidator, SummaryReporter
+    HTMLLinkExtractor, LinkValidator, SummaryReporter, MkDocsRepo,
+    parse_html, may_contain_tag, CorpusIndex, FootnoteExtractor, AdmonitionExtractor,
+    FilenameMatcher, LineIndex, FileTree
 )
+from add_synonyms import extract_apl_symbol
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 
 class TestYAMLLoader:
@@ -62,6 +68,25 @@ nav:
             
             os.unlink(f.name)
 
+    
+    def test_disk_cache(self):
+        """Test that parsed files are reused from the cache until they change."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'mkdocs.yml')
+            with open(path, 'w') as f:
+                f.write("site_name: First\n")
+            cache_dir = os.path.join(tmpdir, 'cache')
+            
+            assert YAMLLoader(cache_dir).load_file(path)['site_name'] == 'First'
+            loader = YAMLLoader(cache_dir)
+            loader.yaml = None  # Parsing would fail: must come from the cache
+            assert loader.load_file(path)['site_name'] == 'First'
+            
+            with open(path, 'w') as f:
+                f.write("site_name: Second\n")
+            os.utime(path, ns=(0, 0))
+            assert YAMLLoader(cache_dir).load_file(path)['site_name'] == 'Second'
+
 
 class TestNavTraverser:
     """Test navigation traversal functionality."""
@@ -166,6 +191,54 @@ class TestPathResolver:
         assert PathResolver.count_levels_up('dir/file.md') == 0
 
 
+class TestMkDocsRepo:
+    """Test monorepo navigation."""
+    
+    def make_repo(self, tmpdir):
+        with open(os.path.join(tmpdir, 'mkdocs.yml'), 'w') as f:
+            f.write("""
+nav:
+  - A: "!include ./site-a/mkdocs.yml"
+  - B: "!include ./site-b/mkdocs.yml"
+  - Home: index.md
+""")
+        for name in ('site-a', 'site-b'):
+            os.makedirs(os.path.join(tmpdir, name, 'docs'))
+            with open(os.path.join(tmpdir, name, 'mkdocs.yml'), 'w') as f:
+                f.write(f"site_name: {name}\nnav:\n  - index.md\n")
+        return MkDocsRepo(tmpdir)
+    
+    def test_subsites_parsed_once(self):
+        """Test that subsite configs are parsed on the first call only."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = self.make_repo(tmpdir)
+            loaded = []
+            load_file = repo.loader.load_file
+            repo.loader.load_file = lambda path: loaded.append(path) or load_file(path)
+            
+            first = list(repo.iter_subsites())
+            assert sorted(name for name, _, _ in first) == ['site-a', 'site-b']
+            list(repo.iter_nav_files())
+            list(repo.find_print_configs())
+            repo.find_all_image_files()
+            assert list(repo.iter_subsites()) == first
+            assert len(loaded) == 3
+    
+    def test_determine_file_subsite(self):
+        """Test mapping files to subsites, from any working directory."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = self.make_repo(tmpdir)
+            assert repo.determine_file_subsite(
+                os.path.join(tmpdir, 'site-a', 'docs', 'x.md')) == 'site-a'
+            assert repo.determine_file_subsite(
+                os.path.join(tmpdir, 'site-b', 'mkdocs.yml')) == 'site-b'
+            assert repo.determine_file_subsite(os.path.join(tmpdir, 'site-b')) == 'root'
+            assert repo.determine_file_subsite(
+                os.path.join(tmpdir, 'site-ab', 'x.md')) == 'root'
+            assert repo.determine_file_subsite(
+                os.path.join(tmpdir, 'docs', 'index.md')) == 'root'
+
+
 class TestLinkExtractor:
     """Test link extraction functionality."""
     
@@ -238,6 +311,56 @@ class TestLinkExtractor:
         assert '.5' not in link_urls
 
 
+class TestLineIndex:
+    """Test line and column lookups."""
+    
+    def test_positions(self):
+        """Test that offsets map to 1-based lines and columns, and back."""
+        content = "ab\n\ncd\n"
+        index = LineIndex(content)
+        for offset, position in [(0, (1, 1)), (1, (1, 2)), (2, (1, 3)), (3, (2, 1)),
+                                 (4, (3, 1)), (5, (3, 2)), (7, (4, 1))]:
+            assert index.position(offset) == position
+            assert index.line(offset) == position[0]
+            assert index.offset(*position) == offset
+    
+    def test_lines(self):
+        """Test that lines() splits like file.readlines()."""
+        for content in ['', 'a', 'a\n', 'a\n\nb', 'a\r\nb\n\n']:
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.md', newline='',
+                                             delete=False) as f:
+                f.write(content)
+            try:
+                with open(f.name, 'r', encoding='utf-8') as f2:
+                    expected = f2.readlines()
+                assert LineIndex.from_file(f.name).lines() == expected
+            finally:
+                os.unlink(f.name)
+    
+    def test_extractor_positions(self):
+        """Test that extractors report where each match starts."""
+        content = ("Intro [a](a.md)\n"
+                   "  ![pic](img/p.png) and [^n]\n"
+                   "```\n[not](a link)\n```\n"
+                   "  !!! note\n      Body\n")
+        index = LineIndex(content)
+        assert LinkExtractor.find_markdown_links(content, index) == [('a', 'a.md', 1, 7)]
+        assert [(r.line_number, r.column) for r in MkDocsRepo.find_image_references(index)] == [(2, 3)]
+        assert [(f.line_number, f.column) for f in FootnoteExtractor.find_footnotes(index)] == [(2, 25)]
+        assert [(a.line_number, a.column) for a in AdmonitionExtractor.find_admonitions(index)] == [(6, 3)]
+
+    def test_html_image_positions(self):
+        """Test that each <img> tag is reported where it starts, duplicates included."""
+        content = ('  <img alt="q" src="b.png">\n'
+                   '<img src="a.png">\n'
+                   '<!-- <img src="a.png"> -->\n'
+                   'Text <img\n    src="c.png">\n'
+                   '<img src="a.png">\n')
+        refs = MkDocsRepo.find_image_references(LineIndex(content))
+        assert [(r.image_path, r.line_number, r.column) for r in refs] == [
+            ('b.png', 1, 3), ('a.png', 2, 1), ('c.png', 4, 6), ('a.png', 6, 1)]
+
+
 class TestHTMLLinkExtractor:
     """Test HTML link extraction functionality."""
     
@@ -262,6 +385,253 @@ class TestHTMLLinkExtractor:
         assert '#section' in links
 
 
+class TestHTMLParser:
+    """Test the configurable BeautifulSoup parser."""
+    
+    def test_parse_html_uses_configured_parser(self, monkeypatch):
+        """Test that parse_html follows HTML_PARSER unless told otherwise."""
+        monkeypatch.setattr(doc_utils, 'HTML_PARSER', 'html.parser')
+        assert parse_html('<p>x</p>').builder.NAME == 'html.parser'
+        
+        pytest.importorskip('lxml')
+        monkeypatch.setattr(doc_utils, 'HTML_PARSER', 'lxml')
+        assert parse_html('<p>x</p>').builder.NAME == 'lxml'
+        assert parse_html('<p>x</p>', 'html.parser').builder.NAME == 'html.parser'
+    
+    def test_may_contain_tag(self):
+        """Test the quick check used to skip parsing pages without a tag."""
+        assert may_contain_tag('x <a href="y">z</a>', 'a')
+        assert may_contain_tag('<A\nHREF="y">', 'a')
+        assert not may_contain_tag('<abbr>x</abbr> [a](b.md)', 'a')
+        assert not may_contain_tag('&lt;img src="x"&gt;', 'img')
+    
+    def test_parsers_agree_on_corpus(self, monkeypatch):
+        """Test that lxml and html.parser extract the same data from every page."""
+        pytest.importorskip('lxml')
+        repo = MkDocsRepo(REPO_ROOT)
+        md_files = list(repo.iter_all_markdown_files())
+        if not md_files:
+            pytest.skip("documentation sources not found")
+        
+        def extract_all(parser):
+            monkeypatch.setattr(doc_utils, 'HTML_PARSER', parser)
+            results = {}
+            for md_file in md_files:
+                with open(md_file, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                images = [(r.line_number, r.image_path, r.alt_text)
+                          for r in repo.extract_image_references(md_file)]
+                results[md_file] = (
+                    images,
+                    HTMLLinkExtractor.extract_links(content),
+                    extract_apl_symbol(content),
+                )
+            return results
+        
+        expected = extract_all('html.parser')
+        actual = extract_all('lxml')
+        mismatches = [f for f in md_files if expected[f] != actual[f]]
+        assert not mismatches, f"{len(mismatches)} pages differ, e.g. {mismatches[:5]}"
+
+
+class TestCorpusIndex:
+    """Test the persistent corpus index."""
+    
+    PAGE = """# Page
+
+See [the guide](guide.md) and <a href="other.md">this</a>.
+
+![A picture](img/picture.png)
+
+A footnote[^1].
+
+!!! note "Title"
+    Body text
+
+[^1]: The footnote.
+"""
+    
+    @staticmethod
+    def extracted(index, md_file):
+        """Everything the index holds on a file, in comparable form."""
+        return (
+            index.markdown_links(md_file),
+            index.html_links(md_file),
+            [vars(r) for r in index.image_references(md_file)],
+            [vars(f) for f in index.footnotes(md_file)],
+            [vars(a) for a in index.admonitions(md_file)],
+        )
+    
+    @staticmethod
+    def expected(md_file):
+        """What the extractors themselves find in a file."""
+        with open(md_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return (
+            LinkExtractor.extract_markdown_links(content),
+            LinkExtractor.extract_html_links(content),
+            [vars(r) for r in MkDocsRepo.extract_image_references(md_file)],
+            [vars(f) for f in FootnoteExtractor.extract_footnotes(md_file)],
+            [vars(a) for a in AdmonitionExtractor.extract_admonitions(md_file)],
+        )
+    
+    def test_matches_extractors(self):
+        """Test that queries return what the extractors find."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            md_file = os.path.join(tmpdir, 'page.md')
+            with open(md_file, 'w', encoding='utf-8') as f:
+                f.write(self.PAGE)
+            
+            index = CorpusIndex()
+            assert self.extracted(index, md_file) == self.expected(md_file)
+            assert len(index.footnotes(md_file, include_references=False)) == 1
+            assert index.admonitions(md_file, filter_types={'warning'}) == []
+            assert len(index.admonitions(md_file, filter_contains='body')) == 1
+    
+    def test_incremental_refresh(self):
+        """Test that only new and changed files are extracted again."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'cache', 'index.sqlite')
+            md_file = os.path.join(tmpdir, 'page.md')
+            with open(md_file, 'w', encoding='utf-8') as f:
+                f.write(self.PAGE)
+            
+            index = CorpusIndex(db_path)
+            index.markdown_links(md_file)
+            assert index.indexed == 1
+            index.close()
+            
+            # Unchanged, or touched without changes: reused
+            index = CorpusIndex(db_path)
+            index.markdown_links(md_file)
+            assert index.indexed == 0
+            index.close()
+            os.utime(md_file, ns=(0, 0))
+            index = CorpusIndex(db_path)
+            assert len(index.markdown_links(md_file)) == 1
+            assert index.indexed == 0
+            index.close()
+            
+            # Changed: extracted again
+            with open(md_file, 'w', encoding='utf-8') as f:
+                f.write(self.PAGE + '\nAnd [one more](more.md).\n')
+            index = CorpusIndex(db_path)
+            assert len(index.markdown_links(md_file)) == 2
+            assert index.indexed == 1
+            
+            # Deleted: dropped
+            os.unlink(md_file)
+            index.prune()
+            assert index.db.execute('SELECT COUNT(*) FROM links').fetchone()[0] == 0
+            index.close()
+    
+    def test_store(self):
+        """Test that storing what extract() found is as good as a refresh."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            md_file = os.path.join(tmpdir, 'page.md')
+            with open(md_file, 'w', encoding='utf-8') as f:
+                f.write(self.PAGE)
+            stat = os.stat(md_file)
+
+            index = CorpusIndex()
+            assert not index.is_current(md_file)
+            index.store(md_file, stat.st_mtime_ns, stat.st_size, 'digest',
+                        CorpusIndex.extract(self.PAGE))
+            assert index.is_current(md_file)
+            assert self.extracted(index, md_file) == self.expected(md_file)
+            assert index.indexed == 1
+
+            # Stored again: replaced, not added to
+            index.store(md_file, stat.st_mtime_ns, stat.st_size, 'digest',
+                        CorpusIndex.extract(self.PAGE))
+            assert self.extracted(index, md_file) == self.expected(md_file)
+
+    def test_matches_extractors_on_corpus(self):
+        """Test that the index agrees with the extractors on every markdown page."""
+        repo = MkDocsRepo(REPO_ROOT)
+        md_files = list(repo.iter_all_markdown_files())
+        if not md_files:
+            pytest.skip("documentation sources not found")
+        
+        index = CorpusIndex()
+        mismatches = [f for f in md_files
+                      if self.extracted(index, f) != self.expected(f)]
+        assert not mismatches, f"{len(mismatches)} pages differ, e.g. {mismatches[:5]}"
+
+
+class TestFilenameMatcher:
+    """Test searching for many filenames at once."""
+    
+    def test_search(self):
+        """Test that every occurrence is found, as a search per name would."""
+        names = ['data.png', 'a.png', 'x.svg', 'x.svgz', 'Logo.PNG', 'README', 'missing.png']
+        matcher = FilenameMatcher(names)
+        text = "![](img/data.png) see x.svgz\n<img src='Logo.PNG'> README.md"
+        assert matcher.search(text) == {n for n in names if n in text}
+        assert matcher.search(text) == {'data.png', 'a.png', 'x.svg', 'x.svgz', 'Logo.PNG', 'README'}
+        assert matcher.search('') == set()
+        assert FilenameMatcher([]).search(text) == set()
+
+
+class TestFileTree:
+    """Test the filesystem snapshot."""
+    
+    def test_matches_os_path(self, monkeypatch):
+        """Test that lookups answer as os.path does, including odd paths."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, 'docs', 'img'))
+            os.makedirs(os.path.join(tmpdir, '.hidden'))
+            for name in ('docs/index.md', 'docs/img/a.png', '.hidden/x.md'):
+                with open(os.path.join(tmpdir, name), 'w') as f:
+                    f.write('x')
+            tree = FileTree(tmpdir)
+            monkeypatch.chdir(tmpdir)
+            paths = ['.', 'docs', 'docs/', 'docs/index.md', 'docs/index.md/', 'docs/index.md/..',
+                     'docs/./img/a.png', 'docs//index.md', 'docs/img/../index.md', 'docs/missing.md',
+                     'missing/../docs', '.hidden/x.md', '.hidden/y.md', '..', '../' + os.path.basename(tmpdir),
+                     os.path.join(tmpdir, 'docs', 'img', 'a.png'), '/']
+            for path in paths:
+                for check in ('exists', 'isfile', 'isdir'):
+                    assert getattr(tree, check)(path) == getattr(os.path, check)(path), (check, path)
+    
+    def test_saved_snapshot(self):
+        """Test that a saved snapshot is reused until a directory changes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, 'docs'))
+            with open(os.path.join(tmpdir, 'docs', 'index.md'), 'w') as f:
+                f.write('x')
+            os.makedirs(os.path.join(tmpdir, '.cache'))
+            snapshot = os.path.join(tmpdir, '.cache', 'file-tree.json')
+            FileTree(tmpdir).save(snapshot)
+            
+            loaded = FileTree.load(snapshot, tmpdir)
+            assert loaded is not None
+            assert loaded.isfile(os.path.join(tmpdir, 'docs', 'index.md'))
+            assert FileTree.load(snapshot, os.path.join(tmpdir, 'docs')) is None
+            
+            with open(os.path.join(tmpdir, 'docs', 'new.md'), 'w') as f:
+                f.write('x')
+            os.utime(os.path.join(tmpdir, 'docs'), ns=(0, 0))
+            assert FileTree.load(snapshot, tmpdir) is None
+    
+    def test_link_validation_on_corpus(self):
+        """Test that links resolve the same against the snapshot as on disk."""
+        repo = MkDocsRepo(REPO_ROOT)
+        tree = FileTree(REPO_ROOT)
+        checked = 0
+        for md_file in repo.iter_all_markdown_files():
+            with open(md_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            for _, url in LinkExtractor.extract_markdown_links(content):
+                url = url.split('#')[0].split('?')[0]
+                args = (md_file, url, REPO_ROOT, repo.site_mappings)
+                assert (LinkValidator.is_valid_relative_path(*args, tree=tree) ==
+                        LinkValidator.is_valid_relative_path(*args)), (md_file, url)
+                checked += 1
+        if not checked:
+            pytest.skip("documentation sources not found")
+
+
 class TestLinkValidator:
     """Test link validation functionality."""
     
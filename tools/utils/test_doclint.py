@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the doclint driver, run on a small documentation repo.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+from doclint import CHECKERS, LintContext, run_checks
+from validate_images import ImageValidator
+
+FILES = {
+    'mkdocs.yml': """
+nav:
+  - Home: index.md
+  - Guide: "!include ./guide/mkdocs.yml"
+""",
+    'docs/index.md': "# Home\n",
+    'guide/mkdocs.yml': """site_name: guide
+nav:
+  - index.md
+  - page.md
+  - missing.md
+""",
+    'guide/docs/index.md': """# Guide
+
+See [the page](page.md) and [nothing](broken.md).
+
+![A picture](img/picture.png)
+![No picture](img/none.png)
+
+A footnote[^1].
+
+!!! note "Title"
+    Body text
+
+[^1]: The footnote.
+""",
+    'guide/docs/page.md': """---
+search:
+  exclude: true
+---
+
+<div style="display: none;">
+⍴
+</div>
+
+# Page
+
+Back [home](index.md). The old diagram was mentioned.png here.
+""",
+    'guide/docs/orphan.md': "# Orphan\n",
+    'guide/docs/img/picture.png': "",
+    'guide/docs/img/mentioned.png': "",
+    'guide/docs/img/unused.png': "",
+}
+
+
+@pytest.fixture
+def repo_dir(monkeypatch):
+    monkeypatch.delenv('DOCS_CACHE_DIR', raising=False)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for path, content in FILES.items():
+            full_path = os.path.join(tmpdir, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        yield tmpdir
+
+
+def lint(root_dir, names=tuple(CHECKERS), processes=1, use_cache=False):
+    context = LintContext(root_dir, use_cache=use_cache)
+    checkers = [CHECKERS[name](context) for name in names]
+    reports = run_checks(context, checkers, processes)
+    failed = [checker.name for checker in checkers if checker.failed(reports[checker.name])]
+    return context, reports, failed
+
+
+class TestDocLint:
+    """Test the checks run together."""
+
+    def test_reports(self, repo_dir):
+        """Test what each check finds."""
+        _, reports, failed = lint(repo_dir)
+        assert failed == ['links', 'images', 'search-exclusions', 'nav-files']
+
+        assert reports['links']['dangling_links'] == {
+            os.path.join('guide', 'docs', 'index.md'): ['[nothing](broken.md)']}
+        assert reports['orphans'][os.path.join('guide')] == [
+            os.path.join('guide', 'docs', 'orphan.md')]
+        images = reports['images']
+        assert images['summary']['broken_images'] == 1
+        assert images['unreferenced_images'] == [
+            os.path.join('guide', 'docs', 'img', 'unused.png')]
+        assert list(reports['footnotes']['by_file']) == [os.path.join('guide', 'docs', 'index.md')]
+        assert reports['admonitions']['summary']['total_admonitions'] == 1
+        conflicts = reports['search-exclusions']['conflicts']
+        assert [(c['path'], c['symbol']) for c in conflicts] == [
+            (os.path.join('guide', 'docs', 'page.md'), '⍴')]
+        assert reports['nav-files']['missing_files'] == {'guide': ['missing.md']}
+
+    def test_matches_checker_scripts(self, repo_dir):
+        """Test that a check reports what its own script does."""
+        _, reports, _ = lint(repo_dir, ['images'])
+        validator = ImageValidator(repo_dir, use_cache=False)
+        validator.validate_all()
+        assert reports['images'] == validator.build_report()
+
+    def test_process_pool(self, repo_dir):
+        """Test that reading files in worker processes makes no difference."""
+        assert lint(repo_dir, processes=2)[1] == lint(repo_dir)[1]
+
+    def test_cached_index(self, repo_dir):
+        """Test that unchanged files are only read again to be scanned."""
+        context, reports, _ = lint(repo_dir, ['links', 'footnotes'], use_cache=True)
+        assert context.index.indexed == 4
+        context.index.close()
+
+        context, cached_reports, _ = lint(repo_dir, ['links', 'footnotes'], use_cache=True)
+        assert context.index.indexed == 0
+        assert cached_reports == reports
+        context.index.close()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the render stage shared by the CHM and PDF builders.
+"""
+
+import functools
+import re
+import tempfile
+
+import markdown
+import pytest
+
+from page_render import PageRenderer, Profile, RenderCache, RenderProfile, expand_macros
+
+FRONT_MATTER_RE = re.compile(r"^\s*---\n(?P<yaml>.*?)\n---\n+", flags=re.DOTALL)
+
+PAGE = """---
+search:
+  exclude: true
+---
+
+# <span class="name">Rho</span> `R←⍴Y`
+
+Version {{ version }}.
+
+## Examples {: #rho-examples }
+
+![Shape](img/shape.png)
+
+| A | B |
+|---|---|
+| 1 | 2 |
+"""
+
+
+def profile(name='test'):
+    convert = functools.partial(
+        markdown.markdown, extensions=['attr_list', 'tables', 'toc'])
+    return RenderProfile(name, convert, FRONT_MATTER_RE, version='1')
+
+
+@pytest.fixture
+def cache_dir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+class TestPageRenderer:
+    """Test rendering pages, and reusing them from the cache."""
+
+    def test_expand_macros(self):
+        """Test that only macros with values are expanded."""
+        macros = {'version': '20.0', 'nested': {'a': 1}}
+        assert expand_macros('{{ version }} {{nested}}', macros) == '20.0 {{nested}}'
+
+    def test_metadata(self):
+        """Test what is collected about a rendered page."""
+        page = PageRenderer(profile(), {'version': '20.0'}).render(PAGE)
+        assert page.front_matter == {'search': {'exclude': True}}
+        assert page.title == 'Rho'
+        assert [(level, id_) for level, id_, _ in page.headings] == [
+            (1, 'rho-ry'), (2, 'rho-examples')]
+        assert page.headings[1][2] == 'Examples'
+        assert page.ids == ['rho-ry', 'rho-examples']
+        assert page.images == ['img/shape.png']
+        assert page.tables == 1
+        assert 'Version 20.0.' in page.html
+        assert not page.cached
+
+    def test_cache(self, cache_dir):
+        """Test that a page is rendered once per profile and Markdown."""
+        calls = []
+
+        def counted(md):
+            calls.append(md)
+            return markdown.markdown(md)
+
+        def renderer(name='test', macros=None):
+            return PageRenderer(
+                RenderProfile(name, counted, FRONT_MATTER_RE),
+                macros or {'version': '20.0'},
+                cache=RenderCache(cache_dir),
+            )
+
+        page = renderer().render(PAGE)
+        cached = renderer().render(PAGE)
+        assert len(calls) == 1
+        assert cached.cached
+        assert cached.html == page.html
+        assert cached.headings == page.headings
+        assert cached.front_matter == page.front_matter
+
+        renderer(macros={'version': '20.1'}).render(PAGE)
+        renderer(name='other').render(PAGE)
+        assert len(calls) == 3
+
+
+class TestProfile:
+    """Test the --profile report of a build."""
+
+    def test_groups(self):
+        """Test that grouped phases and pages are totalled per group."""
+        profile = Profile('test', phase_groups='documents', page_groups='guides')
+        profile.add_phase('setup', 1.0)
+        profile.add_phase('a/convert', 2.0)
+        profile.add_phase('a/convert', 1.0)
+        profile.add_page('a/x.htm', {'markdown': 1.0, 'links': 0.5})
+        profile.add_page('top.htm', {'markdown': 2.0})
+
+        report = profile.report()
+        assert report['phases'] == {'setup': 1.0}
+        assert report['documents'] == {'a': {'total': 3.0, 'phases': {'convert': 3.0}}}
+        assert report['guides'] == {
+            '(top level)': {'total': 2.0, 'pages': 1},
+            'a': {'total': 1.5, 'pages': 1},
+        }
+        assert report['steps']['markdown']['slowest_page'] == 'top.htm'
+        assert [page['page'] for page in report['slowest_pages']] == ['top.htm', 'a/x.htm']
+
+        plain = Profile('test').report()
+        assert 'documents' not in plain and 'guides' not in plain
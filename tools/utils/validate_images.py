@@ -5,7 +5,7 @@ Validate image references in markdown files.
 This script:
 1. Checks that all image references in markdown files point to existing files
 2. Detects cross-document image references (bad practice that breaks isolated builds)
-3. Identifies truly unreferenced images using ripgrep verification
+3. Identifies truly unreferenced images, verified by a filename search
 
 The verification step searches for bare filenames across all markdown files to ensure
 no false positives in the unreferenced images list.
@@ -17,10 +17,10 @@ Important Notes:
 - Duplicate images: The codebase may contain duplicate images across subsites (e.g.,
   the same image in both earlier-release-notes/docs/img/ and object-reference/docs/img/).
   Path-based checking marks one copy as "unreferenced" if references point to the other
-  copy. Ripgrep verification prevents deletion of such duplicates by detecting that the
+  copy. Filename verification prevents deletion of such duplicates by detecting that the
   filename appears in markdown files somewhere. This is the expected behavior.
 
-- The difference between path-based unreferenced count (e.g., 571) and ripgrep-verified
+- The difference between path-based unreferenced count (e.g., 571) and filename-verified
   count (e.g., 215) is largely due to duplicate images where one copy is referenced and
   other copies are not directly referenced but share the same filename.
 
@@ -31,32 +31,29 @@ Output:
     YAML report with:
     - broken_references: markdown files with broken image links
     - cross_document_references: images referenced across document boundaries
-    - unreferenced_images: images safe to delete (verified with ripgrep)
-
-Requires:
-    - ripgrep (rg) for verification (required - script will exit if not found)
+    - unreferenced_images: images safe to delete (verified by filename search)
 """
 
 import argparse
-import asyncio
 import os
-import subprocess
 import sys
 from typing import Dict, List, Set, Tuple
 
 # Add utils to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'utils'))
 
-from doc_utils import MkDocsRepo, LinkExtractor
+from doc_utils import MkDocsRepo, LinkExtractor, CorpusIndex, FilenameMatcher
 from ruamel.yaml import YAML
 
 
 class ImageValidator:
     """Validate image references in markdown files."""
 
-    def __init__(self, root_dir: str, report_all: bool = False):
+    def __init__(self, root_dir: str, report_all: bool = False, use_cache: bool = True,
+                 repo: MkDocsRepo = None, index: CorpusIndex = None):
         self.root_dir = os.path.abspath(root_dir)
-        self.repo = MkDocsRepo(root_dir)
+        self.repo = repo or MkDocsRepo(root_dir, use_cache=use_cache)
+        self.index = index or CorpusIndex.for_repo(self.repo, persistent=use_cache)
         self.broken_refs: Dict[str, List[str]] = {}
         self.all_refs: Dict[str, List[str]] = {}  # For --all mode
         self.unreferenced_images: List[str] = []
@@ -120,7 +117,7 @@ class ImageValidator:
         """
         broken = []
         all_images = []
-        refs = self.repo.extract_image_references(md_file)
+        refs = self.index.image_references(md_file)
 
         # Determine which subsite this markdown file belongs to
         md_subsite = self.get_subsite(md_file)
@@ -166,108 +163,53 @@ class ImageValidator:
 
         return broken, all_images
 
-    def check_ripgrep_available(self) -> bool:
+    def iter_searchable_markdown_files(self):
         """
-        Check if ripgrep is available.
-
-        Returns:
-            True if ripgrep is available, False otherwise
+        All markdown files below the root, whether or not a mkdocs.yml includes
+        them, skipping hidden directories such as .git and .cache.
         """
-        try:
-            result = subprocess.run(
-                ['rg', '--version'],
-                capture_output=True,
-                check=False
-            )
-            return result.returncode == 0
-        except FileNotFoundError:
-            return False
-
-    async def verify_with_ripgrep_async(self, filename: str) -> List[str]:
-        """
-        Use ripgrep to search for bare filename references across all markdown files (async).
-        This catches cases where images are referenced from a different directory structure.
+        for root, dirs, files in os.walk(self.root_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for file in sorted(files):
+                if file.endswith('.md'):
+                    yield os.path.join(root, file)
 
-        Args:
-            filename: Bare filename to search for (e.g., "image.png")
-
-        Returns:
-            List of markdown files that reference this filename
+    def find_filename_references(self, filenames: List[str]) -> Dict[str, List[str]]:
         """
-        try:
-            # Use ripgrep to search for the filename in all markdown files
-            process = await asyncio.create_subprocess_exec(
-                'rg', '-l', '-F', filename, '--type', 'md', self.root_dir,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            stdout, stderr = await process.communicate()
-
-            if process.returncode == 0:
-                # Found matches - return list of files
-                output = stdout.decode('utf-8').strip()
-                return [line.strip() for line in output.split('\n') if line.strip()]
-            else:
-                # No matches found
-                return []
-        except Exception as e:
-            print(f"Error: ripgrep verification failed: {e}", file=sys.stderr)
-            sys.exit(1)
-
-    async def verify_batch_async(self, candidates: List[Tuple[str, str]]) -> List[str]:
-        """
-        Verify a batch of candidate images using ripgrep concurrently.
+        Search all markdown files for bare filenames, in a single pass.
+        This catches cases where images are referenced from a different directory structure.
 
         Args:
-            candidates: List of (rel_path, filename) tuples
+            filenames: Bare filenames to search for (e.g., "image.png")
 
         Returns:
-            List of relative paths that are truly unreferenced
+            Dictionary mapping each filename to the markdown files that contain it
         """
-        tasks = []
-        for rel_path, filename in candidates:
-            tasks.append(self.verify_with_ripgrep_async(filename))
-
-        # Run all ripgrep searches concurrently
-        results = await asyncio.gather(*tasks)
-
-        # Filter to only truly unreferenced images
-        unreferenced = []
-        for (rel_path, filename), rg_matches in zip(candidates, results):
-            if not rg_matches:
-                # Truly unreferenced - not found by ripgrep either
-                unreferenced.append(rel_path)
-
-        return unreferenced
+        matcher = FilenameMatcher(filenames)
+        references: Dict[str, List[str]] = {filename: [] for filename in filenames}
+        for md_file in self.iter_searchable_markdown_files():
+            try:
+                with open(md_file, 'r', encoding='utf-8', errors='replace') as f:
+                    content = f.read()
+            except OSError as e:
+                print(f"Warning: cannot read {md_file}: {e}", file=sys.stderr)
+                continue
+            for filename in matcher.search(content):
+                references[filename].append(md_file)
+        return references
 
     def find_unreferenced_images(self) -> List[str]:
         """
         Find images that exist in img directories but are not referenced by any markdown file.
-        Uses ripgrep to verify each unreferenced image by searching for bare filename.
-        Uses async/await to parallelize ripgrep searches for speed.
+        Each image that no reference resolves to is then verified by searching all markdown
+        files for its bare filename.
 
         Returns:
             List of relative paths to truly unreferenced images
         """
-        # Check if ripgrep is available
-        if not self.check_ripgrep_available():
-            print("\n" + "=" * 70, file=sys.stderr)
-            print("ERROR: ripgrep (rg) is required but not found!", file=sys.stderr)
-            print("=" * 70, file=sys.stderr)
-            print("\nRipgrep is required to verify unreferenced images.", file=sys.stderr)
-            print("Without it, the unreferenced images list will contain false positives.", file=sys.stderr)
-            print("\nInstall ripgrep:", file=sys.stderr)
-            print("  - macOS:   brew install ripgrep", file=sys.stderr)
-            print("  - Ubuntu:  apt install ripgrep", file=sys.stderr)
-            print("  - Docker:  Rebuild the image with 'docker compose build utils'", file=sys.stderr)
-            print("\nFor more info: https://github.com/BurntSushi/ripgrep", file=sys.stderr)
-            print("=" * 70, file=sys.stderr)
-            sys.exit(1)
-
         all_images = self.repo.find_all_image_files()
 
-        print("Verifying unreferenced images with ripgrep (parallel)...")
+        print("Verifying unreferenced images by filename...")
 
         # Collect candidates
         candidates = []
@@ -283,17 +225,10 @@ class ImageValidator:
         if total_candidates == 0:
             return []
 
-        # Process in batches for better progress reporting
-        batch_size = 100
-        unreferenced = []
-
-        for i in range(0, total_candidates, batch_size):
-            batch = candidates[i:i+batch_size]
-            batch_unreferenced = asyncio.run(self.verify_batch_async(batch))
-            unreferenced.extend(batch_unreferenced)
+        references = self.find_filename_references([filename for _, filename in candidates])
 
-            processed = min(i + batch_size, total_candidates)
-            print(f"  Verified {processed}/{total_candidates} candidates...")
+        # Truly unreferenced - the filename appears in no markdown file
+        unreferenced = [rel_path for rel_path, filename in candidates if not references[filename]]
 
         verified_count = len(unreferenced)
         print(f"  Complete: {verified_count} truly unreferenced, {total_candidates - verified_count} referenced elsewhere")
@@ -402,13 +337,8 @@ class ImageValidator:
             else:
                 print("\n✓ No unreferenced images found!")
 
-    def write_report(self, output_file: str):
-        """Write validation results to a YAML file."""
-        yaml = YAML()
-        yaml.default_flow_style = False
-        yaml.width = 120
-        yaml.preserve_quotes = True
-
+    def build_report(self) -> Dict:
+        """The validation results, as written to the report."""
         if self.report_all:
             # Report format for --all mode
             report = {
@@ -432,9 +362,17 @@ class ImageValidator:
                 'cross_document_references': self.cross_document_refs,
                 'unreferenced_images': self.unreferenced_images
             }
+        return report
+
+    def write_report(self, output_file: str):
+        """Write validation results to a YAML file."""
+        yaml = YAML()
+        yaml.default_flow_style = False
+        yaml.width = 120
+        yaml.preserve_quotes = True
 
         with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(report, f)
+            yaml.dump(self.build_report(), f)
 
         print(f"\nDetailed report written to: {output_file}")
 
@@ -480,6 +418,12 @@ Examples:
         help='Report all image references, not just broken ones (skips unreferenced image check)'
     )
 
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Don't use or update the corpus index and parsed YAML in .cache/"
+    )
+
     args = parser.parse_args()
 
     # Resolve root directory
@@ -491,7 +435,8 @@ Examples:
         sys.exit(1)
 
     # Run validation
-    validator = ImageValidator(root_dir, report_all=args.report_all)
+    validator = ImageValidator(root_dir, report_all=args.report_all,
+                               use_cache=not args.no_cache)
     validator.validate_all()
 
     # Print summary